@@ -0,0 +1,80 @@
+import functools
+import numpy
+
+#
+# Text of every byte, computed once.
+#
+HEX_BYTES = tuple(format(byte, "02x") for byte in range(256))
+DECIMAL_BYTES = tuple(str(byte) for byte in range(256))
+
+#
+# Maximum number of addresses remembered by the formatters (addresses repeat a lot within a capture).
+#
+CACHE_SIZE = 65536
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def format_mac(mac: int) -> str:
+    """
+        Formats a 48-bit MAC like "aa:bb:cc:dd:ee:ff".
+    """
+
+    return ":".join([ HEX_BYTES[(mac >> shift) & 0xff] for shift in (40, 32, 24, 16, 8, 0) ])
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def format_ip(ip: int) -> str:
+    """
+        Formats a 32-bit IP like "192.168.0.1".
+    """
+
+    return ".".join([ DECIMAL_BYTES[(ip >> shift) & 0xff] for shift in (24, 16, 8, 0) ])
+
+def format_column(column: numpy.ndarray, formatter) -> list:
+    """
+        Formats a column of addresses, each distinct address being formatted once.
+    """
+
+    if len(column) == 0:
+        return []
+
+    addresses, indexes = numpy.unique(column, return_inverse=True)
+    texts = numpy.array([ formatter(address) for address in addresses.tolist() ], dtype=object)
+
+    return texts[indexes.reshape(-1)].tolist()
+
+def format_macs(column: numpy.ndarray) -> list:
+    """
+        Formats a column of 48-bit MACs.
+    """
+
+    return format_column(column, format_mac)
+
+def format_ips(column: numpy.ndarray) -> list:
+    """
+        Formats a column of 32-bit IPs.
+    """
+
+    return format_column(column, format_ip)
+
+def parse_mac(mac: str) -> int:
+    """
+        Converts a MAC like "aa:bb:cc:dd:ee:ff" (or "aa-bb-cc-dd-ee-ff") into an integer.
+    """
+
+    parts = mac.replace("-", ":").split(":")
+
+    if len(parts) != 6 or any(len(part) not in (1, 2) for part in parts):
+        raise ValueError(f"invalid MAC: {mac}")
+
+    return int("".join(part.rjust(2, "0") for part in parts), 16)
+
+def parse_ip(ip: str) -> int:
+    """
+        Converts an IP like "192.168.0.1" into an integer.
+    """
+
+    parts = [ int(part) for part in ip.split(".") ]
+
+    if len(parts) != 4 or any(not 0 <= part <= 255 for part in parts):
+        raise ValueError(f"invalid IP: {ip}")
+
+    return (parts[0] << 24) | (parts[1] << 16) | (parts[2] << 8) | parts[3]
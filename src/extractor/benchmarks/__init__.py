@@ -0,0 +1,7 @@
+"""
+    Benchmarks of the extractor, on synthetic captures.
+
+    Run from the "extractor" directory:
+        python3 -m benchmarks.generator capture.bin --frames 1000000
+        python3 -m benchmarks.harness --output results.json
+"""
@@ -0,0 +1,102 @@
+import frame
+import argparse
+import numpy
+
+class CaptureGenerator:
+    """
+        Writes synthetic binary captures following Frame.LAYOUT.
+
+        Every field gets random bits, except "frame_date" (increasing) and
+        "frame_size", drawn from a distribution of size ranges. A frame_size
+        below the size of the known fields makes the frame stop in the middle
+        of a field, a bigger one adds a msg payload after the known fields.
+    """
+
+    KNOWN_FIELDS_SIZE_IN_BYTES = frame.Frame.NBR_OF_BYTES_BEFORE_MSG - frame.Frame.HEADER_SIZE_IN_BYTES
+
+    #
+    # Frame size distributions: (smallest size, biggest size, weight) ranges.
+    #
+    DISTRIBUTIONS = {
+        "full" : [ (KNOWN_FIELDS_SIZE_IN_BYTES, KNOWN_FIELDS_SIZE_IN_BYTES, 1) ],
+        "truncated" : [ (0, KNOWN_FIELDS_SIZE_IN_BYTES - 1, 1) ],
+        "payload" : [ (KNOWN_FIELDS_SIZE_IN_BYTES + 1, 256, 1) ],
+        "mixed" : [ (KNOWN_FIELDS_SIZE_IN_BYTES, KNOWN_FIELDS_SIZE_IN_BYTES, 6), (0, KNOWN_FIELDS_SIZE_IN_BYTES - 1, 2), (KNOWN_FIELDS_SIZE_IN_BYTES + 1, 256, 2) ],
+    }
+
+    CHUNK_SIZE = 65536
+
+    FRAME_DATE_OFFSET_IN_BYTES = 8
+    FRAME_SIZE_OFFSET_IN_BYTES = frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES
+
+    #
+    # 2024-01-01 00:00:00, in 1/10^10 seconds.
+    #
+    FIRST_FRAME_DATE = 1704067200 * 10**10
+
+    def __init__(self, distribution: str="mixed", seed: int=0):
+        self.ranges = CaptureGenerator.DISTRIBUTIONS[distribution]
+        self.random = numpy.random.default_rng(seed)
+        self.frame_date = CaptureGenerator.FIRST_FRAME_DATE
+
+    def generate_sizes(self, nbr_of_frames: int) -> numpy.ndarray:
+        """
+            Draws the frame sizes of a chunk of frames.
+        """
+
+        weights = numpy.array([ weight for _, _, weight in self.ranges ], dtype=numpy.float64)
+        choices = self.random.choice(len(self.ranges), size=nbr_of_frames, p=weights / weights.sum())
+
+        lows = numpy.array([ low for low, _, _ in self.ranges ], dtype=numpy.int64)[choices]
+        highs = numpy.array([ high for _, high, _ in self.ranges ], dtype=numpy.int64)[choices]
+
+        return self.random.integers(lows, highs + 1)
+
+    def generate_chunk(self, nbr_of_frames: int) -> bytes:
+        """
+            Generates a chunk of consecutive frames.
+        """
+
+        sizes = self.generate_sizes(nbr_of_frames)
+        lengths = sizes + frame.Frame.HEADER_SIZE_IN_BYTES
+        offsets = numpy.concatenate(([ 0 ], numpy.cumsum(lengths)[:-1]))
+
+        data = self.random.integers(0, 256, size=int(lengths.sum()), dtype=numpy.uint8)
+
+        #
+        # Writes the increasing frame dates and the frame sizes (big-endian).
+        #
+        frame_dates = self.frame_date + numpy.cumsum(self.random.integers(1, 10**7, size=nbr_of_frames, dtype=numpy.uint64), dtype=numpy.uint64)
+        self.frame_date = int(frame_dates[-1])
+
+        for i, byte in enumerate(frame_dates.astype(">u8").view(numpy.uint8).reshape(-1, 8).T):
+            data[offsets + CaptureGenerator.FRAME_DATE_OFFSET_IN_BYTES + i] = byte
+
+        for i, byte in enumerate(sizes.astype(">u4").view(numpy.uint8).reshape(-1, 4).T):
+            data[offsets + CaptureGenerator.FRAME_SIZE_OFFSET_IN_BYTES + i] = byte
+
+        return data.tobytes()
+
+    def write(self, path_to_file: str, nbr_of_frames: int):
+        """
+            Writes a capture of "nbr_of_frames" frames.
+        """
+
+        with open(path_to_file, "wb") as file:
+            for i in range(0, nbr_of_frames, CaptureGenerator.CHUNK_SIZE):
+                file.write(self.generate_chunk(min(CaptureGenerator.CHUNK_SIZE, nbr_of_frames - i)))
+
+def main():
+    parser = argparse.ArgumentParser(description="writes a synthetic binary capture")
+
+    parser.add_argument("binary", help="binary file to write", metavar="BINARY_FILE")
+    parser.add_argument("--frames", help="number of frames (default: %(default)s)", metavar="N", type=int, default=10000)
+    parser.add_argument("--distribution", help="frame sizes (default: %(default)s)", choices=CaptureGenerator.DISTRIBUTIONS.keys(), default="mixed")
+    parser.add_argument("--seed", help="seed of the random generator (default: %(default)s)", type=int, default=0)
+
+    args = parser.parse_args()
+
+    CaptureGenerator(args.distribution, args.seed).write(args.binary, args.frames)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import benchmarks.generator
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import termcolor
+
+class Harness:
+    """
+        Measures the extractor, stage by stage, on synthetic captures.
+
+        Each stage runs in its own process, so that its peak RSS isn't hidden by another stage:
+          - decode: extract_frames_from_file, without the post-processing,
+          - postprocess: the post-processing (calculate_*) of the decoded batches,
+          - insert: insert_frames_into_db, without the time spent producing the batches.
+
+        With --jobs > 1, the batches are decoded and post-processed by the worker processes:
+        decode then includes the post-processing, and postprocess is skipped.
+    """
+
+    STAGES = [ "decode", "postprocess", "insert" ]
+
+    TEST_NAME = "benchmark"
+    TEST_EXECUTION_DATE = "24-01-01 00-00-00"
+
+    def __init__(self):
+        self.cmd_line_args = None
+
+    def run(self) -> bool:
+        """
+            Runs the benchmarks.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  python3 -m benchmarks.harness --output results.json
+  python3 -m benchmarks.harness --frames 10000 100000 --stages decode insert --output results.json
+
+notes:
+  Captures are generated once in [--workdir], and reused by the next runs.
+  With [--jobs] greater than 1, the post-processing runs in the worker processes: it is part of the decode stage,
+  and the postprocess stage is skipped (listed in "skipped_stages").""")
+
+        parser.add_argument("--frames", help="numbers of frames to measure (default: %(default)s)", metavar="N", type=int, nargs="+", default=[ 10000, 1000000, 10000000 ])
+        parser.add_argument("--distribution", help="frame sizes (default: %(default)s)", choices=benchmarks.generator.CaptureGenerator.DISTRIBUTIONS.keys(), default="mixed")
+        parser.add_argument("--stages", help="stages to measure (default: all)", choices=Harness.STAGES, nargs="+", default=Harness.STAGES)
+        parser.add_argument("--jobs", help="number of processes decoding frames (default: %(default)s)", metavar="N", type=int, default=1)
+        parser.add_argument("--workdir", help="directory of the captures and DBs (default: %(default)s)", metavar="PATH", default=os.path.join(tempfile.gettempdir(), "extractor-benchmarks"))
+        parser.add_argument("--output", help="JSON file receiving the results", metavar="PATH")
+        parser.add_argument("--run-stage", help=argparse.SUPPRESS, nargs=3, metavar=("STAGE", "BINARY_FILE", "PATH_TO_DB"))
+
+        self.cmd_line_args = parser.parse_args()
+
+        #
+        # Measures a single stage (in the process started for it).
+        #
+        if self.cmd_line_args.run_stage != None:
+            print(json.dumps(Harness.run_stage(*self.cmd_line_args.run_stage, self.cmd_line_args.jobs)))
+            return True
+
+        os.makedirs(self.cmd_line_args.workdir, exist_ok=True)
+
+        results = {
+            "commit" : Harness.get_commit(),
+            "date" : datetime.datetime.now().isoformat(timespec="seconds"),
+            "python" : platform.python_version(),
+            "machine" : platform.machine(),
+            "nbr_of_cpus" : os.cpu_count(),
+            "distribution" : self.cmd_line_args.distribution,
+            "jobs" : self.cmd_line_args.jobs,
+            "runs" : [],
+            "skipped_stages" : {},
+        }
+
+        stages = self.cmd_line_args.stages
+
+        if self.cmd_line_args.jobs > 1 and "postprocess" in stages:
+            stages = [ stage for stage in stages if stage != "postprocess" ]
+            results["skipped_stages"]["postprocess"] = "runs in the worker processes with --jobs > 1 (measured as part of decode)"
+
+            print(termcolor.colored("[*]", "blue"), f"{'postprocess':<12} skipped: {results['skipped_stages']['postprocess']}")
+
+        for nbr_of_frames in self.cmd_line_args.frames:
+            path_to_binary = self.get_capture(nbr_of_frames)
+
+            for stage in stages:
+                result = self.measure(stage, path_to_binary)
+
+                if result == None:
+                    print(termcolor.colored("[-]", "red"), f"Error measuring {stage} on {nbr_of_frames} frames")
+                    return False
+
+                results["runs"].append(result)
+
+                print(termcolor.colored("[*]", "blue"), f"{stage:<12} {result['frames']:>10} frames {result['seconds']:>10.3f} s {result['frames_per_second']:>12.0f} frames/s {result['peak_rss_kb']:>10} KiB")
+
+        if self.cmd_line_args.output != None:
+            with open(self.cmd_line_args.output, "w") as file:
+                json.dump(results, file, indent=4)
+
+            print(termcolor.colored("[+]", "yellow"), f"Results written to {self.cmd_line_args.output}")
+
+        return True
+
+    def get_capture(self, nbr_of_frames: int) -> str:
+        """
+            Generates a capture of "nbr_of_frames" frames, unless it was generated by a previous run.
+
+            Return - the path to the capture.
+        """
+
+        path_to_binary = os.path.join(self.cmd_line_args.workdir, f"{self.cmd_line_args.distribution}-{nbr_of_frames}.bin")
+
+        if not os.path.exists(path_to_binary):
+            print(termcolor.colored("[+]", "yellow"), f"Generating {path_to_binary}")
+
+            benchmarks.generator.CaptureGenerator(self.cmd_line_args.distribution).write(path_to_binary + ".tmp", nbr_of_frames)
+            os.replace(path_to_binary + ".tmp", path_to_binary)
+
+        return path_to_binary
+
+    def measure(self, stage: str, path_to_binary: str) -> dict:
+        """
+            Measures a stage in a new process.
+
+            Return - the measures,
+                   - None - in case of error.
+        """
+
+        path_to_db = os.path.join(self.cmd_line_args.workdir, "benchmark.sql")
+
+        if os.path.exists(path_to_db):
+            os.remove(path_to_db)
+
+        process = subprocess.run([ sys.executable, "-m", "benchmarks.harness", "--jobs", str(self.cmd_line_args.jobs), "--run-stage", stage, path_to_binary, path_to_db ],
+                                 cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), stdout=subprocess.PIPE)
+
+        if process.returncode != 0:
+            return None
+
+        result = json.loads(process.stdout.decode().splitlines()[-1])
+        result["binary"] = path_to_binary
+
+        return result
+
+    @staticmethod
+    def run_stage(stage: str, path_to_binary: str, path_to_db: str, nbr_of_jobs: int) -> dict:
+        """
+            Runs a stage of the extractor on a capture, and measures it.
+
+            Return - the measures.
+        """
+
+        import extractor
+
+        ext = extractor.Extractor()
+
+        sys.argv = [ "extractor.py", "--binary", path_to_binary, "--short", Harness.TEST_NAME, Harness.TEST_EXECUTION_DATE, "--jobs", str(nbr_of_jobs) ]
+        if not ext.parse_cmd_line_args():
+            raise ValueError("invalid arguments")
+
+        ext.sql_db.path_to_db = path_to_db
+
+        #
+        # Wraps the measured steps with a stopwatch.
+        #
+        elapsed = 0.0
+        nbr_of_frames = 0
+
+        def timed(function):
+            def wrapper(*args, **kwargs):
+                nonlocal elapsed
+
+                start = time.perf_counter()
+                result = function(*args, **kwargs)
+                elapsed += time.perf_counter() - start
+
+                return result
+
+            return wrapper
+
+        def count(batches):
+            nonlocal nbr_of_frames
+
+            for batch in batches:
+                nbr_of_frames += len(batch)
+                yield batch
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            if stage == "decode":
+                ext.process_batch = lambda batch: batch
+
+                start = time.perf_counter()
+                for batch in count(ext.extract_frames_from_file()):
+                    pass
+                elapsed = time.perf_counter() - start
+
+            elif stage == "postprocess":
+                if nbr_of_jobs > 1:
+                    raise ValueError("the post-processing can't be measured with --jobs > 1")
+
+                ext.process_batch = timed(ext.process_batch)
+
+                for batch in count(ext.extract_frames_from_file()):
+                    pass
+
+            elif stage == "insert":
+                #
+                # The time spent producing the batches is taken off the time of the whole insert.
+                #
+                batches = count(ext.extract_frames_from_file())
+                next_batch = timed(lambda: next(batches, None))
+
+                def produce():
+                    for batch in iter(next_batch, None):
+                        yield batch
+
+                start = time.perf_counter()
+                if not ext.insert_frames_into_db(produce()):
+                    raise RuntimeError("insert failed")
+                elapsed = time.perf_counter() - start - elapsed
+
+        if ext.extraction_error:
+            raise RuntimeError("extraction failed")
+
+        return {
+            "stage" : stage,
+            "frames" : nbr_of_frames,
+            "seconds" : elapsed,
+            "frames_per_second" : nbr_of_frames / elapsed if elapsed > 0 else 0.0,
+            "peak_rss_kb" : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    @staticmethod
+    def get_commit() -> str:
+        """
+            Returns the hash of the checked out commit (None outside of a git repository).
+        """
+
+        try:
+            return subprocess.run([ "git", "rev-parse", "HEAD" ], cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+
+        except Exception:
+            return None
+
+def main():
+    exit(0 if Harness().run() else 1)
+
+if __name__ == "__main__":
+    main()
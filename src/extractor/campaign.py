@@ -0,0 +1,432 @@
+#!/usr/bin/python3
+
+import extractor
+import labels
+import pipeline
+import report
+import sql
+import argparse
+import collections
+import concurrent.futures
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import termcolor
+
+#
+# A binary file of a campaign, and where its test comes from (a report file, or a test name and execution date).
+#
+Capture = collections.namedtuple("Capture", ["binary", "report", "test_name", "test_execution_date"], defaults=[None, None, None])
+
+class Campaign:
+    """
+        Ingests many binary files (and their reports) into one SQL db, in one run.
+
+        Binary files are decoded concurrently by a pool of threads, and all the
+        frames go through a single writer thread owning the SQL connection. A
+        binary file which can't be ingested is reported, and doesn't stop the
+        other ones: each batch is written in a savepoint, so a batch which
+        can't be written only rolls back its own frames.
+    """
+
+    BINARY_PATTERN = "*.bin"
+    REPORT_EXTENSION = ".rep"
+
+    def __init__(self):
+        self.cmd_line_args = None
+        self.sql_db = None
+        self.writer = None
+        self.transfer_functions = None
+        self.results = []
+
+        #
+        # Binary files whose frames are in the current transaction of the writer (not committed yet).
+        #
+        self.uncommitted_captures = set()
+
+    def run(self) -> bool:
+        """
+            Runs the campaign.
+
+            Return - true - if every binary file was ingested,
+                   - false - otherwise.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  {0} --dir /data/campaign --jobs 4
+  {0} --glob "/data/2024-*/**/*.bin" --resume
+  {0} --manifest campaign.csv --results results.json
+  {0} --dir /data/campaign --db /data/db.sql --shard-by month
+
+notes:
+  [--dir], [--glob] and [--manifest] can't be used together.
+  With [--dir] and [--glob], the report of "test.bin" is "test{1}".
+  Each line of a manifest gives a binary file and its report file ("BINARY_FILE,REPORT_FILE"),
+  or a binary file and its test ("BINARY_FILE,TEST_NAME,TEST_EXECUTION_DATE").
+  Relative paths of a manifest start from the directory of the manifest, lines starting with "#" are ignored.
+  Without [--resume], a binary file whose test already has frames in the SQL DB fails at once.
+  A binary file whose frames can't be written fails alone, the frames it wrote before staying ([--resume] continues it).
+  [--shard-by] applies to a new SQL DB only ("db.sql" then keeping the tests, and "db.shards/" the frames).""".format(sys.argv[0], Campaign.REPORT_EXTENSION))
+
+        sources = parser.add_mutually_exclusive_group(required=True)
+        sources.add_argument("--dir", help=f"directory containing the binary files ({Campaign.BINARY_PATTERN})", metavar="DIRECTORY")
+        sources.add_argument("--glob", help="pattern of the binary files (\"**\" matching any directory)", metavar="PATTERN")
+        sources.add_argument("--manifest", help="CSV file listing the binary files and their tests", metavar="MANIFEST_FILE")
+
+        parser.add_argument("--db", help="SQL DB receiving the frames (default: %(default)s)", metavar="PATH_TO_DB", default=sql.SQL().path_to_db)
+        parser.add_argument("--jobs", help="number of binary files decoded at the same time (default: %(default)s)", metavar="N", type=int, default=os.cpu_count())
+        parser.add_argument("--resume", help="continue the ingest of each test from its last committed frame", action="store_true")
+        parser.add_argument("--queue-size", help="number of decoded batches waiting for the SQL db (default: %(default)s)", metavar="NBR_OF_BATCHES", type=int, default=pipeline.SQLWriter.QUEUE_SIZE)
+        parser.add_argument("--results", help="write the result of each binary file as JSON", metavar="PATH_TO_FILE")
+        parser.add_argument("--shard-by", help="write the frames to one SQL DB per test or per month, next to the SQL DB (default: as the SQL DB)", choices=sql.SQL.SHARD_BY)
+
+        self.cmd_line_args = parser.parse_args()
+
+        if self.cmd_line_args.jobs < 1 or self.cmd_line_args.queue_size < 1:
+            print("[--jobs] and [--queue-size] must be greater than 0")
+            print()
+            parser.print_help()
+            return False
+
+        #
+        # Finds the binary files and their tests.
+        #
+        try:
+            captures = self.find_captures()
+
+        except (OSError, ValueError) as error:
+            print(termcolor.colored("[-]", "red"), f"Error reading the list of binary files: {error}")
+            return False
+
+        captures, failures = self.resolve_tests(captures)
+
+        print(termcolor.colored("[+]", "yellow"), f"Ingesting {len(captures) + len(failures)} binary files into {self.cmd_line_args.db}")
+
+        for result in failures:
+            self.add_result(result)
+
+        #
+        # Opens the DB once for the whole campaign.
+        #
+        self.sql_db = sql.SQL(self.cmd_line_args.db, shard_by=self.cmd_line_args.shard_by)
+
+        if not self.sql_db.open_db() or not self.sql_db.begin_ingest() or not self.load_transfer_functions():
+            print(termcolor.colored("[-]", "red"), "Error preparing the SQL db")
+            return False
+
+        first_frames = self.find_first_frames(captures)
+
+        captures, failures = self.find_ingested_captures(captures)
+
+        for result in failures:
+            self.add_result(result)
+
+        #
+        # Decodes the binary files on a pool of threads, the frames being written by a single thread.
+        #
+        self.writer = pipeline.SQLWriter(self.insert_batch_into_db, self.cmd_line_args.queue_size)
+        self.writer.start()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.cmd_line_args.jobs) as executor:
+            pending_captures = [ executor.submit(self.ingest_capture, capture, first_frames.get(capture)) for capture in captures ]
+
+            for pending_capture in concurrent.futures.as_completed(pending_captures):
+                self.add_result(pending_capture.result())
+
+        written = self.writer.close() and self.sql_db.end_ingest()
+
+        #
+        # Only the binary files which had frames in the last transaction lost them.
+        #
+        if not written:
+            print(termcolor.colored("[-]", "red"), "Error inserting frames, the last transaction was rolled back")
+
+            for result in self.results:
+                if Capture(result["binary"], result["report"], result["test_name"], result["test_execution_date"]) in self.uncommitted_captures:
+                    result["ok"] = False
+                    result["error"] = result["error"] or "the frames couldn't be committed"
+
+        #
+        # Sums up the campaign.
+        #
+        nbr_of_failures = len([ result for result in self.results if not result["ok"] ])
+
+        if self.cmd_line_args.results != None:
+            with open(self.cmd_line_args.results, "w") as file:
+                json.dump(self.results, file, indent=4)
+
+        print(termcolor.colored("[+]" if nbr_of_failures == 0 else "[-]", "yellow" if nbr_of_failures == 0 else "red"), \
+              f"{len(self.results) - nbr_of_failures} binary files ingested, {nbr_of_failures} failed")
+
+        return written and nbr_of_failures == 0
+
+    def find_captures(self) -> list:
+        """
+            Lists the binary files of the campaign.
+
+            Return - a list of Capture.
+        """
+
+        if self.cmd_line_args.manifest != None:
+            return Campaign.read_manifest(self.cmd_line_args.manifest)
+
+        if self.cmd_line_args.dir != None:
+            if not os.path.isdir(self.cmd_line_args.dir):
+                raise OSError(f"{self.cmd_line_args.dir} isn't a directory")
+
+            paths_to_binaries = glob.glob(os.path.join(glob.escape(self.cmd_line_args.dir), Campaign.BINARY_PATTERN))
+        else:
+            paths_to_binaries = glob.glob(self.cmd_line_args.glob, recursive=True)
+
+        return [ Capture(path_to_binary, os.path.splitext(path_to_binary)[0] + Campaign.REPORT_EXTENSION) for path_to_binary in sorted(paths_to_binaries) if os.path.isfile(path_to_binary) ]
+
+    @staticmethod
+    def read_manifest(path_to_manifest: str) -> list:
+        """
+            Reads the binary files, and their tests, of a manifest.
+
+            Return - a list of Capture.
+        """
+
+        directory = os.path.dirname(path_to_manifest)
+        captures = []
+
+        with open(path_to_manifest, newline="") as file:
+            for line_number, row in enumerate(csv.reader(file), 1):
+                row = [ value.strip() for value in row ]
+
+                if len(row) == 0 or row[0] == "" or row[0].startswith("#"):
+                    continue
+
+                if len(row) == 2:
+                    captures.append(Capture(os.path.join(directory, row[0]), os.path.join(directory, row[1])))
+                elif len(row) == 3:
+                    captures.append(Capture(os.path.join(directory, row[0]), None, row[1], row[2]))
+                else:
+                    raise ValueError(f"line {line_number} of {path_to_manifest} must give 2 or 3 values")
+
+        return captures
+
+    def resolve_tests(self, captures: list) -> tuple:
+        """
+            Finds the test of each binary file, the report files being parsed concurrently.
+
+            Return - the captures which can be ingested, with their test name and execution date,
+                   - the results of the ones which can't.
+        """
+
+        contexts = report.TestContext.from_reports([ capture.report for capture in captures if capture.report != None ], self.cmd_line_args.jobs)
+
+        resolved_captures = []
+        failures = []
+        for capture in captures:
+            if not os.access(capture.binary, os.R_OK):
+                failures.append(Campaign.make_result(capture, error="the binary file can't be read"))
+
+            elif capture.report == None:
+                resolved_captures.append(capture)
+
+            elif contexts[capture.report] == None:
+                failures.append(Campaign.make_result(capture, error="the test report file can't be read"))
+
+            else:
+                resolved_captures.append(capture._replace(test_name=contexts[capture.report].test_name, test_execution_date=contexts[capture.report].test_execution_date))
+
+        return resolved_captures, failures
+
+    def find_first_frames(self, captures: list) -> dict:
+        """
+            Finds the first frame to ingest of each binary file (after the frames already in the DB, with [--resume]).
+
+            Return - a dict giving, for each capture, its first frame.
+        """
+
+        if not self.cmd_line_args.resume:
+            return {}
+
+        return { capture : self.sql_db.get_next_frame_number(self.sql_db.get_test_id(capture.test_name, capture.test_execution_date)) \
+                 for capture in captures }
+
+    def find_ingested_captures(self, captures: list) -> tuple:
+        """
+            Finds the binary files whose test already has frames in the SQL db (which can only be continued, with [--resume]).
+
+            Return - the captures which can be ingested,
+                   - the results of the ones which can't.
+        """
+
+        if self.cmd_line_args.resume:
+            return captures, []
+
+        new_captures = []
+        failures = []
+        for capture in captures:
+            test_id = self.sql_db.find_test_id(capture.test_name, capture.test_execution_date)
+            nbr_of_frames = 0 if test_id == None else self.sql_db.count_frames(test_id)
+
+            if nbr_of_frames == None:
+                failures.append(Campaign.make_result(capture, error="the test can't be read from the SQL db"))
+            elif nbr_of_frames != 0:
+                failures.append(Campaign.make_result(capture, error=f"the test '{capture.test_name}' ({capture.test_execution_date}) already has {nbr_of_frames} frames in the SQL db, " \
+                                                                    "use [--resume] to continue its ingest"))
+            else:
+                new_captures.append(capture)
+
+        return new_captures, failures
+
+    def load_transfer_functions(self) -> bool:
+        """
+            Reads the transfer functions labelling the frames from the SQL db.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+        try:
+            self.transfer_functions = labels.TransferFunctions.load(self.sql_db.cursor)
+
+        except Exception:
+            return False
+
+        return True
+
+    def ingest_capture(self, capture: Capture, first_frame: int=None, writer: pipeline.SQLWriter=None) -> dict:
+        """
+            Decodes a binary file, and hands its frames to the writer (in a thread of the pool), or to "writer" when given.
+            It stops at the first batch which the writer can't write.
+
+            Return - the result of the binary file.
+        """
+
+        start = time.perf_counter()
+        nbr_of_frames = 0
+
+        if writer == None:
+            writer = self.writer
+
+        #
+        # Set by the writer when a batch of the binary file can't be written.
+        #
+        failed = threading.Event()
+
+        try:
+            #
+            # The test is given as is, and the binary file with "=", so that neither is taken for an option (e.g. when starting with "-").
+            #
+            capture_extractor = extractor.Extractor()
+            capture_extractor.transfer_functions = self.transfer_functions
+            capture_extractor.test_context = report.TestContext(capture.test_name, capture.test_execution_date)
+
+            argv = [ f"--binary={capture.binary}" ]
+            if first_frame != None:
+                argv.append(f"--from-frame={first_frame}")
+
+            if not capture_extractor.parse_cmd_line_args(argv):
+                return Campaign.make_result(capture, error="invalid binary file")
+
+            for batch in capture_extractor.extract_frames_from_file():
+                if not writer.put((batch, capture, failed)) or failed.is_set():
+                    return Campaign.make_result(capture, nbr_of_frames, time.perf_counter() - start, "error inserting frames")
+
+                nbr_of_frames += len(batch)
+
+            #
+            # Waits for the last batches to be written.
+            #
+            if writer.call(lambda: True) == None or failed.is_set():
+                return Campaign.make_result(capture, nbr_of_frames, time.perf_counter() - start, "error inserting frames")
+
+            if capture_extractor.extraction_error:
+                return Campaign.make_result(capture, nbr_of_frames, time.perf_counter() - start, capture_extractor.extraction_error_message)
+
+        except SystemExit:
+            return Campaign.make_result(capture, nbr_of_frames, time.perf_counter() - start, "invalid binary file")
+
+        except Exception as error:
+            return Campaign.make_result(capture, nbr_of_frames, time.perf_counter() - start, str(error) or type(error).__name__)
+
+        return Campaign.make_result(capture, nbr_of_frames, time.perf_counter() - start)
+
+    def insert_batch_into_db(self, batch_of_capture: tuple) -> bool:
+        """
+            Appends a batch of frames of a binary file into the SQL db (in the writer thread), in a savepoint.
+            A batch which can't be written fails its binary file only (its next batches are dropped).
+
+            Return - true - in case of success, or if only the binary file failed,
+                   - false - if the transaction was rolled back.
+        """
+
+        batch, capture, failed = batch_of_capture
+
+        if failed.is_set():
+            return True
+
+        test_id = self.sql_db.get_test_id(batch.test_name, batch.test_execution_date)
+
+        if test_id == None:
+            failed.set()
+            return True
+
+        rows = sql.SQL.batch_to_rows(test_id, batch)
+
+        try:
+            written = self.sql_db.insert_rows_in_savepoint(rows)
+
+        except sql.sqlite3.Error:
+            return False
+
+        if not written:
+            failed.set()
+
+        #
+        # Keeps track of the binary files whose frames aren't committed yet (the rows are committed every "transaction_size" rows,
+        # and attaching a shard commits the transaction before them).
+        #
+        if self.sql_db.nbr_of_uncommitted_rows == 0:
+            self.uncommitted_captures.clear()
+        elif written and self.sql_db.nbr_of_uncommitted_rows == len(rows):
+            self.uncommitted_captures = { capture }
+        elif written:
+            self.uncommitted_captures.add(capture)
+
+        return True
+
+    def add_result(self, result: dict):
+        """
+            Records, and displays, the result of a binary file.
+        """
+
+        self.results.append(result)
+
+        if result["ok"]:
+            print(termcolor.colored("[*]", "blue"), f"{result['binary']}: {result['frames']} frames")
+        else:
+            print(termcolor.colored("[-]", "red"), f"{result['binary']}: {result['error']} ({result['frames']} frames)")
+
+    @staticmethod
+    def make_result(capture: Capture, nbr_of_frames: int=0, seconds: float=0.0, error: str=None) -> dict:
+        """
+            Returns the result of a binary file.
+        """
+
+        return {
+            "binary" : capture.binary,
+            "report" : capture.report,
+            "test_name" : capture.test_name,
+            "test_execution_date" : capture.test_execution_date,
+            "ok" : error == None,
+            "frames" : nbr_of_frames,
+            "seconds" : seconds,
+            "error" : error,
+        }
+
+def main():
+    exit(0 if Campaign().run() else 1)
+
+if __name__ == "__main__":
+    main()
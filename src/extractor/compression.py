@@ -0,0 +1,303 @@
+import bz2
+import collections
+import concurrent.futures
+import gzip
+import lzma
+import mmap
+import os
+import zlib
+
+#
+# First bytes of the compressed files which can be read.
+#
+MAGIC_NUMBERS = {
+    "gzip" : b"\x1f\x8b",
+    "xz" : b"\xfd7zXZ\x00",
+    "bz2" : b"BZh",
+}
+
+OPENERS = {
+    "gzip" : gzip.open,
+    "xz" : lzma.open,
+    "bz2" : bz2.open,
+}
+
+def detect(path_to_file: str) -> str:
+    """
+        Finds how a file is compressed, from its first bytes.
+
+        Return - "gzip", "xz" or "bz2",
+               - None - if the file isn't compressed (or can't be read).
+    """
+
+    try:
+        with open(path_to_file, "rb") as file:
+            header = file.read(max(len(magic_number) for magic_number in MAGIC_NUMBERS.values()))
+
+    except OSError:
+        return None
+
+    for codec, magic_number in MAGIC_NUMBERS.items():
+        if header.startswith(magic_number):
+            return codec
+
+    return None
+
+def open_stream(path_to_file: str, nbr_of_threads: int=1):
+    """
+        Opens a compressed file, to be read decompressed.
+        With several threads, the members of a gzip file are decompressed in parallel.
+
+        Return - a file object.
+    """
+
+    codec = detect(path_to_file)
+
+    if codec == None:
+        raise ValueError(f"{path_to_file} isn't compressed with {', '.join(MAGIC_NUMBERS)}")
+
+    if codec == "gzip" and nbr_of_threads > 1:
+        return ParallelGzipFile(path_to_file, nbr_of_threads)
+
+    return OPENERS[codec](path_to_file, "rb")
+
+class ParallelGzipFile:
+    """
+        Reads a gzip file made of several members (concatenated .gz files,
+        bgzip, pigz --independent, ...), several members being decompressed
+        at once on a pool of threads (zlib releases the GIL).
+
+        Members aren't indexed, so their starts are guessed from the gzip
+        header (magic number, deflate, reserved flags cleared), and each guess
+        is decompressed ahead. A guess is only used when it starts where the
+        previous member ends (and the CRC of a member is checked), so a header
+        inside compressed data is harmless. A member bigger than MEMBER_SIZE
+        isn't kept in memory, it is decompressed again, streamed.
+
+        Nothing is guessed before the first member ends before the end of the
+        file (a gzip file of a single member is only streamed), and the guesses
+        are only decompressed within a few members of the current one (wrong
+        guesses waste less work).
+    """
+
+    MEMBER_HEADER = b"\x1f\x8b\x08"
+
+    #
+    # Flags of the gzip header which must be cleared (FLG bits 5 to 7).
+    #
+    RESERVED_FLAGS = 0xe0
+
+    INPUT_CHUNK_SIZE = 1 << 18
+    OUTPUT_CHUNK_SIZE = 1 << 20
+    MEMBER_SIZE = 16 << 20
+
+    def __init__(self, path_to_file: str, nbr_of_threads: int):
+        self.file = open(path_to_file, "rb")
+        self.map = None
+        self.buffer = memoryview(b"")
+
+        if os.fstat(self.file.fileno()).st_size != 0:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self.map)
+
+        self.nbr_of_threads = nbr_of_threads
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=nbr_of_threads)
+        self.pending_members = collections.deque()
+        self.chunks = self.decompress()
+        self.chunk = b""
+        self.chunk_position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read(self, size: int=-1) -> bytes:
+        """
+            Reads up to "size" decompressed bytes (everything left if "size" is negative).
+
+            Return - the bytes (empty at the end of the file).
+        """
+
+        parts = []
+        nbr_of_bytes = 0
+
+        while size < 0 or nbr_of_bytes < size:
+            if self.chunk_position == len(self.chunk):
+                self.chunk = next(self.chunks, None)
+                self.chunk_position = 0
+
+                if self.chunk == None:
+                    self.chunk = b""
+                    break
+
+                continue
+
+            nbr_of_bytes_to_read = len(self.chunk) - self.chunk_position if size < 0 else min(size - nbr_of_bytes, len(self.chunk) - self.chunk_position)
+
+            parts.append(self.chunk[self.chunk_position:self.chunk_position + nbr_of_bytes_to_read])
+            self.chunk_position += nbr_of_bytes_to_read
+            nbr_of_bytes += nbr_of_bytes_to_read
+
+        return b"".join(parts)
+
+    def close(self):
+        """
+            Stops the threads, and closes the file.
+        """
+
+        for _, pending_member in self.pending_members:
+            pending_member.cancel()
+
+        self.executor.shutdown(wait=True)
+        self.pending_members.clear()
+        self.chunks.close()
+
+        self.buffer.release()
+
+        if self.map != None:
+            self.map.close()
+            self.map = None
+
+        self.file.close()
+
+    def decompress(self):
+        """
+            Decompresses the members, in order.
+
+            Return - a generator of decompressed chunks.
+                     Raises OSError (or zlib.error) if the file is truncated or corrupted.
+        """
+
+        position = 0
+        guesses = self.guess_members()
+        guess = None
+
+        #
+        # Compressed size of the biggest member so far (None until the first member ends).
+        #
+        member_size = None
+
+        while position < len(self.buffer):
+            #
+            # Keeps the threads busy with the next members, within 2 members per thread of the current one.
+            #
+            while member_size != None and len(self.pending_members) < self.nbr_of_threads * 2:
+                if guess == None or guess < position:
+                    guess = next(guesses, None)
+
+                    if guess == None:
+                        break
+
+                    continue
+
+                if guess > position + self.nbr_of_threads * 2 * member_size:
+                    break
+
+                self.pending_members.append((guess, self.executor.submit(ParallelGzipFile.decompress_member, self.buffer, guess, ParallelGzipFile.MEMBER_SIZE)))
+                guess = None
+
+            while len(self.pending_members) != 0 and self.pending_members[0][0] < position:
+                self.pending_members.popleft()[1].cancel()
+
+            if len(self.pending_members) != 0 and self.pending_members[0][0] == position:
+                data, end = self.pending_members.popleft()[1].result()
+
+                if data != None:
+                    yield data
+                    member_size = max(member_size, end - position)
+                    position = end
+                    continue
+
+            #
+            # Zeros may pad the end of a gzip file.
+            #
+            if bytes(self.buffer[position:position + len(ParallelGzipFile.MEMBER_HEADER)]) != ParallelGzipFile.MEMBER_HEADER:
+                if len(self.buffer) - position <= ParallelGzipFile.INPUT_CHUNK_SIZE and bytes(self.buffer[position:]).strip(b"\x00") == b"":
+                    return
+
+                raise OSError(f"not a gzip member at byte {position}")
+
+            #
+            # The member wasn't guessed, or is too big to be kept: it is streamed.
+            #
+            end = yield from ParallelGzipFile.inflate(self.buffer, position)
+            member_size = max(member_size or 0, end - position)
+            position = end
+
+    def guess_members(self):
+        """
+            Finds where members may start (where a gzip header may be).
+
+            Return - a generator of offsets in the compressed file.
+        """
+
+        if self.map == None:
+            return
+
+        position = self.map.find(ParallelGzipFile.MEMBER_HEADER)
+
+        while position != -1:
+            if position + 3 < len(self.map) and self.map[position + 3] & ParallelGzipFile.RESERVED_FLAGS == 0:
+                yield position
+
+            position = self.map.find(ParallelGzipFile.MEMBER_HEADER, position + 1)
+
+    @staticmethod
+    def inflate(buffer, start: int):
+        """
+            Decompresses the member starting at "start", chunk after chunk.
+
+            Return - a generator of decompressed chunks, returning the offset right after the member.
+                     Raises EOFError if the member is truncated, zlib.error if it is corrupted.
+        """
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        position = start
+
+        while not decompressor.eof:
+            compressed_data = buffer[position:position + ParallelGzipFile.INPUT_CHUNK_SIZE]
+
+            if len(compressed_data) == 0:
+                raise EOFError("compressed file ended before the end-of-stream marker was reached")
+
+            data = decompressor.decompress(compressed_data, ParallelGzipFile.OUTPUT_CHUNK_SIZE)
+            position += len(compressed_data) - len(decompressor.unconsumed_tail) - len(decompressor.unused_data)
+
+            if len(data) != 0:
+                yield data
+
+        return position
+
+    @staticmethod
+    def decompress_member(buffer, start: int, max_size: int) -> tuple:
+        """
+            Decompresses a whole member (in a thread of the pool).
+
+            Return - the decompressed member and the offset right after it,
+                   - None, None - if there is no valid member at "start", or if it is bigger than "max_size".
+        """
+
+        chunks = []
+        size = 0
+        member = ParallelGzipFile.inflate(buffer, start)
+
+        try:
+            while True:
+                chunk = next(member)
+                size += len(chunk)
+
+                if size > max_size:
+                    return None, None
+
+                chunks.append(chunk)
+
+        except StopIteration as end:
+            return b"".join(chunks), end.value
+
+        except (zlib.error, EOFError):
+            return None, None
+
+        finally:
+            member.close()
@@ -0,0 +1,493 @@
+#!/usr/bin/python3
+
+import campaign
+import frame
+import frame_index
+import ingestctl
+import pipeline
+import sql
+import stats
+import argparse
+import collections
+import itertools
+import json
+import os
+import queue
+import shutil
+import signal
+import socketserver
+import sys
+import threading
+import termcolor
+
+class Job:
+    """
+        A binary file to ingest, submitted over the control socket or found in the spool directory.
+    """
+
+    def __init__(self, job_id: int, capture: campaign.Capture, spooled: bool=False):
+        self.job_id = job_id
+        self.capture = capture
+        self.spooled = spooled
+        self.result = None
+        self.done = threading.Event()
+
+class Daemon(campaign.Campaign):
+    """
+        Ingests binary files as they come, without paying the start-up cost
+        (numpy, the layout of the frames, the SQL connection) for each of them.
+
+        Binary files come from a spool directory (a binary file and its report,
+        once the binary file stopped growing), or from the control socket (see
+        ingestctl.py). Jobs are decoded by a few threads, and all the frames go
+        through a single writer thread owning the SQL connection. Each job is
+        committed when it ends, and continues its test from its last committed
+        frame, so a binary file can be submitted again after a failure. A batch
+        which can't be written only fails its job (see Campaign), but the jobs
+        running at the same time share a transaction: when it can't be
+        committed, all of them fail.
+    """
+
+    DONE_DIRECTORY = "done"
+    FAILED_DIRECTORY = "failed"
+
+    POLL_INTERVAL = 1.0
+
+    #
+    # Number of results kept for [status].
+    #
+    NBR_OF_RECENT_RESULTS = 20
+
+    #
+    # Marks the end of the jobs, for a worker thread.
+    #
+    END = None
+
+    #
+    # Marks a spooled binary file which is already queued.
+    #
+    QUEUED = "queued"
+
+    def __init__(self):
+        super().__init__()
+
+        self.results = collections.deque(maxlen=Daemon.NBR_OF_RECENT_RESULTS)
+        self.stats = stats.Stats()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.jobs = queue.Queue()
+        self.job_ids = itertools.count(1)
+        self.nbr_of_running_jobs = 0
+        self.spooled_binaries = {}
+        self.server = None
+
+    def run(self) -> bool:
+        """
+            Runs the daemon, until [stop], SIGTERM or SIGINT.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  {0} --spool /data/spool
+  {0} --spool /data/spool --db /data/db.sql --jobs 2
+  {0} --socket /run/extractor.sock
+
+notes:
+  In the spool directory, "test.bin" is ingested once "test{1}" exists and "test.bin" stopped growing,
+  then both files are moved to "{2}/" (or "{3}/"), with the result of the job ("test.json").
+  Binary files submitted over the control socket aren't moved.
+  Jobs are submitted, and the daemon is queried or stopped, with ingestctl.py.
+  [--shard-by] applies to a new SQL DB only ("db.sql" then keeping the tests, and "db.shards/" the frames).""".format(sys.argv[0], campaign.Campaign.REPORT_EXTENSION, Daemon.DONE_DIRECTORY, Daemon.FAILED_DIRECTORY))
+
+        parser.add_argument("--spool", help="directory watched for binary files and their reports", metavar="DIRECTORY")
+        parser.add_argument("--socket", help="control socket (default: %(default)s)", metavar="PATH_TO_SOCKET", default=ingestctl.DEFAULT_SOCKET)
+        parser.add_argument("--db", help="SQL DB receiving the frames (default: %(default)s)", metavar="PATH_TO_DB", default=sql.SQL().path_to_db)
+        parser.add_argument("--jobs", help="number of binary files decoded at the same time (default: %(default)s)", metavar="N", type=int, default=1)
+        parser.add_argument("--queue-size", help="number of decoded batches waiting for the SQL db (default: %(default)s)", metavar="NBR_OF_BATCHES", type=int, default=pipeline.SQLWriter.QUEUE_SIZE)
+        parser.add_argument("--poll-interval", help="seconds between two scans of the spool directory (default: %(default)s)", metavar="SECONDS", type=float, default=Daemon.POLL_INTERVAL)
+        parser.add_argument("--shard-by", help="write the frames to one SQL DB per test or per month, next to the SQL DB (default: as the SQL DB)", choices=sql.SQL.SHARD_BY)
+
+        self.cmd_line_args = parser.parse_args()
+
+        if self.cmd_line_args.jobs < 1 or self.cmd_line_args.queue_size < 1 or self.cmd_line_args.poll_interval <= 0:
+            print("[--jobs], [--queue-size] and [--poll-interval] must be greater than 0")
+            print()
+            parser.print_help()
+            return False
+
+        if self.cmd_line_args.spool != None and not os.path.isdir(self.cmd_line_args.spool):
+            print(f"[--spool] {self.cmd_line_args.spool} isn't a directory")
+            return False
+
+        #
+        # The log of a daemon is usually a file: each line is written at once.
+        #
+        sys.stdout.reconfigure(line_buffering=True)
+
+        #
+        # Warms up the decoder, and opens the DB once for the life of the daemon.
+        #
+        frame.Frame.SPEC.compile()
+
+        self.sql_db = sql.SQL(self.cmd_line_args.db, shard_by=self.cmd_line_args.shard_by)
+        self.sql_db.stats = self.stats
+
+        if not self.sql_db.open_db() or not self.sql_db.begin_ingest() or not self.load_transfer_functions():
+            print(termcolor.colored("[-]", "red"), "Error preparing the SQL db")
+            return False
+
+        if not self.open_socket():
+            return False
+
+        self.writer = pipeline.SQLWriter(self.insert_batch_into_db, self.cmd_line_args.queue_size, self.stats)
+        self.writer.start()
+
+        workers = [ threading.Thread(target=self.work, name=f"worker-{i}", daemon=True) for i in range(self.cmd_line_args.jobs) ]
+        for worker in workers:
+            worker.start()
+
+        threading.Thread(target=self.server.serve_forever, name="control-socket", daemon=True).start()
+
+        signal.signal(signal.SIGTERM, lambda signal_number, stack_frame: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda signal_number, stack_frame: self.stopping.set())
+
+        print(termcolor.colored("[+]", "yellow"), f"Ingesting into {self.cmd_line_args.db}, listening on {self.cmd_line_args.socket}" + \
+              (f", watching {self.cmd_line_args.spool}" if self.cmd_line_args.spool != None else ""))
+
+        #
+        # Scans the spool directory until the daemon is stopped.
+        #
+        while not self.stopping.is_set():
+            if self.cmd_line_args.spool != None:
+                self.scan_spool()
+
+            self.stopping.wait(self.cmd_line_args.poll_interval)
+
+        #
+        # Lets the running jobs end, and cancels the queued ones (spooled binary files stay in the spool).
+        #
+        print(termcolor.colored("[+]", "yellow"), "Stopping")
+
+        self.server.shutdown()
+        self.server.server_close()
+        os.unlink(self.cmd_line_args.socket)
+
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+
+            except queue.Empty:
+                break
+
+            job.result = campaign.Campaign.make_result(job.capture, error="the daemon stopped before ingesting the binary file")
+            job.done.set()
+
+        for worker in workers:
+            self.jobs.put(Daemon.END)
+
+        for worker in workers:
+            worker.join()
+
+        written = self.writer.close() and self.sql_db.end_ingest()
+
+        if not written:
+            print(termcolor.colored("[-]", "red"), "Error inserting frames, the last transaction was rolled back")
+
+        return written
+
+    def open_socket(self) -> bool:
+        """
+            Listens on the control socket (only the user running the daemon can connect).
+            A socket left by a daemon which didn't stop properly is replaced.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        if os.path.exists(self.cmd_line_args.socket):
+            try:
+                ingestctl.Client(self.cmd_line_args.socket).request({ "command" : "status" })
+
+                print(termcolor.colored("[-]", "red"), f"A daemon is already listening on {self.cmd_line_args.socket}")
+                return False
+
+            except (OSError, ValueError):
+                os.unlink(self.cmd_line_args.socket)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = daemon.handle_request(json.loads(line))
+
+                    except (ValueError, TypeError, KeyError, AttributeError) as error:
+                        response = { "ok" : False, "error" : f"invalid request: {error}" }
+
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        try:
+            previous_umask = os.umask(0o177)
+
+            try:
+                self.server = socketserver.ThreadingUnixStreamServer(self.cmd_line_args.socket, Handler)
+
+            finally:
+                os.umask(previous_umask)
+
+        except OSError as error:
+            print(termcolor.colored("[-]", "red"), f"Error listening on {self.cmd_line_args.socket}: {error}")
+            return False
+
+        self.server.daemon_threads = True
+
+        return True
+
+    def handle_request(self, request: dict) -> dict:
+        """
+            Runs a request of the control socket (in a thread of the server).
+
+            Return - the response.
+        """
+
+        if request["command"] == "submit":
+            capture = campaign.Capture(request["binary"], request.get("report"), request.get("test_name"), request.get("test_execution_date"))
+
+            if capture.report == None and (capture.test_name == None or capture.test_execution_date == None):
+                return { "ok" : False, "error" : "a job needs a report file, or a test name and execution date" }
+
+            if self.stopping.is_set():
+                return { "ok" : False, "error" : "the daemon is stopping" }
+
+            job = self.submit(capture)
+
+            if not request.get("wait", False):
+                return { "ok" : True, "job" : job.job_id, "queued_jobs" : self.jobs.qsize() }
+
+            job.done.wait()
+
+            return { "ok" : job.result["ok"], "job" : job.job_id, "result" : job.result, "error" : job.result["error"] }
+
+        if request["command"] == "status":
+            return { "ok" : True, "status" : self.get_status() }
+
+        if request["command"] == "stop":
+            self.stopping.set()
+            return { "ok" : True }
+
+        return { "ok" : False, "error" : f"unknown command: {request['command']}" }
+
+    def submit(self, capture: campaign.Capture, spooled: bool=False) -> Job:
+        """
+            Queues a binary file.
+
+            Return - the job.
+        """
+
+        job = Job(next(self.job_ids), capture, spooled)
+        self.jobs.put(job)
+
+        return job
+
+    def scan_spool(self):
+        """
+            Queues the binary files of the spool directory which have a report, and which stopped growing.
+        """
+
+        try:
+            entries = { entry.name : entry for entry in os.scandir(self.cmd_line_args.spool) if entry.is_file() }
+
+        except OSError as error:
+            print(termcolor.colored("[-]", "red"), f"Error scanning {self.cmd_line_args.spool}: {error}")
+            return
+
+        for name, entry in sorted(entries.items()):
+            stem, extension = os.path.splitext(name)
+            report_name = stem + campaign.Campaign.REPORT_EXTENSION
+
+            if extension != os.path.splitext(campaign.Campaign.BINARY_PATTERN)[1] or report_name not in entries:
+                continue
+
+            try:
+                stat = entry.stat()
+
+            except OSError:
+                continue
+
+            #
+            # A binary file is queued when it didn't change since the previous scan (and only once).
+            #
+            with self.lock:
+                previous_stat = self.spooled_binaries.get(entry.path)
+
+                if previous_stat == Daemon.QUEUED:
+                    continue
+
+                if previous_stat != (stat.st_size, stat.st_mtime_ns):
+                    self.spooled_binaries[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    continue
+
+                self.spooled_binaries[entry.path] = Daemon.QUEUED
+
+            self.submit(campaign.Capture(entry.path, entries[report_name].path), spooled=True)
+
+    def work(self):
+        """
+            Runs the queued jobs (in a worker thread), until the end mark.
+        """
+
+        while True:
+            job = self.jobs.get()
+
+            if job is Daemon.END:
+                return
+
+            with self.lock:
+                self.nbr_of_running_jobs += 1
+
+            #
+            # An unexpected error only fails its job: the worker thread goes on with the next jobs,
+            # and whoever waits for the job (ingestctl.py [--wait]) is always released.
+            #
+            try:
+                try:
+                    with self.stats.timer("jobs"):
+                        job.result = self.ingest_job(job)
+
+                except Exception as error:
+                    job.result = campaign.Campaign.make_result(job.capture, error=str(error) or type(error).__name__)
+
+                finally:
+                    with self.lock:
+                        self.nbr_of_running_jobs -= 1
+
+                with self.lock:
+                    self.stats.count("jobs_done" if job.result["ok"] else "jobs_failed")
+                    self.stats.count("frames", job.result["frames"])
+
+                if job.spooled:
+                    self.archive_spooled_job(job)
+
+                with self.lock:
+                    self.add_result(job.result)
+
+            finally:
+                job.done.set()
+
+    def ingest_job(self, job: Job) -> dict:
+        """
+            Ingests the binary file of a job, from the last committed frame of its test, and commits its frames.
+
+            Return - the result of the job.
+        """
+
+        captures, failures = self.resolve_tests([ job.capture ])
+
+        if len(failures) != 0:
+            return failures[0]
+
+        capture = captures[0]
+        writer = self.writer
+
+        first_frame = writer.call(lambda: self.sql_db.get_next_frame_number(self.sql_db.get_test_id(capture.test_name, capture.test_execution_date)))
+
+        #
+        # Reads the transfer functions again, as they may have changed since the last job (the previous ones are kept otherwise).
+        #
+        writer.call(self.load_transfer_functions)
+
+        if first_frame == None:
+            result = campaign.Campaign.make_result(capture, error="the test can't be read from the SQL db")
+        else:
+            result = self.ingest_capture(capture, first_frame, writer)
+
+        #
+        # The frames of the job are committed, even if the binary file ends badly (submitting it again continues it).
+        # The jobs running at the same time share the transaction: if it can't be committed, the writer is replaced,
+        # and the jobs which handed frames to it fail too, as their frames were rolled back.
+        #
+        if not writer.call(lambda: self.sql_db.flush(commit=True)):
+            result["ok"] = False
+            result["error"] = result["error"] or "the frames couldn't be committed"
+
+            self.restart_writer(writer)
+
+        return result
+
+    def restart_writer(self, failed_writer: pipeline.SQLWriter):
+        """
+            Replaces a writer which failed (its transaction was rolled back), so that the next jobs can be ingested.
+            The failed writer drops the batches still queued, and refuses the next ones.
+        """
+
+        with self.lock:
+            if self.writer is not failed_writer:
+                return
+
+            failed_writer.failed = True
+            failed_writer.close()
+
+            self.writer = pipeline.SQLWriter(self.insert_batch_into_db, self.cmd_line_args.queue_size, self.stats)
+            self.writer.start()
+
+    def archive_spooled_job(self, job: Job):
+        """
+            Moves the binary file of a spooled job, its report (and its index), to "done/" or "failed/", with the result of the job.
+        """
+
+        directory = os.path.join(self.cmd_line_args.spool, Daemon.DONE_DIRECTORY if job.result["ok"] else Daemon.FAILED_DIRECTORY)
+        stem = os.path.splitext(os.path.basename(job.capture.binary))[0]
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+
+            for path in (job.capture.binary, job.capture.report, job.capture.binary + frame_index.FrameIndex.EXTENSION):
+                if path == job.capture.binary or os.path.exists(path):
+                    shutil.move(path, os.path.join(directory, os.path.basename(path)))
+
+            with open(os.path.join(directory, stem + ".json"), "w") as file:
+                json.dump(job.result, file, indent=4)
+
+        except (OSError, TypeError, ValueError) as error:
+            print(termcolor.colored("[-]", "red"), f"Error moving {job.capture.binary} to {directory}: {error}")
+
+        #
+        # The binary file is forgotten even if it couldn't be moved (the next scan of the spool directory submits it again).
+        #
+        finally:
+            with self.lock:
+                self.spooled_binaries.pop(job.capture.binary, None)
+
+    def get_status(self) -> dict:
+        """
+            Returns the queue depth and the throughput of the daemon.
+        """
+
+        with self.lock:
+            ingest_stats = self.stats.to_dict()
+            busy_seconds = self.stats.seconds["jobs"]
+
+            return {
+                "uptime_seconds" : ingest_stats["wall_seconds"],
+                "queued_jobs" : self.jobs.qsize(),
+                "running_jobs" : self.nbr_of_running_jobs,
+                "queued_batches" : self.writer.queue.qsize(),
+                "jobs_done" : ingest_stats["counters"].get("jobs_done", 0),
+                "jobs_failed" : ingest_stats["counters"].get("jobs_failed", 0),
+                "frames" : ingest_stats["counters"].get("frames", 0),
+                "frames_per_second" : ingest_stats["frames_per_second"],
+                "frames_per_busy_second" : ingest_stats["counters"].get("frames", 0) / busy_seconds if busy_seconds > 0 else 0.0,
+                "stages" : ingest_stats["stages"],
+                "recent_results" : list(self.results),
+            }
+
+def main():
+    exit(0 if Daemon().run() else 1)
+
+if __name__ == "__main__":
+    main()
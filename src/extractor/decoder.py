@@ -0,0 +1,140 @@
+import frame
+import struct
+import numpy
+
+class BatchDecoder:
+    """
+        Decodes many Ethernet frames at once into a NumPy structured array.
+
+        Every field of the frame layout is resolved once into a byte position,
+        a shift and a mask, so that a whole batch of frames is decoded with a
+        few column-wide operations instead of one bitstring read per field.
+        These operations are generated from the layout spec (see layout.py).
+    """
+
+    FRAME_SIZE_STRUCT = struct.Struct(">I")
+    FRAME_SIZE_OFFSET_IN_BYTES = frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES
+    FRAME_SIZE_FIELD = frame.Frame.SPEC.frame_size_field
+
+    def __init__(self):
+        #
+        # The position of every field (header and known fields), and the code decoding them, come from the layout spec.
+        #
+        self.layout = [ dict(position) for position in frame.Frame.SPEC.positions ]
+        self.decode_fields = frame.Frame.SPEC.compile().decode_fields
+
+        self.header_fields = self.layout[:frame.Frame.NBR_OF_HEADER_FIELDS]
+        self.body_fields = self.layout[frame.Frame.NBR_OF_HEADER_FIELDS:]
+
+        #
+        # The known fields start right after the header.
+        #
+        for field in self.body_fields:
+            field["end_bit"] -= frame.Frame.HEADER_SIZE_IN_BYTES * 8
+
+        self.body_end_bits = numpy.array([field["end_bit"] for field in self.body_fields], dtype=numpy.uint32)
+        self.nbr_of_bytes_to_read = frame.Frame.NBR_OF_BYTES_BEFORE_MSG
+
+        #
+        # One column per field worth keeping, using the smallest type that fits.
+        #
+        self.dtype = numpy.dtype([ ("offset", numpy.uint64), ("nbr_of_fields", numpy.uint8) ] + \
+                                 [ (field["name"], BatchDecoder.column_type(field["bits"])) for field in self.layout if not field["useless"] ])
+
+    @staticmethod
+    def column_type(bits: int) -> numpy.dtype:
+        """
+            Returns the smallest unsigned type able to hold a field of the given size.
+        """
+
+        for dtype in (numpy.uint8, numpy.uint16, numpy.uint32):
+            if bits <= numpy.iinfo(dtype).bits:
+                return dtype
+
+        return numpy.uint64
+
+    def scan(self, buffer, start: int=0, end: int=None, max_frames: int=None) -> tuple:
+        """
+            Chains through the frame headers to find where each frame starts.
+
+            Return - the offsets of the complete frames found,
+                   - the offset right after the last complete frame.
+        """
+
+        if end == None:
+            end = len(buffer)
+
+        offsets = []
+        position = start
+
+        while position + frame.Frame.HEADER_SIZE_IN_BYTES <= end:
+            if max_frames != None and len(offsets) >= max_frames:
+                break
+
+            frame_size = BatchDecoder.FRAME_SIZE_STRUCT.unpack_from(buffer, position + BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES)[0]
+
+            #
+            # Stops on an incomplete frame.
+            #
+            if position + frame.Frame.HEADER_SIZE_IN_BYTES + frame_size > end:
+                break
+
+            offsets.append(position)
+            position += frame.Frame.HEADER_SIZE_IN_BYTES + frame_size
+
+        return numpy.array(offsets, dtype=numpy.uint64), position
+
+    def decode(self, buffer, offsets: numpy.ndarray, fields: set=None) -> numpy.ndarray:
+        """
+            Decodes the frames starting at the given offsets.
+            When "fields" is given, only these fields (and the frame size) are decoded, the other ones are left to 0.
+
+            Return - a structured array with one record per frame.
+                     Fields which are not part of a frame are set to 0,
+                     "nbr_of_fields" tells how many known fields were read.
+        """
+
+        data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+        records = numpy.zeros(len(offsets), dtype=self.dtype)
+
+        if len(offsets) == 0:
+            return records
+
+        layout = [ field for field in self.layout if not field["useless"] and (fields == None or field["name"] in fields or field["name"] == BatchDecoder.FRAME_SIZE_FIELD) ]
+
+        #
+        # Gathers the bytes of every frame up to the last decoded field (zero padded at the end of the buffer).
+        #
+        nbr_of_bytes_to_read = max(field["first_byte"] + field["nbr_of_bytes"] for field in layout)
+
+        indexes = offsets.astype(numpy.int64)[:, None] + numpy.arange(nbr_of_bytes_to_read, dtype=numpy.int64)
+        out_of_buffer = indexes >= len(data)
+        raw = data[numpy.minimum(indexes, len(data) - 1)]
+        raw[out_of_buffer] = 0
+
+        #
+        # Extracts every field with masks and shifts on whole columns.
+        #
+        self.decode_fields(raw, records, None if fields == None else set(fields) | { BatchDecoder.FRAME_SIZE_FIELD })
+
+        #
+        # Clears the known fields which don't fit in the frame.
+        #
+        records["offset"] = offsets
+        records["nbr_of_fields"] = numpy.searchsorted(self.body_end_bits, records[BatchDecoder.FRAME_SIZE_FIELD].astype(numpy.uint64) * 8, side="right")
+
+        decoded_field_names = { field["name"] for field in layout }
+
+        for i, field in enumerate(self.body_fields):
+            if field["name"] in decoded_field_names:
+                records[field["name"]][records["nbr_of_fields"] <= i] = 0
+
+        return records
+
+    def decode_batch(self, buffer, offsets: numpy.ndarray, first_frame_number: int=0, fields: set=None, frame_numbers: numpy.ndarray=None) -> frame.FrameBatch:
+        """
+            Decodes the frames starting at the given offsets into a FrameBatch
+            (numbered from "first_frame_number", or by "frame_numbers" when they aren't consecutive).
+        """
+
+        return frame.FrameBatch(self.decode(buffer, offsets, fields), first_frame_number=first_frame_number, frame_numbers=frame_numbers)
@@ -1,24 +1,49 @@
 import frame
 import sql
+import decoder
+import reader
+import report
+import parallel
+import compression
+import resync
+import pipeline
+import stats
+import filters
+import labels
 import argparse
+import cProfile
 import os
+import itertools
 import sys
 import termcolor
-import bitstring
-import macaddress
-import datetime
-import re
+import timestamps
+import addresses
+import numpy
 
 class Extractor:
     """
         Represents the extractor.
     """
 
+    BATCH_SIZE = 16384
+
     def __init__(self):
         self.cmd_line_args = None
-        self.all_frames = []
-        self.current_frame = None
+        self.current_batch = None
+        self.test_context = None
+        self.extraction_error = False
+        self.extraction_error_message = None
+        self.fields = None
+        self.filter = None
+        self.decoded_fields = None
+        self.decoder = decoder.BatchDecoder()
         self.sql_db = sql.SQL()
+        self.stats = stats.Stats()
+        self.sql_db.stats = self.stats
+        self.progress = None
+        self.nbr_of_inserted_frames = 0
+        self.resynchronizer = None
+        self.transfer_functions = None
     
     def run(self) -> bool:
         """
@@ -35,28 +60,45 @@ class Extractor:
             return False
         
         #
-        # Extracts the Ethernet frames.
+        # Extracts the Ethernet frames and adds them in the SQL db as they are decoded.
         #
-        print(termcolor.colored("[+]", "yellow"), "Extracting frames")
+        print(termcolor.colored("[+]", "yellow"), f"Extracting frames and adding them to {self.sql_db.path_to_db}")
+
+        if self.cmd_line_args.profile != None:
+            profiler = cProfile.Profile()
+            inserted = profiler.runcall(self.insert_frames_into_db, self.extract_frames_from_file())
+            profiler.dump_stats(self.cmd_line_args.profile)
+        else:
+            inserted = self.insert_frames_into_db(self.extract_frames_from_file())
 
-        if not self.extract_frames_from_file():
-            print(termcolor.colored("[-]", "red"), "Error extracting frames")
-            return False
-        
         #
-        # Adds the frames in the SQL db.
+        # Writes the stats, even when the ingest failed.
         #
-        print(termcolor.colored("[+]", "yellow"), f"Adding frames to {self.sql_db.path_to_db}")
-        
-        if not self.insert_frames_into_db():
+        if self.cmd_line_args.stats != None and not self.stats.save(self.cmd_line_args.stats):
+            print(termcolor.colored("[-]", "red"), f"Error writing the stats to {self.cmd_line_args.stats}")
+
+        #
+        # Reports the corrupted bytes skipped by [--resync].
+        #
+        if self.resynchronizer != None and len(self.resynchronizer.corrupted_ranges) != 0:
+            print(termcolor.colored("[-]", "red"), f"Skipped {len(self.resynchronizer.corrupted_ranges)} corrupted ranges ({self.resynchronizer.get_nbr_of_skipped_bytes()} bytes)")
+
+        if self.resynchronizer != None and self.cmd_line_args.corrupt_report != None and not self.resynchronizer.save(self.cmd_line_args.corrupt_report, self.cmd_line_args.binary):
+            print(termcolor.colored("[-]", "red"), f"Error writing the corrupted ranges to {self.cmd_line_args.corrupt_report}")
+
+        if not inserted:
+            return False
+
+        if self.extraction_error:
+            print(termcolor.colored("[-]", "red"), f"Error extracting frames: {self.extraction_error_message}")
             return False
 
         print(termcolor.colored("[+]", "yellow"), "Done")
         return True
 
-    def parse_cmd_line_args(self) -> bool:
+    def parse_cmd_line_args(self, argv: list=None) -> bool:
         """
-            Parses the cmd line arguments.
+            Parses the cmd line arguments (or "argv", when given).
 
             Return - true - in case of success,
                    - false - in case of error.
@@ -67,15 +109,58 @@ class Extractor:
 examples:
   {0} --binary ethernet.bin --full test.rep
   {0} --binary ethernet.bin --short test_name "YY-MM-DD hh-mm-ss"
+  {0} --binary ethernet.bin --full test.rep --jobs 16
+  {0} --binary ethernet.bin --full test.rep --pipeline
+  {0} --binary ethernet.bin --full test.rep --resume
+  {0} --binary ethernet.bin --short test_name "YY-MM-DD hh-mm-ss" --follow
+  {0} --binary ethernet.bin --full test.rep --stats stats.json --profile ingest.prof
+  {0} --binary ethernet.bin --full test.rep --fields frame_date,MAC_src,MAC_dest,msg_type --where "msg_type in (0x1234, 0x5678)"
+  {0} --binary ethernet.bin --full test.rep --where "MAC_src == aa:bb:cc:dd:ee:ff" --where "frame_date >= 2024-01-01 10:00:00"
+  {0} --binary damaged.bin --full test.rep --resync --max-frame-size 9018 --corrupt-report corrupted.json
+  {0} --binary ethernet.bin --full test.rep --shard-by test
 
 notes:
-  [--full] and [--short] can't be used together.""".format(sys.argv[0]))
+  [--full] and [--short] can't be used together.
+  [--resume], [--from-frame] and [--frame-range] can't be used together.
+  Without [--resume], nothing is written when some of the frames of the test are already in the SQL db.
+  [--profile] only profiles this process, not the ones started by [--jobs].
+  A profile can be read with: python3 -m pstats ingest.prof
+  [--where] can be repeated, a frame is kept when it matches all of them.
+  [--where] supports ==, !=, <, <=, >, >=, in (...) and not in (...), values being written as they are displayed
+  (msg_type in hexa, its fields packed one after the other, as in the SQL db).
+  The fields not listed by [--fields] are left empty in the SQL db.
+  A binary file compressed with gzip, xz or bz2 is decompressed on the fly (it can't be used with [--follow]),
+  with [--jobs], the members of a gzip file are decompressed in parallel.
+  With [--resync], a frame header is corrupted when its frame_size is above [--max-frame-size] or its frame_date
+  is older than the previous frame: the binary file is then searched for the next {1} headers following each other.
+  The frames are numbered without the corrupted ones, and the frame index isn't used.
+  The labelled fields ({2}) get the labels of the transfer functions of the SQL db, read once per run.
+  [--shard-by] applies to a new SQL db only, which then keeps the tests, and the frames in "{3}/",
+  the following runs sharding it the same way.""".format(sys.argv[0], resync.Resynchronizer.NBR_OF_CHAINED_FRAMES, ", ".join(frame.Frame.LABELLED_FIELDS), sql.SQL.get_shards_directory(self.sql_db.path_to_db)))
 
         parser.add_argument("--binary", help="binary file containing frames", metavar="BINARY_FILE", required=True)
         parser.add_argument("--full", help="test report file", metavar="REPORT_FILE")
         parser.add_argument("--short", help="name and execution date of the test", metavar=("TEST_NAME", "TEST_EXECUTION_DATE"), nargs=2)
-
-        args = parser.parse_args()
+        parser.add_argument("--resume", help="continue the ingest of the test from its last committed frame", action="store_true")
+        parser.add_argument("--from-frame", help="first frame to ingest (starting at 0)", metavar="N", type=int)
+        parser.add_argument("--frame-range", help="frames to ingest, from A (included) to B (excluded)", metavar="A:B")
+        parser.add_argument("--follow", help="keep ingesting the frames appended to the binary file, until Ctrl+C", action="store_true")
+        parser.add_argument("--follow-timeout", help="with [--follow], stop when nothing was appended for SECONDS", metavar="SECONDS", type=float)
+        parser.add_argument("--jobs", help="number of processes decoding frames (default: %(default)s)", metavar="N", type=int, default=1)
+        parser.add_argument("--fields", help="comma-separated fields to store (default: all)", metavar="FIELD[,FIELD...]")
+        parser.add_argument("--where", help="keep only the frames matching PREDICATE, like \"MAC_src == aa:bb:cc:dd:ee:ff\"", metavar="PREDICATE", action="append")
+        parser.add_argument("--pipeline", help="decode the next frames while a thread writes to the SQL db", action="store_true")
+        parser.add_argument("--queue-size", help="with [--pipeline], number of decoded batches waiting for the SQL db (default: %(default)s)", metavar="NBR_OF_BATCHES", type=int, default=pipeline.SQLWriter.QUEUE_SIZE)
+        parser.add_argument("--batch-size", help="number of frames per SQL insert (default: %(default)s)", metavar="NBR_OF_FRAMES", type=int, default=self.sql_db.batch_size)
+        parser.add_argument("--transaction-size", help="number of frames per SQL transaction (default: %(default)s)", metavar="NBR_OF_FRAMES", type=int, default=self.sql_db.transaction_size)
+        parser.add_argument("--shard-by", help="write the frames to one SQL db per test or per month, next to the SQL db (default: as the SQL db)", choices=sql.SQL.SHARD_BY)
+        parser.add_argument("--resync", help="skip the corrupted frames, instead of stopping at the first one", action="store_true")
+        parser.add_argument("--max-frame-size", help="with [--resync], biggest plausible frame_size (default: %(default)s)", metavar="NBR_OF_BYTES", type=int, default=resync.Resynchronizer.MAX_FRAME_SIZE)
+        parser.add_argument("--corrupt-report", help="with [--resync], write the corrupted byte ranges as JSON", metavar="PATH_TO_FILE")
+        parser.add_argument("--stats", help="write the time spent per stage and the counters of the run as JSON", metavar="PATH_TO_FILE")
+        parser.add_argument("--profile", help="profile the run with cProfile, and write the profile", metavar="PATH_TO_FILE")
+
+        args = parser.parse_args(argv)
 
         ok = True
 
@@ -90,9 +175,9 @@ notes:
             ok = False
 
         #
-        # Makes sure that either [--short] or [--full] is used.
+        # Makes sure that either [--short] or [--full] is used (unless the test was given, see campaign.py).
         #
-        if args.short == None and args.full == None:
+        if args.short == None and args.full == None and self.test_context == None:
             print("[--short] or [--full] is required")
             ok = False
 
@@ -110,6 +195,98 @@ notes:
             print("[--full] the test report file can't be read")
             ok = False
 
+        #
+        # Checks the frames to ingest.
+        #
+        args.first_frame = 0
+        args.last_frame = None
+
+        if [ args.resume, args.from_frame != None, args.frame_range != None ].count(True) > 1:
+            print("[--resume], [--from-frame] and [--frame-range] can't be used together")
+            ok = False
+
+        if args.from_frame != None:
+            args.first_frame = args.from_frame
+
+        if args.frame_range != None:
+            try:
+                first_frame, last_frame = args.frame_range.split(":")
+                args.first_frame = int(first_frame) if first_frame != "" else 0
+                args.last_frame = int(last_frame) if last_frame != "" else None
+
+            except ValueError:
+                print("[--frame-range] must look like A:B")
+                ok = False
+
+        if args.first_frame < 0 or (args.last_frame != None and args.last_frame < args.first_frame):
+            print("[--from-frame] and [--frame-range] must give a valid range of frames")
+            ok = False
+
+        #
+        # Checks the follow mode.
+        #
+        if args.follow_timeout != None and (not args.follow or args.follow_timeout < 0):
+            print("[--follow-timeout] requires [--follow] and a positive number of seconds")
+            ok = False
+
+        if args.follow and compression.detect(args.binary) != None:
+            print("[--follow] a compressed binary file can't be followed")
+            ok = False
+
+        #
+        # Checks the resynchronization.
+        #
+        if (args.corrupt_report != None or args.max_frame_size != resync.Resynchronizer.MAX_FRAME_SIZE) and not args.resync:
+            print("[--max-frame-size] and [--corrupt-report] require [--resync]")
+            ok = False
+
+        if args.max_frame_size < 0:
+            print("[--max-frame-size] must be a positive number of bytes")
+            ok = False
+
+        #
+        # Checks the number of processes.
+        #
+        if args.jobs < 1:
+            print("[--jobs] must be greater than 0")
+            ok = False
+
+        #
+        # Checks the fields to store and the frames to keep.
+        #
+        fields = None
+        frame_filter = None
+
+        if args.fields != None:
+            fields = { field_name.strip() for field_name in args.fields.split(",") if field_name.strip() != "" }
+            unknown_fields = fields.difference(filters.Predicate.FIELD_NAMES)
+
+            if len(unknown_fields) != 0:
+                print(f"[--fields] unknown fields: {', '.join(sorted(unknown_fields))}")
+                ok = False
+
+        if args.where != None:
+            try:
+                frame_filter = filters.Filter([ filters.Predicate.parse(predicate) for predicate in args.where ])
+
+            except ValueError as error:
+                print(f"[--where] {error}")
+                ok = False
+
+        #
+        # Checks the pipeline.
+        #
+        if args.queue_size < 1:
+            print("[--queue-size] must be greater than 0")
+            ok = False
+
+        #
+        # Checks the SQL batch and transaction sizes.
+        #
+        if args.batch_size < 1 or args.transaction_size < 1:
+            print("[--batch-size] and [--transaction-size] must be greater than 0")
+            ok = False
+
         if not ok:
             print()
             parser.print_help()
@@ -117,98 +294,203 @@ notes:
 
         self.cmd_line_args = args
 
+        self.set_fields_and_filter(fields, frame_filter)
+
+        self.sql_db.batch_size = args.batch_size
+        self.sql_db.transaction_size = args.transaction_size
+        self.sql_db.shard_by = args.shard_by
+
         return True
 
-    def extract_frames_from_file(self) -> bool:
+    def set_fields_and_filter(self, fields: set, frame_filter: filters.Filter):
+        """
+            Chooses the fields to store and the frames to keep, and so the fields to decode.
         """
-            Extracts frames from the binary file.
 
-            Return - true - in case of success,
-                   - false - in case of error.
+        self.fields = fields
+        self.filter = frame_filter
+        self.decoded_fields = None
+
+        if fields != None:
+            self.decoded_fields = set()
+
+            for field_name in fields:
+                self.decoded_fields.update(frame.Frame.DERIVED_FIELDS.get(field_name, (field_name,)))
+
+    def extract_frames_from_file(self):
+        """
+            Extracts frames from the binary file, batch after batch.
+            The file is memory-mapped and only one batch of frames is alive at a time.
+            The SQL db (when open) is only read before the first batch: for the transfer functions, and to find the frames to extract.
+
+            Return - a generator of FrameBatch.
+                     In case of error, it stops and sets "extraction_error" (and "extraction_error_message").
         """
 
+        self.extraction_error = False
+        self.extraction_error_message = None
+
         try:
+            with self.stats.timer("report"):
+                self.resolve_test_context()
+
             #
-            # Reads the binary file bit by bit.
+            # Reads the transfer functions once for the run (unless they were given, see campaign.py).
             #
-            bit_stream = bitstring.ConstBitStream(filename=self.cmd_line_args.binary)
+            if self.transfer_functions == None and self.sql_db.cursor != None:
+                self.transfer_functions = labels.TransferFunctions.load(self.sql_db.cursor)
 
             #
-            # Extracts all frames.
+            # Finds the frames to extract (after the ones already in the DB when resuming).
             #
-            while bit_stream.pos < len(bit_stream):
-                sys.stdout.write("\r" + termcolor.colored("[*]", "blue") + f" {len(self.all_frames) + 1}")
-                sys.stdout.flush()
+            first_frame = self.cmd_line_args.first_frame
+            last_frame = self.cmd_line_args.last_frame
 
-                self.current_frame = frame.Frame()
+            if self.cmd_line_args.resume:
+                first_frame = self.sql_db.get_next_frame_number(self.sql_db.get_test_id(self.test_context.test_name, self.test_context.test_execution_date))
 
-                self.find_test_name_and_execution_date()                
-                
-                #
-                # Reads the header.
-                #
-                for field_name in list(self.current_frame.fields.keys())[:7]:
-                    data = bit_stream.read(self.current_frame.fields[field_name]["bits"])
-
-                    #
-                    # Doesn't set its value if it's useless.
-                    #
-                    if "useless" not in self.current_frame.fields[field_name]:
-                        self.current_frame.fields[field_name]["value"] = data
-                    
-                        #
-                        # Hexa convertion of values.
-                        #
-                        self.current_frame.fields[field_name]["value"] = hex(int(self.current_frame.fields[field_name]["value"].bin, 2))
+                print(termcolor.colored("[+]", "yellow"), f"Resuming from frame {first_frame}")
 
+            #
+            # Stops before inserting anything when some of the frames are already in the DB (they would be rejected).
+            #
+            elif self.sql_db.cursor != None:
+                self.check_frames_not_in_db(first_frame, last_frame)
+
+            if self.cmd_line_args.resync:
+                self.resynchronizer = resync.Resynchronizer(self.cmd_line_args.max_frame_size)
+
+            with reader.open_reader(self.cmd_line_args.binary, self.decoder, use_index=True, nbr_of_threads=self.cmd_line_args.jobs, resynchronizer=self.resynchronizer) as capture:
                 #
-                # Reads the known fields (MACs, IPs, ...).
+                # Reads the frames as they are written, or up to the end of the file.
                 #
-                bit_read_from_frame = 0
-                for field_name in list(self.current_frame.fields.keys())[7:]:
-                    if bit_read_from_frame + self.current_frame.fields[field_name]["bits"] <= int(self.current_frame.fields["frame_size"]["value"], 16) * 8:
-                        bit_read_from_frame += self.current_frame.fields[field_name]["bits"]
-
-                        data = bit_stream.read(self.current_frame.fields[field_name]["bits"])
-
-                        #
-                        # Doesn't set its value if it's useless.
-                        #
-                        if "useless" not in self.current_frame.fields[field_name]:
-                            self.current_frame.fields[field_name]["value"] = data
-                        
-                            #
-                            # Hexa convertion of values.
-                            #
-                            self.current_frame.fields[field_name]["value"] = hex(int(self.current_frame.fields[field_name]["value"].bin, 2))
-                    else:
-                        break
-                
+                if self.cmd_line_args.follow:
+                    batches = capture.follow(Extractor.BATCH_SIZE, first_frame, last_frame, timeout=self.cmd_line_args.follow_timeout)
+                else:
+                    batches = capture.batches(Extractor.BATCH_SIZE, first_frame, last_frame)
+
+                batches = self.stats.timed(batches, "read")
+
                 #
-                # Reads the msg (if any).
+                # Decodes on a pool of processes (the time spent waiting for them, reads included, going to "parallel_decode"), or in this process.
+                # The workers map the binary file, or receive the decompressed frames of a compressed one.
                 #
-                if (bit_read_from_frame / 8) < int(self.current_frame.fields["frame_size"]["value"], 16):
-                    bit_stream.read((int(self.current_frame.fields["frame_size"]["value"], 16) * 8) - bit_read_from_frame)
+                if self.cmd_line_args.jobs > 1:
+                    path_to_file = self.cmd_line_args.binary if isinstance(capture, reader.CaptureReader) else None
+                    batches = self.stats.timed(parallel.decode_batches(batches, path_to_file, self.cmd_line_args.jobs, self.test_context, self.fields, self.filter, self.transfer_functions), "parallel_decode")
+                else:
+                    batches = (self.decode_batch(buffer, offsets, first_frame_number) for buffer, offsets, first_frame_number in batches)
+
+                for batch in batches:
+                    self.stats.count("batches")
+                    self.stats.count("frames", len(batch))
+                    self.stats.count("bytes", len(batch) * frame.Frame.HEADER_SIZE_IN_BYTES + int(batch.columns["frame_size"].sum(dtype=numpy.uint64)))
+
+                    yield batch
 
                 #
-                # Performs some modifications to the values to make them more human-readable.
+                # Makes sure the file doesn't end with an incomplete frame.
                 #
+                if last_frame == None and not self.cmd_line_args.follow and not capture.is_complete():
+                    self.extraction_error = True
+                    self.extraction_error_message = "the binary file ends with an incomplete frame"
+
+                if self.resynchronizer != None:
+                    self.stats.count("corrupted_ranges", len(self.resynchronizer.corrupted_ranges))
+                    self.stats.count("corrupted_bytes", self.resynchronizer.get_nbr_of_skipped_bytes())
+
+        except Exception as error:
+            self.extraction_error = True
+            self.extraction_error_message = str(error) or type(error).__name__
+    
+    def check_frames_not_in_db(self, first_frame: int, last_frame: int):
+        """
+            Makes sure that none of the frames [first_frame, last_frame[ of the test are in the SQL db.
+
+            Raises ValueError otherwise.
+        """
+
+        test_id = self.sql_db.find_test_id(self.test_context.test_name, self.test_context.test_execution_date)
+
+        if test_id == None:
+            return
+
+        nbr_of_frames = self.sql_db.count_frames(test_id, first_frame, last_frame)
+
+        if nbr_of_frames == None:
+            raise ValueError(f"the frames of the test '{self.test_context.test_name}' ({self.test_context.test_execution_date}) can't be read from the SQL db")
+
+        if nbr_of_frames != 0:
+            raise ValueError(f"the test '{self.test_context.test_name}' ({self.test_context.test_execution_date}) already has {nbr_of_frames} of these frames in the SQL db, " \
+                             f"use [--resume] to continue its ingest (or [--frame-range] to ingest other frames)")
+
+    def decode_batch(self, buffer, offsets, first_frame_number: int) -> frame.FrameBatch:
+        """
+            Decodes and post-processes the frames starting at the given offsets (the ones matching [--where]).
+
+            Return - a FrameBatch.
+        """
+
+        frame_numbers = None
+
+        #
+        # Decodes the fields of the filter first, and then only the frames it keeps.
+        #
+        if self.filter != None:
+            with self.stats.timer("filter"):
+                candidates = self.decoder.decode_batch(buffer, offsets, first_frame_number, self.filter.get_fields())
+                matches = self.filter.evaluate(candidates)
+
+                frame_numbers = candidates.get_frame_numbers()[matches]
+                offsets = offsets[matches]
+
+            self.stats.count("rejected_frames", len(candidates) - len(offsets))
+
+        with self.stats.timer("decode"):
+            batch = self.decoder.decode_batch(buffer, offsets, first_frame_number, self.decoded_fields, frame_numbers)
+
+        batch.fields = self.fields
+
+        return self.process_batch(batch)
+
+    def process_batch(self, batch: frame.FrameBatch) -> frame.FrameBatch:
+        """
+            Adds the test to a batch of decoded frames, makes its values human-readable, and labels them.
+
+            Return - the batch.
+        """
+
+        with self.stats.timer("postprocess"):
+            self.current_batch = batch
+
+            self.find_test_name_and_execution_date()
+
+            #
+            # Performs some modifications to the values to make them more human-readable (only for the stored fields).
+            #
+            if batch.is_kept("frame_date"):
                 self.calculate_frame_date()
+
+            if batch.is_kept("packet_date"):
                 self.calculate_packet_date()
-                self.calculate_MACs_and_IPs()
+
+            self.calculate_MACs_and_IPs()
+
+            if batch.is_kept("msg_type"):
                 self.calculate_msg_type()
-                
-                self.all_frames.append(self.current_frame)
 
-        except:
-            return False
+            #
+            # Labels the values of the fields which have transfer functions.
+            #
+            if self.transfer_functions != None:
+                self.transfer_functions.apply(batch)
 
-        print()
-        return True
-    
-    def insert_frames_into_db(self) -> bool:
+        return batch
+
+    def insert_frames_into_db(self, frames) -> bool:
         """
             Appends frames into the SQL db.
+            With [--pipeline], a writer thread inserts the frames while the next ones are decoded.
 
             Return - true - in case of success,
                    - false - in case of error.
@@ -220,134 +502,171 @@ notes:
         if not self.sql_db.open_db():
             return False
         
+        if not self.sql_db.begin_ingest():
+            print(termcolor.colored("[-]", "red"), "Error preparing the SQL db")
+            return False
+
+        #
+        # Inserts all frames, batch after batch, from this thread or from a writer thread.
+        #
+        self.progress = stats.Progress()
+        self.nbr_of_inserted_frames = 0
+
+        writer = None
+
+        try:
+            if self.cmd_line_args.pipeline:
+                #
+                # Reads the first batch before the writer starts, as finding the frames to extract reads the SQL db (see extract_frames_from_file()).
+                #
+                frames = iter(frames)
+                first_batches = list(itertools.islice(frames, 1))
+
+                writer = pipeline.SQLWriter(self.insert_batch_into_db, self.cmd_line_args.queue_size, self.stats)
+                writer.start()
+
+                for batch in itertools.chain(first_batches, frames):
+                    if not writer.put(batch):
+                        break
+
+                if not writer.close():
+                    return False
+            else:
+                for batch in frames:
+                    if not self.insert_batch_into_db(batch):
+                        return False
+
         #
-        # Inserts all frames.
+        # Ctrl+C (the way to stop [--follow]) stops reading the binary file, and the frames decoded so far are still written.
         #
-        i = 1
-        for frame in self.all_frames:
-            sys.stdout.write("\r" + termcolor.colored("[*]", "blue") + f" {i}")
-            sys.stdout.flush()
+        except KeyboardInterrupt:
+            if hasattr(frames, "close"):
+                frames.close()
 
-            if not self.sql_db.insert_frame(frame):
-                print(termcolor.colored("[-]", "red"), "Error inserting frames")
+            self.progress.end_line()
+            print(termcolor.colored("[*]", "blue"), "Interrupted, writing the frames decoded so far")
+
+            if writer != None and not writer.close():
                 return False
-            
-            i += 1
-        
-        print()
+
+            if not self.cmd_line_args.follow:
+                self.extraction_error = True
+                self.extraction_error_message = "interrupted, use [--resume] to continue the ingest"
+
+        if not self.sql_db.end_ingest():
+            self.progress.end_line()
+            print(termcolor.colored("[-]", "red"), "Error inserting frames")
+            return False
+
+        self.progress.finish()
         
         return True
 
+    def insert_batch_into_db(self, batch: frame.FrameBatch) -> bool:
+        """
+            Appends a batch of frames into the SQL db (committed right away in follow mode).
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        test_id = self.sql_db.get_test_id(batch.test_name, batch.test_execution_date)
+
+        if test_id == None:
+            self.progress.end_line()
+            print(termcolor.colored("[-]", "red"), "Error creating the test")
+            return False
+
+        with self.stats.timer("rows"):
+            rows = sql.SQL.batch_to_rows(test_id, batch)
+
+        if not self.sql_db.insert_rows(rows) or (self.cmd_line_args.follow and not self.sql_db.flush(commit=True)):
+            self.progress.end_line()
+            print(termcolor.colored("[-]", "red"), "Error inserting frames")
+            return False
+
+        self.nbr_of_inserted_frames += len(rows)
+
+        self.progress.update(self.nbr_of_inserted_frames)
+
+        return True
+
     def calculate_frame_date(self):
         """
             Calculates the frame date (since 01/01/1970 00:00:00).
+            The "frame_date" column keeps the 1/10^10 seconds, the text is only formatted when it is read.
         """
 
-        #
-        # Calculates.
-        #
-        epoch = datetime.datetime(1970, 1, 1)
-        sec = datetime.timedelta(seconds=int(self.current_frame.fields["frame_date"]["value"], 16) / (10**10))
-
-        self.current_frame.fields["frame_date"]["value"] = (epoch + sec).strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.current_batch.values["frame_date"] = frame.LazyValues(self.current_batch.columns["frame_date"], self.current_batch.is_present("frame_date"), timestamps.format_frame_dates)
 
     def calculate_packet_date(self):
         """
             Calculates the packet date (since 01/01/2000 12:00:00).
+            The "packet_date" column counts 1/2^16 seconds, the text is only formatted when it is read.
         """
 
-        #
-        # Makes sure all fields have a value.
-        #
-        for field_name in [ "field_33", "field_34", "field_35" ]:
-            if self.current_frame.fields[field_name]["value"] == "":
-                return
-
-        #
-        # Calculates.
-        #
-        epoch = datetime.datetime(2000, 1, 1, 12)
-        sec = datetime.timedelta(seconds=int(self.current_frame.fields["field_33"]["value"], 16) \
-                                + int(self.current_frame.fields["field_34"]["value"], 16) \
-                                + int(self.current_frame.fields["field_35"]["value"], 16) * (1/(2**16)))
-
-        self.current_frame.packet_date = (epoch + sec).strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.current_batch.values["packet_date"] = frame.LazyValues(self.current_batch.calculate_derived_column("packet_date"), self.current_batch.is_present("packet_date"), timestamps.format_packet_dates)
 
     def calculate_msg_type(self):
         """
             Calculates the msg type (MT).
+            The "msg_type" column packs the bits of its fields, from the first to the last one,
+            and is displayed in hexa, as stored in the SQL db and as written in [--where].
         """
 
         #
-        # Makes sure all fields have a value.
+        # Only the frames for which all fields have a value get a msg type.
         #
-        for field_name in [ "field_14", "field_18", "field_28", "field_29", "field_30" ]:
-            if self.current_frame.fields[field_name]["value"] == "":
-                return
-
-        self.current_frame.message_type = "0x" + self.current_frame.fields["field_14"]["value"][2:] + \
-                                                self.current_frame.fields["field_18"]["value"][2:] + \
-                                                self.current_frame.fields["field_28"]["value"][2:] + \
-                                                self.current_frame.fields["field_29"]["value"][2:] + \
-                                                self.current_frame.fields["field_30"]["value"][2:] 
+        self.current_batch.values["msg_type"] = frame.LazyValues(self.current_batch.calculate_derived_column("msg_type"), self.current_batch.is_present("msg_type"), frame.format_hex)
 
     def calculate_MACs_and_IPs(self):
         """
             Calculates MACs and IPs.
+            The columns keep the integers, the text is only formatted when it is read.
         """
 
         #
         # Handles MACs.
         #
-        for field_name in [ "MAC_src", "MAC_dest" ]:
-            #
-            # Pads with 0s, to have 12 bytes.
-            #
-            self.current_frame.fields[field_name]["value"] = str.format('0x{:012x}', int(self.current_frame.fields[field_name]["value"], 16))
-            
-            #
-            # From hex to MAC.
-            #
-            self.current_frame.fields[field_name]["value"] = str(macaddress.MAC(self.current_frame.fields[field_name]["value"][2:])).replace("-", ":").lower()
+        for field_name in [ field_name for field_name in [ "MAC_src", "MAC_dest" ] if self.current_batch.is_kept(field_name) ]:
+            self.current_batch.values[field_name] = frame.LazyValues(self.current_batch.columns[field_name], self.current_batch.is_present(field_name), addresses.format_macs)
 
         #
         # Handles IPs.
         #
-        for field_name in [ "IP_src", "IP_dest" ]:
-            self.current_frame.fields[field_name]["value"] = self.current_frame.fields[field_name]["value"][2:]
-            
-            #
-            # From hex to IP.
-            #
-            self.current_frame.fields[field_name]["value"] = '.'.join(str(int(i, 16)) for i in [self.current_frame.fields[field_name]["value"][i:i+2] for i in range(0, len(self.current_frame.fields[field_name]["value"]), 2)])
+        for field_name in [ field_name for field_name in [ "IP_src", "IP_dest" ] if self.current_batch.is_kept(field_name) ]:
+            self.current_batch.values[field_name] = frame.LazyValues(self.current_batch.columns[field_name], self.current_batch.is_present(field_name), addresses.format_ips)
 
-    def find_test_name_and_execution_date(self):
+    def resolve_test_context(self):
         """
-            Finds the name and execution date of the test.
-            And then adds the values to the corresponding fields in the current frame.
+            Finds the name and execution date of the test, once for the whole run (unless it was given, see campaign.py).
         """
 
+        if self.test_context != None:
+            return
+
         #
         # Reads from the cmd line.
         # 
         if self.cmd_line_args.short != None:
-            self.current_frame.test_name = self.cmd_line_args.short[0]
-            self.current_frame.test_execution_date = self.cmd_line_args.short[1]
+            self.test_context = report.TestContext(self.cmd_line_args.short[0], self.cmd_line_args.short[1])
         
         #
         # Reads from report file.
         #
         elif self.cmd_line_args.full:
-            with open(self.cmd_line_args.full) as file:
-                for line in file:
-                    #
-                    # Similar to grep.
-                    #
-                    test_name_match = re.findall("^\\* Test\\s+: (.*)", line)
-                    test_execution_date_match = re.findall("^\\* Execution begin date\\s+: \"(.*)\"", line)
-
-                    if len(test_name_match) == 1:
-                        self.current_frame.test_name = test_name_match[0]
-                   
-                    if len(test_execution_date_match) == 1:
-                        self.current_frame.test_execution_date = test_execution_date_match[0]
+            self.test_context = report.TestContext.from_report(self.cmd_line_args.full)
+
+        else:
+            self.test_context = report.TestContext()
+
+    def find_test_name_and_execution_date(self):
+        """
+            Adds the name and execution date of the test to the current batch of frames.
+        """
+
+        if self.test_context == None:
+            self.resolve_test_context()
+
+        self.current_batch.test_name = self.test_context.test_name
+        self.current_batch.test_execution_date = self.test_context.test_execution_date
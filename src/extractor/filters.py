@@ -0,0 +1,153 @@
+import frame
+import addresses
+import timestamps
+import re
+import numpy
+
+class Predicate:
+    """
+        A condition on a field of the frames, like "MAC_src == aa:bb:cc:dd:ee:ff",
+        "msg_type in (0x1234, 0x5678)" or "frame_date >= 2024-01-01 10:00:00".
+
+        Values are given as they are displayed: MACs, IPs and dates as text,
+        other fields as integers (decimal or hexa). A frame which doesn't have
+        the field never matches.
+    """
+
+    PATTERN = re.compile(r"^\s*(\w+)\s*(==|!=|<=|>=|<|>|not\s+in|in)\s*(.+?)\s*$")
+
+    OPERATORS = {
+        "==" : numpy.equal,
+        "!=" : numpy.not_equal,
+        "<" : numpy.less,
+        "<=" : numpy.less_equal,
+        ">" : numpy.greater,
+        ">=" : numpy.greater_equal,
+        "in" : lambda column, values: numpy.isin(column, values),
+        "not in" : lambda column, values: ~numpy.isin(column, values),
+    }
+
+    FIELD_NAMES = frame.Frame.KEPT_FIELDS + tuple(frame.Frame.DERIVED_FIELDS)
+
+    def __init__(self, field_name: str, operator: str, values: list):
+        self.field_name = field_name
+        self.operator = operator
+        self.values = values
+
+    def __repr__(self) -> str:
+        return f"Predicate({self.field_name!r}, {self.operator!r}, {self.values!r})"
+
+    @staticmethod
+    def parse(text: str):
+        """
+            Reads a predicate like "FIELD OPERATOR VALUE" or "FIELD in (VALUE, ...)".
+
+            Return - a Predicate.
+                     Raises ValueError if the predicate can't be read.
+        """
+
+        match = Predicate.PATTERN.match(text)
+
+        if match == None:
+            raise ValueError(f"invalid predicate: {text}")
+
+        field_name, operator, value = match.groups()
+        operator = " ".join(operator.split())
+
+        if field_name not in Predicate.FIELD_NAMES:
+            raise ValueError(f"unknown field: {field_name}")
+
+        if operator in ("in", "not in"):
+            if not (value.startswith("(") and value.endswith(")")):
+                raise ValueError(f"[{operator}] needs a list of values, like (1, 2): {text}")
+
+            values = [ Predicate.parse_value(field_name, item) for item in value[1:-1].split(",") if item.strip() != "" ]
+        else:
+            values = Predicate.parse_value(field_name, value)
+
+        return Predicate(field_name, operator, values)
+
+    @staticmethod
+    def parse_value(field_name: str, value: str) -> int:
+        """
+            Converts a value, as displayed, into the raw value of a field.
+        """
+
+        value = value.strip().strip("\"'")
+
+        try:
+            if field_name in ("MAC_src", "MAC_dest"):
+                raw_value = addresses.parse_mac(value)
+
+            elif field_name in ("IP_src", "IP_dest"):
+                raw_value = addresses.parse_ip(value)
+
+            elif field_name == "frame_date":
+                raw_value = int(numpy.datetime64(value.replace(" ", "T"), "ns").astype(numpy.int64)) * timestamps.FRAME_DATE_TICKS_PER_NS
+
+            elif field_name == "packet_date":
+                ns = int(numpy.datetime64(value.replace(" ", "T"), "ns").astype(numpy.int64))
+                raw_value = (ns - timestamps.PACKET_DATE_EPOCH_IN_NS) * timestamps.PACKET_DATE_TICKS_PER_SECOND // timestamps.NS_PER_SECOND
+
+            else:
+                raw_value = int(value, 0)
+
+        except ValueError:
+            raise ValueError(f"invalid value for {field_name}: {value}")
+
+        if not 0 <= raw_value < 2**64:
+            raise ValueError(f"out of range value for {field_name}: {value}")
+
+        return raw_value
+
+    def get_fields(self) -> set:
+        """
+            Returns the fields to decode to evaluate the predicate.
+        """
+
+        return set(frame.Frame.DERIVED_FIELDS.get(self.field_name, (self.field_name,)))
+
+    def evaluate(self, batch: frame.FrameBatch) -> numpy.ndarray:
+        """
+            Tells, for each frame of a batch, whether it matches.
+
+            Return - a boolean column.
+        """
+
+        if self.field_name in frame.Frame.DERIVED_FIELDS:
+            column = batch.calculate_derived_column(self.field_name)
+        else:
+            column = batch.columns[self.field_name]
+
+        values = numpy.array(self.values, dtype=numpy.uint64) if isinstance(self.values, list) else numpy.uint64(self.values)
+
+        return batch.is_present(self.field_name) & Predicate.OPERATORS[self.operator](column.astype(numpy.uint64), values)
+
+class Filter:
+    """
+        Keeps the frames matching all its predicates.
+    """
+
+    def __init__(self, predicates: list):
+        self.predicates = predicates
+
+    def get_fields(self) -> set:
+        """
+            Returns the fields to decode to evaluate the filter.
+        """
+
+        return set().union(*[ predicate.get_fields() for predicate in self.predicates ])
+
+    def evaluate(self, batch: frame.FrameBatch) -> numpy.ndarray:
+        """
+            Tells, for each frame of a batch, whether it matches all the predicates.
+
+            Return - a boolean column.
+        """
+
+        matches = numpy.ones(len(batch), dtype=bool)
+
+        for predicate in self.predicates:
+            matches &= predicate.evaluate(batch)
+
+        return matches
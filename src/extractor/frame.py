@@ -1,64 +1,285 @@
+import layout
+import numpy
+
+#
+# Describes a field of the frame layout (shared by all frames, never modified).
+#
+Field = layout.Field
+
 class Frame:
     """
         Represents an Ethernet frame.
     """
 
-    HEADER_SIZE_IN_BYTES = 28
-    NBR_OF_BYTES_BEFORE_MSG = 90
+    #
+    # The layout of the frames, read from layout.json (see layout.py).
+    #
+    SPEC = layout.Layout.load()
+
+    HEADER_SIZE_IN_BYTES = SPEC.header_size_in_bytes
+    NBR_OF_BYTES_BEFORE_MSG = SPEC.nbr_of_bytes_before_msg
+    NBR_OF_HEADER_FIELDS = SPEC.nbr_of_header_fields
+    FRAME_SIZE_OFFSET_IN_BYTES = SPEC.frame_size_offset_in_bytes
+
+    LAYOUT = SPEC.fields
+
+    KEPT_FIELDS = tuple(field.name for field in LAYOUT if not field.useless)
+
+    #
+    # Values calculated from other fields, and the fields they need.
+    #
+    DERIVED_FIELDS = SPEC.derived_fields
+
+    #
+    # Fields whose values may be labelled by transfer functions (see labels.py).
+    #
+    LABELLED_FIELDS = SPEC.labelled_fields
+    FIELD_INDEXES = { field.name : i for i, field in enumerate(LAYOUT) }
 
     def __init__(self):
-        self.fields = {
-            "bench_1" :     { "bits" : 64, "value" : "", "useless" : True },
-            "frame_date" :  { "bits" : 64, "value" : "", }, 
-            "bench_3" :     { "bits" : 32, "value" : "", }, 
-            "bench_4" :     { "bits" : 12, "value" : "", "useless" : True }, 
-            "bench_5" :     { "bits" : 4, "value" : "", }, 
-            "bench_6" :     { "bits" : 16, "value" : "", "useless" : True }, 
-            "frame_size" :  { "bits" : 32, "value" : "", }, 
-            "MAC_dest" :    { "bits" : 48, "value" : "", }, 
-            "MAC_src" :     { "bits" : 48, "value" : "", }, 
-            "field_1" :     { "bits" : 16, "value" : "", }, 
-            "field_2" :     { "bits" : 16, "value" : "", }, 
-            "field_3" :     { "bits" : 16, "value" : "", }, 
-            "field_4" :     { "bits" : 16, "value" : "", }, 
-            "field_5" :     { "bits" : 16, "value" : "", }, 
-            "field_6" :     { "bits" : 8, "value" : "", }, 
-            "field_7" :     { "bits" : 8, "value" : "", "useless" : True }, 
-            "field_8" :     { "bits" : 16, "value" : "", "useless" : True }, 
-            "IP_src" :      { "bits" : 32, "value" : "", }, 
-            "IP_dest" :     { "bits" : 32, "value" : "", }, 
-            "field_9" :     { "bits" : 16, "value" : "", }, 
-            "field_10" :    { "bits" : 16, "value" : "", }, 
-            "field_11" :    { "bits" : 16, "value" : "", }, 
-            "field_12" :    { "bits" : 16, "value" : "", "useless" : True }, 
-            "field_13" :    { "bits" : 3, "value" : "", "useless" : True }, 
-            "field_14" :    { "bits" : 1, "value" : "", }, 
-            "field_15" :    { "bits" : 1, "value" : "", "useless" : True }, 
-            "field_16" :    { "bits" : 3, "value" : "", }, 
-            "field_17" :    { "bits" : 3, "value" : "", }, 
-            "field_18" :    { "bits" : 5, "value" : "", }, 
-            "field_19" :    { "bits" : 2, "value" : "", "useless" : True }, 
-            "field_20" :    { "bits" : 14, "value" : "", }, 
-            "field_21" :    { "bits" : 16, "value" : "", }, 
-            "field_22" :    { "bits" : 4, "value" : "", "useless" : True }, 
-            "field_23" :    { "bits" : 1, "value" : "", }, 
-            "field_24" :    { "bits" : 1, "value" : "", "useless" : True }, 
-            "field_25" :    { "bits" : 1, "value" : "", }, 
-            "field_26" :    { "bits" : 1, "value" : "", }, 
-            "field_27" :    { "bits" : 2, "value" : "", }, 
-            "field_28" :    { "bits" : 6, "value" : "", }, 
-            "field_29" :    { "bits" : 6, "value" : "", }, 
-            "field_30" :    { "bits" : 10, "value" : "", }, 
-            "field_31" :    { "bits" : 8, "value" : "", "useless" : True }, 
-            "field_32" :    { "bits" : 8, "value" : "", }, 
-            "field_33" :    { "bits" : 16, "value" : "", }, 
-            "field_34" :    { "bits" : 16, "value" : "", }, 
-            "field_35" :    { "bits" : 16, "value" : "", }, 
-            "field_36" :    { "bits" : 16, "value" : "", "useless" : True }
-        }
+        self.fields = { field.name : { "bits" : field.bits, "value" : "", "useless" : True } if field.useless else { "bits" : field.bits, "value" : "" } for field in Frame.LAYOUT }
 
         self.message_type = ""
         self.packet_date = ""
 
         self.test_name = ""
         self.test_execution_date = ""
+
+class FrameBatch:
+    """
+        Represents a batch of Ethernet frames, stored column by column.
+
+        Each kept field is a typed NumPy column of raw values, all frames share
+        the immutable Frame.LAYOUT. The derived fields (Frame.DERIVED_FIELDS)
+        are added as columns by the extractor. The human-readable values are
+        stored in "values", one list per field.
+    """
+
+    def __init__(self, records: numpy.ndarray, layout: tuple=Frame.LAYOUT, first_frame_number: int=0, frame_numbers: numpy.ndarray=None):
+        self.layout = layout
+        self.size = len(records)
+        self.first_frame_number = first_frame_number
+        self.frame_numbers = frame_numbers
+        self.offsets = numpy.ascontiguousarray(records["offset"])
+        self.nbr_of_fields = numpy.ascontiguousarray(records["nbr_of_fields"])
+        self.columns = { field.name : numpy.ascontiguousarray(records[field.name]) for field in layout if not field.useless }
+        self.values = {}
+
+        #
+        # Labels of the labelled fields, one object column (None meaning no label) per field having transfer functions.
+        #
+        self.labels = {}
+
+        #
+        # Fields (and derived fields) to store, None meaning all of them (see --fields).
+        #
+        self.fields = None
+
+        self.test_name = ""
+        self.test_execution_date = ""
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self.size
+
+        if not 0 <= index < self.size:
+            raise IndexError("frame index out of range")
+
+        return FrameView(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield FrameView(self, index)
+
+    def get_frame_numbers(self) -> numpy.ndarray:
+        """
+            Returns the number of each frame in the capture (starting at 0).
+            The frames are consecutive, unless their numbers were given (see --where).
+        """
+
+        if self.frame_numbers is not None:
+            return self.frame_numbers
+
+        return numpy.arange(self.first_frame_number, self.first_frame_number + self.size, dtype=numpy.int64)
+
+    def is_kept(self, field_name: str) -> bool:
+        """
+            Tells whether the field is stored.
+        """
+
+        if field_name not in self.columns and field_name not in Frame.DERIVED_FIELDS:
+            return False
+
+        return self.fields == None or field_name in self.fields
+
+    def calculate_derived_column(self, field_name: str) -> numpy.ndarray:
+        """
+            Calculates the column of a derived field from the columns of its fields (once), as given by layout.json:
+              - packet_date: (field_33 + field_34) * 2^16 + field_35, in 1/2^16 seconds since 01/01/2000 12:00:00,
+              - msg_type: the bits of its fields, from the first to the last one.
+
+            Return - the column.
+        """
+
+        if field_name not in self.columns:
+            self.columns[field_name] = Frame.SPEC.compile().DERIVED_FIELDS[field_name](self.columns)
+
+        return self.columns[field_name]
+
+    def is_present(self, field_name: str) -> numpy.ndarray:
+        """
+            Tells, for each frame, whether the field was read from the frame
+            (or, for a derived field, whether all the fields it needs were read).
+
+            Return - a boolean column.
+        """
+
+        #
+        # The known fields are read in order, so the last one needed tells for all of them.
+        #
+        if field_name in Frame.DERIVED_FIELDS:
+            return self.is_present(max(Frame.DERIVED_FIELDS[field_name], key=Frame.FIELD_INDEXES.get))
+
+        index = Frame.FIELD_INDEXES[field_name]
+
+        if index < Frame.NBR_OF_HEADER_FIELDS:
+            return numpy.ones(self.size, dtype=bool)
+
+        return self.nbr_of_fields > index - Frame.NBR_OF_HEADER_FIELDS
+
+    def get_values(self, field_name: str) -> list:
+        """
+            Returns the human-readable values of a field (or of "packet_date" / "msg_type").
+            Falls back to the hexa value of the raw column, "" meaning that the field isn't part of the frame.
+        """
+
+        if field_name in self.values:
+            values = self.values[field_name]
+
+            return values.get_values() if isinstance(values, LazyValues) else values
+
+        if field_name not in self.columns:
+            return [ "" ] * self.size
+
+        return [ hex(value) if present else "" for value, present in zip(self.columns[field_name].tolist(), self.is_present(field_name).tolist()) ]
+
+class LazyValues:
+    """
+        Human-readable values of a column, formatted only when they are read.
+
+        The formatter turns a NumPy column into a list of strings, "" is used
+        for the frames which don't have the field.
+    """
+
+    def __init__(self, column: numpy.ndarray, present: numpy.ndarray, formatter):
+        self.column = column
+        self.present = present
+        self.formatter = formatter
+        self.values = None
+
+    def __len__(self) -> int:
+        return len(self.column)
+
+    def __getitem__(self, index: int) -> str:
+        if self.values != None:
+            return self.values[index]
+
+        if index < 0:
+            index += len(self.column)
+
+        if not self.present[index]:
+            return ""
+
+        return self.formatter(self.column[index:index + 1])[0]
+
+    def __iter__(self):
+        return iter(self.get_values())
+
+    def get_values(self) -> list:
+        """
+            Formats the whole column (once).
+        """
+
+        if self.values == None:
+            self.values = self.formatter(self.column)
+
+            if not self.present.all():
+                self.values = [ value if is_present else "" for value, is_present in zip(self.values, self.present.tolist()) ]
+
+        return self.values
+
+def format_hex(column: numpy.ndarray) -> list:
+    """
+        Formats a column of raw values in hexa, like "0x1234".
+    """
+
+    return [ hex(value) for value in column.tolist() ]
+
+class FrameView:
+    """
+        Gives a per-frame access to a frame of a FrameBatch.
+    """
+
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: FrameBatch, index: int):
+        self.batch = batch
+        self.index = index
+
+    def __getitem__(self, field_name: str) -> str:
+        if field_name in self.batch.values:
+            return self.batch.values[field_name][self.index]
+
+        if field_name not in self.batch.columns or not self.batch.is_present(field_name)[self.index]:
+            return ""
+
+        return hex(int(self.batch.columns[field_name][self.index]))
+
+    def raw(self, field_name: str) -> int:
+        """
+            Returns the raw value of a field.
+
+            Return - the value,
+                   - None - if the field isn't part of the frame.
+        """
+
+        if field_name not in self.batch.columns or not self.batch.is_present(field_name)[self.index]:
+            return None
+
+        return int(self.batch.columns[field_name][self.index])
+
+    @property
+    def message_type(self) -> str:
+        return self["msg_type"]
+
+    @property
+    def packet_date(self) -> str:
+        return self["packet_date"]
+
+    @property
+    def test_name(self) -> str:
+        return self.batch.test_name
+
+    @property
+    def test_execution_date(self) -> str:
+        return self.batch.test_execution_date
+
+    def to_frame(self) -> Frame:
+        """
+            Copies the frame into a standalone Frame.
+        """
+
+        frame = Frame()
+
+        for field_name in Frame.KEPT_FIELDS:
+            frame.fields[field_name]["value"] = self[field_name]
+
+        frame.message_type = self.message_type
+        frame.packet_date = self.packet_date
+        frame.test_name = self.test_name
+        frame.test_execution_date = self.test_execution_date
+
+        return frame
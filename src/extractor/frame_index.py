@@ -0,0 +1,211 @@
+import frame
+import decoder
+import hashlib
+import os
+import struct
+import numpy
+
+class FrameIndex:
+    """
+        Sidecar index of a binary capture, stored next to it ("<capture>.idx").
+
+        It gives, for each frame number, the byte offset and the size of the
+        frame. The index may only cover the beginning of the capture: it is
+        written while the capture is scanned, and completed by later runs. The
+        index is only trusted while the capture has the size and modification
+        time it had when the index was saved, a checksum of the covered part
+        of the capture matches, and sampled frames have their indexed size.
+    """
+
+    EXTENSION = ".idx"
+    MAGIC = b"THALESIX"
+    VERSION = 2
+
+    #
+    # Magic, version, number of frames, end of the covered part, checksum, size and modification time (in ns) of the capture.
+    #
+    HEADER_STRUCT = struct.Struct("<8sIQQ32sQq")
+    ENTRY_DTYPE = numpy.dtype([ ("offset", "<u8"), ("frame_size", "<u4") ])
+
+    #
+    # Number of bytes hashed at the beginning and at the end of the covered part of the capture.
+    #
+    CHECKSUM_SAMPLE_SIZE = 1024 * 1024
+
+    #
+    # Number of frames, spread over the index, whose frame_size is read from the capture before trusting the index.
+    #
+    NBR_OF_SAMPLED_FRAMES = 64
+
+    def __init__(self, path_to_binary: str):
+        self.path_to_binary = path_to_binary
+        self.path_to_index = path_to_binary + FrameIndex.EXTENSION
+        self.file = None
+        self.entries = numpy.zeros(0, dtype=FrameIndex.ENTRY_DTYPE)
+        self.nbr_of_frames = 0
+        self.end = 0
+
+    @staticmethod
+    def checksum(buffer, end: int) -> bytes:
+        """
+            Computes the checksum of the first "end" bytes of a capture.
+            Only the size and both ends of this part are hashed, to keep it cheap on large captures.
+        """
+
+        checksum = hashlib.blake2b(digest_size=32)
+        checksum.update(end.to_bytes(8, "little"))
+        checksum.update(buffer[:min(end, FrameIndex.CHECKSUM_SAMPLE_SIZE)])
+        checksum.update(buffer[max(0, end - FrameIndex.CHECKSUM_SAMPLE_SIZE):end])
+
+        return checksum.digest()
+
+    def get_capture_stat(self) -> tuple:
+        """
+            Returns the size and the modification time (in ns) of the capture.
+        """
+
+        stat = os.stat(self.path_to_binary)
+
+        return stat.st_size, stat.st_mtime_ns
+
+    def matches_sampled_frames(self, buffer) -> bool:
+        """
+            Tells whether sampled frames of the capture (the last one included) have the size given by the index.
+        """
+
+        for frame_number in numpy.unique(numpy.linspace(0, self.nbr_of_frames - 1, min(self.nbr_of_frames, FrameIndex.NBR_OF_SAMPLED_FRAMES), dtype=numpy.int64)).tolist():
+            offset = int(self.entries["offset"][frame_number])
+            frame_size = int(self.entries["frame_size"][frame_number])
+
+            if offset + frame.Frame.HEADER_SIZE_IN_BYTES + frame_size > self.end or \
+                decoder.BatchDecoder.FRAME_SIZE_STRUCT.unpack_from(buffer, offset + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES)[0] != frame_size:
+                return False
+
+        return True
+
+    def open(self, buffer=None) -> bool:
+        """
+            Opens the index, and keeps its entries if they match the capture (given as a buffer).
+            Otherwise, the index is started over.
+
+            Return - true - if the index can be used,
+                   - false - if it can't be written (the capture is then read without index).
+        """
+
+        if buffer == None:
+            buffer = b""
+
+        try:
+            self.file = open(self.path_to_index, "r+b" if os.path.exists(self.path_to_index) else "w+b")
+
+        except OSError:
+            self.file = None
+            return False
+
+        self.nbr_of_frames = 0
+        self.end = 0
+
+        #
+        # Checks that the index matches the capture.
+        #
+        header = self.file.read(FrameIndex.HEADER_STRUCT.size)
+
+        if len(header) == FrameIndex.HEADER_STRUCT.size:
+            magic, version, nbr_of_frames, end, checksum, capture_size, capture_mtime = FrameIndex.HEADER_STRUCT.unpack(header)
+
+            if magic == FrameIndex.MAGIC and version == FrameIndex.VERSION and end <= len(buffer) and \
+                (capture_size, capture_mtime) == self.get_capture_stat() and checksum == FrameIndex.checksum(buffer, end) and \
+                os.path.getsize(self.path_to_index) >= FrameIndex.HEADER_STRUCT.size + nbr_of_frames * FrameIndex.ENTRY_DTYPE.itemsize:
+                self.nbr_of_frames = nbr_of_frames
+                self.end = end
+                self.map_entries()
+
+                if not self.matches_sampled_frames(buffer):
+                    self.nbr_of_frames = 0
+                    self.end = 0
+
+        #
+        # Drops the entries which aren't covered by the header (e.g. after a crash).
+        #
+        self.file.truncate(FrameIndex.HEADER_STRUCT.size + self.nbr_of_frames * FrameIndex.ENTRY_DTYPE.itemsize)
+        self.save(buffer)
+        self.map_entries()
+
+        return True
+
+    def map_entries(self):
+        """
+            Maps the entries of the index into memory.
+        """
+
+        if self.nbr_of_frames == 0:
+            self.entries = numpy.zeros(0, dtype=FrameIndex.ENTRY_DTYPE)
+        else:
+            self.entries = numpy.memmap(self.file, dtype=FrameIndex.ENTRY_DTYPE, mode="r", offset=FrameIndex.HEADER_STRUCT.size, shape=(self.nbr_of_frames,))
+
+    def close(self, buffer=None):
+        """
+            Saves and closes the index.
+        """
+
+        if self.file == None:
+            return
+
+        if buffer != None:
+            self.save(buffer)
+
+        self.entries = numpy.zeros(0, dtype=FrameIndex.ENTRY_DTYPE)
+        self.file.close()
+        self.file = None
+
+    def save(self, buffer):
+        """
+            Writes the header of the index, covering the entries appended so far.
+        """
+
+        self.file.seek(0)
+        self.file.write(FrameIndex.HEADER_STRUCT.pack(FrameIndex.MAGIC, FrameIndex.VERSION, self.nbr_of_frames, self.end, FrameIndex.checksum(buffer, self.end), *self.get_capture_stat()))
+        self.file.flush()
+
+    def append(self, buffer, offsets: numpy.ndarray, end: int):
+        """
+            Appends the frames found right after the covered part of the capture.
+            "end" is the offset right after the last frame.
+        """
+
+        if self.file == None or len(offsets) == 0:
+            return
+
+        entries = numpy.zeros(len(offsets), dtype=FrameIndex.ENTRY_DTYPE)
+        entries["offset"] = offsets
+        entries["frame_size"] = numpy.diff(numpy.append(offsets, numpy.uint64(end))) - frame.Frame.HEADER_SIZE_IN_BYTES
+
+        self.file.seek(FrameIndex.HEADER_STRUCT.size + self.nbr_of_frames * FrameIndex.ENTRY_DTYPE.itemsize)
+        self.file.write(entries.tobytes())
+
+        self.nbr_of_frames += len(offsets)
+        self.end = end
+
+    def get_offsets(self, first_frame: int, last_frame: int) -> numpy.ndarray:
+        """
+            Returns the offsets of the frames [first_frame, last_frame[ (which must be covered by the index).
+        """
+
+        #
+        # Maps the entries appended since the index was opened.
+        #
+        if last_frame > len(self.entries):
+            self.file.flush()
+            self.map_entries()
+
+        return numpy.array(self.entries["offset"][first_frame:last_frame], dtype=numpy.uint64)
+
+    def get_offset(self, frame_number: int) -> int:
+        """
+            Returns the offset of a frame, or the end of the covered part of the capture for the frame right after it.
+        """
+
+        if frame_number == self.nbr_of_frames:
+            return self.end
+
+        return int(self.get_offsets(frame_number, frame_number + 1)[0])
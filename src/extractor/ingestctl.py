@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import termcolor
+
+#
+# Control socket of the ingest daemon, when [--socket] isn't given.
+#
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"extractor-{os.getuid()}.sock")
+
+class Client:
+    """
+        Talks to the ingest daemon (see daemon.py) over its control socket.
+
+        Each request, and each response, is a JSON object on one line. This
+        module only uses the standard library (and termcolor), so submitting a
+        binary file costs a connection, not an interpreter full of numpy.
+    """
+
+    def __init__(self, path_to_socket: str=DEFAULT_SOCKET):
+        self.path_to_socket = path_to_socket
+
+    def request(self, message: dict) -> dict:
+        """
+            Sends a request to the daemon, and waits for its response.
+
+            Return - the response.
+                     Raises OSError if the daemon can't be reached.
+        """
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(self.path_to_socket)
+            connection.sendall(json.dumps(message).encode() + b"\n")
+
+            with connection.makefile("rb") as stream:
+                response = stream.readline()
+
+        if response == b"":
+            raise OSError("the daemon closed the connection")
+
+        return json.loads(response)
+
+    def run(self) -> bool:
+        """
+            Runs a command of the daemon from the command line.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  {0} submit /data/test.bin /data/test.rep
+  {0} submit /data/test.bin --short test_1 "2024-01-01 10:00:00" --wait
+  {0} status
+  {0} stop
+
+notes:
+  [submit] queues the binary file, and returns at once (or, with [--wait], once the frames are committed).""".format(sys.argv[0]))
+
+        parser.add_argument("--socket", help="control socket of the daemon (default: %(default)s)", metavar="PATH_TO_SOCKET", default=DEFAULT_SOCKET)
+
+        commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+        submit = commands.add_parser("submit", help="queue a binary file")
+        submit.add_argument("binary", help="binary file", metavar="PATH_TO_BINARY_FILE")
+        submit.add_argument("report", help="test report file", metavar="PATH_TO_REPORT_FILE", nargs="?")
+        submit.add_argument("--short", help="test name and execution date, instead of a report file", metavar=("TEST_NAME", "TEST_EXECUTION_DATE"), nargs=2)
+        submit.add_argument("--wait", help="wait until the frames are committed", action="store_true")
+
+        commands.add_parser("status", help="display the queue and the throughput of the daemon")
+        commands.add_parser("stop", help="stop the daemon (once the running binary files are ingested)")
+
+        cmd_line_args = parser.parse_args()
+        self.path_to_socket = cmd_line_args.socket
+
+        if cmd_line_args.command == "submit":
+            if (cmd_line_args.report == None) == (cmd_line_args.short == None):
+                print("[submit] needs a report file, or [--short]")
+                print()
+                submit.print_help()
+                return False
+
+            message = { "command" : "submit", "binary" : os.path.abspath(cmd_line_args.binary), "wait" : cmd_line_args.wait }
+
+            if cmd_line_args.report != None:
+                message["report"] = os.path.abspath(cmd_line_args.report)
+            else:
+                message["test_name"], message["test_execution_date"] = cmd_line_args.short
+        else:
+            message = { "command" : cmd_line_args.command }
+
+        try:
+            response = self.request(message)
+
+        except (OSError, ValueError) as error:
+            print(termcolor.colored("[-]", "red"), f"Error reaching the daemon on {self.path_to_socket}: {error}")
+            return False
+
+        if not response["ok"]:
+            print(termcolor.colored("[-]", "red"), response["error"])
+            return False
+
+        if cmd_line_args.command == "submit" and "result" in response:
+            print(termcolor.colored("[+]", "yellow"), f"Job {response['job']}: {response['result']['frames']} frames ingested")
+
+        elif cmd_line_args.command == "submit":
+            print(termcolor.colored("[+]", "yellow"), f"Job {response['job']} queued ({response['queued_jobs']} jobs waiting)")
+
+        elif cmd_line_args.command == "status":
+            print(json.dumps(response["status"], indent=4))
+
+        return True
+
+def main():
+    exit(0 if Client().run() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import frame
+import sql
+import numpy
+
+class TransferFunctions:
+    """
+        Labels of the values of the labelled fields (Frame.LABELLED_FIELDS),
+        as defined by the transfer functions of the SQL DB ("value" being the
+        integer stored in the "frames" table, e.g. 0x1234 for a msg_type).
+
+        The transfer functions are read once, and compiled per field into a
+        lookup applied to whole columns: an array of label numbers indexed by
+        value when the values are small enough (DENSE_LOOKUP_SIZE), or else the
+        sorted values, searched with numpy.searchsorted. Label number 0 means
+        that the value has no label.
+    """
+
+    DENSE_LOOKUP_SIZE = 1 << 16
+
+    def __init__(self, definitions: dict):
+        self.definitions = definitions
+        self.lookups = { field_name : TransferFunctions.compile(labels) for field_name, labels in definitions.items() if len(labels) != 0 }
+
+    def __len__(self) -> int:
+        return len(self.lookups)
+
+    @staticmethod
+    def load(cursor):
+        """
+            Reads the transfer functions of the labelled fields from the SQL DB.
+
+            Return - a TransferFunctions.
+                     Raises sqlite3.Error if they can't be read.
+        """
+
+        definitions = { field_name : {} for field_name in frame.Frame.LABELLED_FIELDS }
+
+        cursor.execute(f"SELECT field_name, value, label FROM {sql.SQL.TRANSFER_FUNCTIONS_TABLE_NAME}")
+
+        for field_name, value, label in cursor.fetchall():
+            if field_name in definitions and value != None and value >= 0:
+                definitions[field_name][value] = label
+
+        return TransferFunctions(definitions)
+
+    @staticmethod
+    def compile(labels: dict) -> tuple:
+        """
+            Compiles the labels of a field (value -> label).
+
+            Return - the lookup ("dense" or "sorted"), its array, and the labels by label number (None first).
+        """
+
+        values = sorted(labels)
+        label_names = numpy.array([ None ] + [ labels[value] for value in values ], dtype=object)
+
+        if values[-1] < TransferFunctions.DENSE_LOOKUP_SIZE:
+            label_numbers = numpy.zeros(values[-1] + 1, dtype=numpy.int32)
+            label_numbers[values] = numpy.arange(1, len(values) + 1, dtype=numpy.int32)
+
+            return "dense", label_numbers, label_names
+
+        return "sorted", numpy.array(values, dtype=numpy.uint64), label_names
+
+    def label(self, field_name: str, column: numpy.ndarray, present: numpy.ndarray) -> numpy.ndarray:
+        """
+            Finds the labels of a column of values (the ones which are present).
+
+            Return - an object column of labels, None meaning no label.
+        """
+
+        kind, lookup, label_names = self.lookups[field_name]
+        column = column.astype(numpy.uint64)
+        label_numbers = numpy.zeros(len(column), dtype=numpy.int32)
+
+        if kind == "dense":
+            in_lookup = present & (column < numpy.uint64(len(lookup)))
+            label_numbers[in_lookup] = lookup[column[in_lookup].astype(numpy.int64)]
+        else:
+            positions = numpy.minimum(numpy.searchsorted(lookup, column), len(lookup) - 1)
+            found = present & (lookup[positions] == column)
+            label_numbers[found] = positions[found] + 1
+
+        return label_names[label_numbers]
+
+    def apply(self, batch: frame.FrameBatch):
+        """
+            Adds the labels of the stored fields which have transfer functions to a batch (in "labels").
+        """
+
+        for field_name in self.lookups:
+            if not batch.is_kept(field_name):
+                continue
+
+            column = batch.calculate_derived_column(field_name) if field_name in frame.Frame.DERIVED_FIELDS else batch.columns[field_name]
+
+            batch.labels[field_name] = self.label(field_name, column, batch.is_present(field_name))
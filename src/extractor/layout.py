@@ -0,0 +1,337 @@
+import ast
+import collections
+import hashlib
+import importlib.util
+import json
+import os
+
+#
+# Describes a field of the frame layout (shared by all frames, never modified).
+#
+Field = collections.namedtuple("Field", [ "name", "bits", "useless" ], defaults=[ False ])
+
+class Layout:
+    """
+        Represents a frame layout, read from a spec file (see layout.json):
+          - the header size, and the field giving the size of the frame after the header,
+          - the fields, in order, with their size in bits ("keep": false for the fields which aren't stored),
+          - the derived fields, calculated from an expression of fields, or by concatenating the bits of fields,
+          - the labelled fields, whose values may be given labels by transfer functions (see labels.py).
+
+        The spec is compiled once into a Python module with one straight-line
+        function decoding all the fields and one function per derived field.
+        The generated module is cached on disk, keyed by the hash of the spec.
+    """
+
+    DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layout.json")
+
+    #
+    # Spec file to use instead of the default one.
+    #
+    SPEC_ENVIRONMENT_VARIABLE = "EXTRACTOR_LAYOUT"
+
+    CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__", "layouts")
+
+    #
+    # Version of the generated code (part of the cache key).
+    #
+    COMPILER_VERSION = 1
+
+    #
+    # Operators allowed in the expression of a derived field.
+    #
+    OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod, ast.LShift, ast.RShift, ast.BitOr, ast.BitAnd, ast.BitXor)
+
+    def __init__(self, spec: dict, spec_hash: str, path_to_spec: str=None):
+        self.path_to_spec = path_to_spec
+        self.hash = spec_hash
+        self.module = None
+
+        try:
+            self.fields = tuple(Field(field["name"], int(field["bits"]), not field.get("keep", True)) for field in spec["fields"])
+            self.header_size_in_bytes = int(spec["header_size_in_bytes"])
+            self.frame_size_field = spec["frame_size_field"]
+            derived_fields = spec.get("derived_fields", [])
+            labelled_fields = tuple(spec.get("labelled_fields", []))
+
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"invalid layout spec {path_to_spec}: {error!r}")
+
+        field_names = [ field.name for field in self.fields ]
+
+        if len(set(field_names)) != len(field_names) or any(not name.isidentifier() for name in field_names) or any(field.bits < 1 or field.bits > 64 for field in self.fields):
+            raise ValueError(f"invalid layout spec {path_to_spec}: field names must be unique identifiers, and fields must have 1 to 64 bits")
+
+        self.positions = self.resolve_positions()
+
+        #
+        # The header must end on a field boundary, and contain the frame size (a 32-bit aligned field).
+        #
+        header_ends = [ position["end_bit"] for position in self.positions ]
+
+        if self.header_size_in_bytes * 8 not in header_ends:
+            raise ValueError(f"invalid layout spec {path_to_spec}: the header doesn't end on a field boundary")
+
+        self.nbr_of_header_fields = header_ends.index(self.header_size_in_bytes * 8) + 1
+        self.nbr_of_bytes_before_msg = (header_ends[-1] + 7) // 8
+
+        frame_size = next((position for position in self.positions[:self.nbr_of_header_fields] if position["name"] == self.frame_size_field), None)
+
+        if frame_size == None or frame_size["bits"] != 32 or frame_size["shift"] != 0 or frame_size["nbr_of_bytes"] != 4:
+            raise ValueError(f"invalid layout spec {path_to_spec}: the frame size must be a byte-aligned 32-bit field of the header")
+
+        self.frame_size_offset_in_bytes = frame_size["first_byte"]
+
+        #
+        # Finds the fields needed by each derived field.
+        #
+        self.derived_fields = {}
+        self.derived_expressions = {}
+
+        for derived_field in derived_fields:
+            name = derived_field["name"]
+
+            if not name.isidentifier() or name in field_names or name in self.derived_fields:
+                raise ValueError(f"invalid layout spec {path_to_spec}: invalid derived field {name}")
+
+            if "concatenate" in derived_field:
+                source_field_names = tuple(derived_field["concatenate"])
+                self.derived_expressions[name] = None
+            else:
+                source_field_names = self.parse_expression(name, derived_field["expression"])
+                self.derived_expressions[name] = derived_field["expression"]
+
+            for source_field_name in source_field_names:
+                if source_field_name not in field_names or self.fields[field_names.index(source_field_name)].useless:
+                    raise ValueError(f"invalid layout spec {path_to_spec}: {name} needs {source_field_name}, which isn't a kept field")
+
+            #
+            # The fields of an expression are listed in the order of the layout (concatenated fields keep their order).
+            #
+            if self.derived_expressions[name] != None:
+                source_field_names = tuple(sorted(source_field_names, key=field_names.index))
+
+            self.derived_fields[name] = source_field_names
+
+        #
+        # Labelled fields must be stored.
+        #
+        for name in labelled_fields:
+            if name not in self.derived_fields and (name not in field_names or self.fields[field_names.index(name)].useless):
+                raise ValueError(f"invalid layout spec {path_to_spec}: {name} can't be labelled, it isn't a kept or derived field")
+
+        self.labelled_fields = labelled_fields
+
+    @staticmethod
+    def load(path_to_spec: str=None):
+        """
+            Reads a spec file (by default, the one given by $EXTRACTOR_LAYOUT, or layout.json).
+
+            Return - a Layout.
+                     Raises ValueError if the spec is invalid.
+        """
+
+        if path_to_spec == None:
+            path_to_spec = os.environ.get(Layout.SPEC_ENVIRONMENT_VARIABLE) or Layout.DEFAULT_SPEC
+
+        with open(path_to_spec, "rb") as file:
+            content = file.read()
+
+        spec_hash = hashlib.sha256(content + f"\ncompiler version {Layout.COMPILER_VERSION}".encode()).hexdigest()
+
+        return Layout(json.loads(content), spec_hash, path_to_spec)
+
+    def resolve_positions(self) -> list:
+        """
+            Resolves the position of every field into a byte position, a shift and a mask.
+
+            Return - one dict per field.
+        """
+
+        positions = []
+
+        bit_offset = 0
+        for field in self.fields:
+            positions.append({
+                "name" : field.name,
+                "bits" : field.bits,
+                "useless" : field.useless,
+                "first_byte" : bit_offset // 8,
+                "nbr_of_bytes" : (bit_offset % 8 + field.bits + 7) // 8,
+                "shift" : (8 - (bit_offset + field.bits) % 8) % 8,
+                "mask" : (1 << field.bits) - 1,
+                "end_bit" : bit_offset + field.bits,
+            })
+
+            bit_offset += field.bits
+
+        return positions
+
+    def parse_expression(self, name: str, expression: str) -> tuple:
+        """
+            Checks the expression of a derived field (integers, fields and arithmetic or bitwise operators).
+
+            Return - the fields used by the expression.
+        """
+
+        try:
+            tree = ast.parse(expression, mode="eval")
+
+        except SyntaxError:
+            raise ValueError(f"invalid layout spec {self.path_to_spec}: invalid expression for {name}")
+
+        source_field_names = []
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                if node.id not in source_field_names:
+                    source_field_names.append(node.id)
+
+            elif isinstance(node, ast.Constant):
+                if not isinstance(node.value, int) or node.value < 0:
+                    raise ValueError(f"invalid layout spec {self.path_to_spec}: only positive integers can be used in the expression of {name}")
+
+            elif not isinstance(node, (ast.Expression, ast.BinOp, ast.Load) + Layout.OPERATORS):
+                raise ValueError(f"invalid layout spec {self.path_to_spec}: {type(node).__name__} can't be used in the expression of {name}")
+
+        return tuple(source_field_names)
+
+    def generate_code(self) -> str:
+        """
+            Generates the Python module decoding the frames of this layout.
+
+            Return - the source code.
+        """
+
+        lines = [
+            f"#",
+            f"# Generated from {os.path.basename(self.path_to_spec or 'a layout spec')} by layout.py, don't edit.",
+            f"#",
+            f"",
+            f"import numpy",
+            f"",
+            f"SPEC_HASH = {self.hash!r}",
+            f"",
+            f"def decode_fields(raw, records, fields=None):",
+            f"    \"\"\"",
+            f"        Decodes the kept fields (or only \"fields\") of the frames gathered in \"raw\" (one row of bytes per frame) into \"records\".",
+            f"    \"\"\"",
+        ]
+
+        for position in self.positions:
+            if position["useless"]:
+                continue
+
+            name, first_byte, nbr_of_bytes, shift, mask = position["name"], position["first_byte"], position["nbr_of_bytes"], position["shift"], position["mask"]
+
+            lines.append("")
+            lines.append(f"    if fields is None or {name!r} in fields:")
+
+            #
+            # Byte-aligned fields of a standard size are read as big-endian integers, the other ones are assembled byte by byte.
+            #
+            if shift == 0 and position["bits"] == nbr_of_bytes * 8 and nbr_of_bytes in (1, 2, 4, 8):
+                if nbr_of_bytes == 1:
+                    lines.append(f"        records[{name!r}] = raw[:, {first_byte}]")
+                else:
+                    lines.append(f"        records[{name!r}] = numpy.ascontiguousarray(raw[:, {first_byte}:{first_byte + nbr_of_bytes}]).view('>u{nbr_of_bytes}')[:, 0]")
+
+            elif nbr_of_bytes == 1 and shift == 0:
+                lines.append(f"        records[{name!r}] = raw[:, {first_byte}] & numpy.uint8({mask:#x})")
+
+            elif nbr_of_bytes == 1:
+                lines.append(f"        records[{name!r}] = (raw[:, {first_byte}] >> numpy.uint8({shift})) & numpy.uint8({mask:#x})")
+
+            else:
+                lines.append(f"        value = raw[:, {first_byte}].astype(numpy.uint64)")
+
+                for i in range(1, nbr_of_bytes):
+                    lines.append(f"        value = (value << numpy.uint64(8)) | raw[:, {first_byte + i}]")
+
+                if shift != 0:
+                    lines.append(f"        value >>= numpy.uint64({shift})")
+
+                lines.append(f"        records[{name!r}] = value & numpy.uint64({mask:#x})")
+
+        bits = { field.name : field.bits for field in self.fields }
+
+        for name, source_field_names in self.derived_fields.items():
+            lines += [
+                "",
+                f"def derive_{name}(columns):",
+                f"    \"\"\"",
+                f"        Calculates {name} from the columns of {', '.join(source_field_names)}.",
+                f"    \"\"\"",
+                "",
+            ]
+
+            if self.derived_expressions[name] == None:
+                lines.append(f"    column = columns[{source_field_names[0]!r}].astype(numpy.uint64)")
+
+                for source_field_name in source_field_names[1:]:
+                    lines.append(f"    column = (column << numpy.uint64({bits[source_field_name]})) | columns[{source_field_name!r}]")
+
+                lines.append("")
+                lines.append("    return column")
+            else:
+                for source_field_name in source_field_names:
+                    lines.append(f"    {source_field_name} = columns[{source_field_name!r}].astype(numpy.uint64)")
+
+                lines.append("")
+                lines.append(f"    return {ast.unparse(UInt64Constants().visit(ast.parse(self.derived_expressions[name], mode='eval')).body)}")
+
+        lines += [
+            "",
+            "DERIVED_FIELDS = {",
+        ] + [ f"    {name!r} : derive_{name}," for name in self.derived_fields ] + [
+            "}",
+            "",
+        ]
+
+        return "\n".join(lines)
+
+    def compile(self):
+        """
+            Returns the module decoding the frames of this layout, generated once per spec (and cached on disk).
+        """
+
+        if self.module != None:
+            return self.module
+
+        module_name = f"layout_{self.hash[:16]}"
+        path_to_module = os.path.join(Layout.CACHE_DIRECTORY, module_name + ".py")
+
+        try:
+            if not os.path.exists(path_to_module):
+                os.makedirs(Layout.CACHE_DIRECTORY, exist_ok=True)
+
+                with open(path_to_module + f".{os.getpid()}.tmp", "w") as file:
+                    file.write(self.generate_code())
+
+                os.replace(path_to_module + f".{os.getpid()}.tmp", path_to_module)
+
+            module_spec = importlib.util.spec_from_file_location(module_name, path_to_module)
+            module = importlib.util.module_from_spec(module_spec)
+            module_spec.loader.exec_module(module)
+
+            if module.SPEC_HASH != self.hash:
+                raise ImportError(f"{path_to_module} doesn't match its spec")
+
+        #
+        # Compiles in memory when the cache can't be used.
+        #
+        except (OSError, ImportError, SyntaxError, AttributeError):
+            module = type(os)(module_name)
+            exec(compile(self.generate_code(), module_name, "exec"), module.__dict__)
+
+        self.module = module
+
+        return module
+
+class UInt64Constants(ast.NodeTransformer):
+    """
+        Turns the integers of an expression into numpy.uint64 (so that the whole expression stays unsigned).
+    """
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        return ast.Call(func=ast.Attribute(value=ast.Name(id="numpy", ctx=ast.Load()), attr="uint64", ctx=ast.Load()), args=[ node ], keywords=[])
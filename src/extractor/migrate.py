@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+
+import frame
+import sql
+import stats
+import argparse
+import datetime
+import sys
+import termcolor
+
+class Migration:
+    """
+        Migrates, in place, a SQL DB of version 1 (TEXT values), 2 (without summary tables) or 3 (without labels) to the current layout.
+    """
+
+    V1_FRAMES_TABLE_NAME = "frames_v1"
+    V1_FRAMES_TABLE_COLUMNS = [ column for column in sql.SQL.FRAMES_TABLE_COLUMNS if column not in ("frame_number", "frame_date_sub_ns") and column not in sql.SQL.LABEL_COLUMNS ]
+
+    BATCH_SIZE = 50000
+
+    def __init__(self):
+        self.cmd_line_args = None
+        self.sql_db = None
+
+    def run(self) -> bool:
+        """
+            Runs the migration.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  {0}
+  {0} --db ../../db.sql --no-vacuum
+
+notes:
+  IPs of version 1 were written without their leading 0s (e.g. 10.0.0.1 as "160.0.0.1"),
+  they are read as written.""".format(sys.argv[0]))
+
+        parser.add_argument("--db", help="SQL DB to migrate (default: %(default)s)", metavar="PATH_TO_DB", default=sql.SQL().path_to_db)
+        parser.add_argument("--no-vacuum", help="don't give the freed space back to the file system", action="store_true")
+
+        self.cmd_line_args = parser.parse_args()
+        self.sql_db = sql.SQL(self.cmd_line_args.db, batch_size=Migration.BATCH_SIZE)
+
+        print(termcolor.colored("[+]", "yellow"), f"Migrating {self.cmd_line_args.db}")
+
+        if not self.migrate():
+            print(termcolor.colored("[-]", "red"), "Error migrating the SQL db")
+            return False
+
+        print(termcolor.colored("[+]", "yellow"), "Done")
+        return True
+
+    def migrate(self) -> bool:
+        """
+            Moves the frames of version 1 aside, creates the current tables and copies the frames into them.
+            An interrupted migration starts over from the frames moved aside.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        try:
+            self.sql_db.conn = sql.sqlite3.connect(self.cmd_line_args.db)
+            self.sql_db.cursor = self.sql_db.conn.cursor()
+
+            if not self.sql_db.has_table(Migration.V1_FRAMES_TABLE_NAME):
+                if self.sql_db.get_schema_version() == sql.SQL.SCHEMA_VERSION:
+                    print(termcolor.colored("[+]", "yellow"), "Already up to date")
+                    return True
+
+                #
+                # Versions 2 and 3 only lack the summary tables and the labels.
+                #
+                if self.sql_db.get_schema_version() in (2, 3):
+                    return self.upgrade()
+
+                if not self.sql_db.has_table(sql.SQL.FRAMES_TABLE_NAME):
+                    return False
+
+                #
+                # Moves the frames aside, and merges the tests which appear twice.
+                #
+                self.sql_db.cursor.execute(f"ALTER TABLE {sql.SQL.FRAMES_TABLE_NAME} RENAME TO {Migration.V1_FRAMES_TABLE_NAME}")
+                self.sql_db.cursor.execute(f"""UPDATE {Migration.V1_FRAMES_TABLE_NAME} SET test_id = (
+                                                    SELECT MIN(duplicate.id) FROM {sql.SQL.TESTS_TABLE_NAME} test
+                                                    JOIN {sql.SQL.TESTS_TABLE_NAME} duplicate ON duplicate.name = test.name AND duplicate.execution_date = test.execution_date
+                                                    WHERE test.id = {Migration.V1_FRAMES_TABLE_NAME}.test_id)""")
+                self.sql_db.cursor.execute(f"DELETE FROM {sql.SQL.TESTS_TABLE_NAME} WHERE id NOT IN (SELECT MIN(id) FROM {sql.SQL.TESTS_TABLE_NAME} GROUP BY name, execution_date)")
+                self.sql_db.conn.commit()
+
+            #
+            # Creates the current tables (emptied if a previous migration was interrupted).
+            #
+            if not self.sql_db.create_tables() or not self.sql_db.execute_query(f"DELETE FROM {sql.SQL.FRAMES_TABLE_NAME}"):
+                return False
+
+            self.sql_db.clear_summaries()
+            self.sql_db.conn.commit()
+
+            #
+            # Copies the frames, numbered in insertion order within each test.
+            #
+            if not self.sql_db.begin_ingest():
+                return False
+
+            reading_cursor = self.sql_db.conn.cursor()
+            reading_cursor.execute(f"""SELECT ROW_NUMBER() OVER (PARTITION BY test_id ORDER BY rowid) - 1, {", ".join(Migration.V1_FRAMES_TABLE_COLUMNS)}
+                                       FROM {Migration.V1_FRAMES_TABLE_NAME} ORDER BY test_id, rowid""")
+
+            progress = stats.Progress()
+
+            nbr_of_frames = 0
+            while True:
+                rows = reading_cursor.fetchmany(Migration.BATCH_SIZE)
+
+                if len(rows) == 0:
+                    break
+
+                if not self.sql_db.insert_rows([ Migration.convert_row(row) for row in rows ]):
+                    return False
+
+                nbr_of_frames += len(rows)
+
+                progress.update(nbr_of_frames)
+
+            progress.finish()
+
+            if not self.sql_db.end_ingest():
+                return False
+
+            #
+            # Drops the frames of version 1.
+            #
+            if not self.sql_db.execute_query(f"DROP TABLE {Migration.V1_FRAMES_TABLE_NAME}"):
+                return False
+
+            if not self.cmd_line_args.no_vacuum and not self.sql_db.execute_query("VACUUM"):
+                return False
+
+        except Exception:
+            return False
+
+        return True
+
+    def upgrade(self) -> bool:
+        """
+            Adds the label columns (empty, as there are no transfer functions yet) to a DB of version 2 or 3,
+            and the summary tables to a DB of version 2.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        for column in sql.SQL.LABEL_COLUMNS:
+            if not self.sql_db.has_column(sql.SQL.FRAMES_TABLE_NAME, column) and \
+                not self.sql_db.execute_query(f"ALTER TABLE {sql.SQL.FRAMES_TABLE_NAME} ADD COLUMN {column} TEXT"):
+                return False
+
+        if self.sql_db.get_schema_version() == 2:
+            print(termcolor.colored("[*]", "blue"), "Calculating the summary tables")
+
+            if not self.sql_db.create_summary_tables() or not self.sql_db.rebuild_summaries():
+                return False
+
+        elif not self.sql_db.has_column(sql.SQL.TEST_SUMMARY_TABLE_NAME, "label_version") and \
+            not self.sql_db.execute_query(f"ALTER TABLE {sql.SQL.TEST_SUMMARY_TABLE_NAME} ADD COLUMN label_version INTEGER NOT NULL DEFAULT 0"):
+            return False
+
+        return self.sql_db.create_tables()
+
+    @staticmethod
+    def convert_row(row: tuple) -> tuple:
+        """
+            Converts a row of version 1 (frame number first) into a row of the current "frames" table.
+        """
+
+        frame_number, test_id, *values = row
+        values = dict(zip(Migration.V1_FRAMES_TABLE_COLUMNS[1:], values))
+
+        converted_values = {}
+        for column, value in values.items():
+            if value == None or value == "":
+                converted_values[column] = None
+            elif column == "frame_date":
+                converted_values[column] = Migration.date_to_ns(value)
+            elif column in ("MAC_src", "MAC_dest"):
+                converted_values[column] = int(value.replace(":", ""), 16)
+            elif column in ("IP_src", "IP_dest"):
+                converted_values[column] = Migration.ip_to_int(value)
+            elif column not in frame.Frame.DERIVED_FIELDS:
+                converted_values[column] = int(value, 16)
+
+        #
+        # Calculates the derived fields again, from the raw fields.
+        #
+        for column, field_names in frame.Frame.DERIVED_FIELDS.items():
+            converted_values[column] = None
+
+            if all(converted_values[field_name] != None for field_name in field_names):
+                if column == "packet_date":
+                    converted_values[column] = ((converted_values["field_33"] + converted_values["field_34"]) << 16) + converted_values["field_35"]
+                else:
+                    converted_values[column] = 0
+                    for field_name in field_names:
+                        converted_values[column] = (converted_values[column] << frame.Frame.LAYOUT[frame.Frame.FIELD_INDEXES[field_name]].bits) | converted_values[field_name]
+
+        converted_values["frame_date_sub_ns"] = None if converted_values["frame_date"] == None else 0
+
+        return (test_id, frame_number) + tuple(converted_values.get(column) for column in sql.SQL.FRAMES_TABLE_COLUMNS[2:])
+
+    @staticmethod
+    def date_to_ns(date: str) -> int:
+        """
+            Converts a frame date of version 1 (microseconds since 01/01/1970 00:00:00, as text) into nanoseconds.
+        """
+
+        return (datetime.datetime.fromisoformat(date) - datetime.datetime(1970, 1, 1)) // datetime.timedelta(microseconds=1) * 1000
+
+    @staticmethod
+    def ip_to_int(ip: str) -> int:
+        """
+            Converts an IP of version 1 into an integer.
+            Version 1 wrote each pair of hexa digits in decimal, without the leading 0s of the IP,
+            so an IP with less than 4 parts is rebuilt from these hexa digits.
+        """
+
+        parts = [ int(part) for part in ip.split(".") ]
+
+        if len(parts) == 4:
+            return (parts[0] << 24) | (parts[1] << 16) | (parts[2] << 8) | parts[3]
+
+        return int("".join(format(part, "02x") for part in parts[:-1]) + format(parts[-1], "x" if parts[-1] < 16 else "02x"), 16)
+
+def main():
+    exit(0 if Migration().run() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import frame
+import reader
+import report
+import collections
+import concurrent.futures
+import signal
+
+#
+# State of a worker process (one extractor and one memory map of the capture per process).
+#
+worker_extractor = None
+worker_capture = None
+
+def init_worker(path_to_file: str, test_context: report.TestContext, fields: set=None, frame_filter=None, transfer_functions=None):
+    """
+        Prepares a worker process: maps the capture (unless the frames are sent with each range) and creates
+        its own extractor (storing "fields", keeping the frames matching "frame_filter", and labelling them with "transfer_functions").
+    """
+
+    global worker_extractor, worker_capture
+
+    #
+    # Ctrl+C is handled by the main process, which stops reading the capture and then the workers (see Extractor.insert_frames_into_db()).
+    #
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    #
+    # Imported here, as the extractor itself depends on this module.
+    #
+    import extractor
+
+    worker_extractor = extractor.Extractor()
+    worker_extractor.test_context = test_context
+    worker_extractor.set_fields_and_filter(fields, frame_filter)
+    worker_extractor.transfer_functions = transfer_functions
+
+    if path_to_file != None:
+        worker_capture = reader.CaptureReader(path_to_file, worker_extractor.decoder)
+        worker_capture.open()
+
+def decode_batch(offsets, first_frame_number: int, buffer=None):
+    """
+        Decodes and post-processes the frames starting at the given offsets (in a worker process),
+        in the capture, or in "buffer" when the frames are sent with the range.
+
+        Return - a FrameBatch.
+    """
+
+    if buffer != None:
+        return worker_extractor.decode_batch(buffer, offsets, first_frame_number)
+
+    #
+    # Maps the capture again if it grew since the worker was started (see --follow).
+    #
+    if int(offsets[-1]) + frame.Frame.NBR_OF_BYTES_BEFORE_MSG > len(worker_capture.buffer):
+        worker_capture.remap()
+
+    return worker_extractor.decode_batch(worker_capture.buffer, offsets, first_frame_number)
+
+def decode_batches(batches, path_to_file: str, nbr_of_jobs: int, test_context: report.TestContext, fields: set=None, frame_filter=None, transfer_functions=None):
+    """
+        Decodes the frames of a capture on a pool of processes.
+
+        The frame boundaries are found by a quick pass over the frame headers
+        of the capture (the "batches" of a CaptureReader), and each range of
+        frames is decoded by a worker. At
+        most 2 ranges per worker are in flight, to keep memory bounded.
+
+        Without "path_to_file" (a compressed capture, see StreamReader), the
+        frames of each range are sent to the worker along with their offsets.
+
+        Return - a generator of FrameBatch, in capture order.
+    """
+
+    pending_batches = collections.deque()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nbr_of_jobs, initializer=init_worker, initargs=(path_to_file, test_context, fields, frame_filter, transfer_functions)) as executor:
+        try:
+            for buffer, offsets, first_frame_number in batches:
+                pending_batches.append(executor.submit(decode_batch, offsets, first_frame_number, None if path_to_file != None else buffer))
+
+                #
+                # Waits for the oldest range when too many are in flight, and hands out the ones already decoded.
+                #
+                if len(pending_batches) >= nbr_of_jobs * 2:
+                    yield pending_batches.popleft().result()
+
+                while len(pending_batches) != 0 and pending_batches[0].done():
+                    yield pending_batches.popleft().result()
+
+            while len(pending_batches) != 0:
+                yield pending_batches.popleft().result()
+
+        finally:
+            for pending_batch in pending_batches:
+                pending_batch.cancel()
@@ -0,0 +1,128 @@
+import stats
+import queue
+import threading
+
+class SQLWriter(threading.Thread):
+    """
+        Writes batches of frames to the SQL db from a dedicated thread, while the
+        caller keeps decoding the next ones.
+
+        Batches go through a bounded queue: "put" blocks while the queue is full,
+        so at most "queue_size" decoded batches wait for the writer.
+        The caller mustn't use the SQL db between "start" and "close", except
+        through "call", which runs a function in the writer thread.
+    """
+
+    QUEUE_SIZE = 4
+
+    #
+    # Marks the end of the batches.
+    #
+    END = None
+
+    def __init__(self, write_batch, queue_size: int=QUEUE_SIZE, ingest_stats: stats.Stats=None):
+        super().__init__(name="sql-writer", daemon=True)
+
+        self.write_batch = write_batch
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = ingest_stats if ingest_stats != None else stats.Stats()
+        self.failed = False
+
+    def run(self):
+        """
+            Writes the queued batches, until the end mark.
+            After an error, the remaining batches are dropped.
+        """
+
+        while True:
+            with self.stats.timer("writer_idle"):
+                batch = self.queue.get()
+
+            if batch is SQLWriter.END:
+                return
+
+            if isinstance(batch, Call):
+                batch.run(None if self.failed else self)
+                continue
+
+            if self.failed:
+                continue
+
+            try:
+                if not self.write_batch(batch):
+                    self.failed = True
+
+            except Exception:
+                self.failed = True
+
+    def put(self, batch) -> bool:
+        """
+            Queues a batch, waiting for the writer if too many batches are queued.
+
+            Return - true - in case of success,
+                   - false - if the writer failed (the batch is dropped).
+        """
+
+        if self.failed:
+            return False
+
+        with self.stats.timer("writer_backpressure"):
+            self.queue.put(batch)
+
+        return True
+
+    def call(self, function):
+        """
+            Runs a function in the writer thread, once the batches already queued are written.
+
+            Return - the result of the function,
+                   - None - if the writer failed.
+        """
+
+        if self.failed:
+            return None
+
+        call = Call(function)
+        self.queue.put(call)
+        call.done.wait()
+
+        return call.result
+
+    def close(self) -> bool:
+        """
+            Waits for the queued batches to be written, and stops the writer.
+
+            Return - true - in case of success,
+                   - false - if the writer failed.
+        """
+
+        self.queue.put(SQLWriter.END)
+        self.join()
+
+        return not self.failed
+
+class Call:
+    """
+        A function to run in the writer thread, and its result.
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.result = None
+        self.done = threading.Event()
+
+    def run(self, writer: SQLWriter):
+        """
+            Runs the function (unless the writer failed), and wakes up the caller.
+            An exception makes the writer fail.
+        """
+
+        try:
+            if writer != None:
+                self.result = self.function()
+
+        except Exception:
+            writer.failed = True
+
+        finally:
+            self.done.set()
@@ -0,0 +1,322 @@
+import sql
+import collections
+import numpy
+
+class Frames:
+    """
+        Frames read from the SQL DB, stored column by column: "columns" holds
+        a NumPy column of integers per field (0 where the value is NULL), or
+        an object column of str per label (None where there is no label), and
+        "present" a boolean column per field telling where it isn't NULL.
+
+        The columns may be shared with the cache of Query, so they are read-only.
+    """
+
+    def __init__(self, columns: dict, present: dict):
+        self.columns = columns
+        self.present = present
+        self.size = len(next(iter(columns.values()))) if len(columns) != 0 else 0
+
+        for column in list(columns.values()) + list(present.values()):
+            column.flags.writeable = False
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, column: str) -> numpy.ndarray:
+        return self.columns[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.columns
+
+    def masked(self, column: str) -> numpy.ma.MaskedArray:
+        """
+            Returns a column, its NULL values being masked.
+        """
+
+        return numpy.ma.masked_array(self.columns[column], mask=~self.present[column])
+
+    def get_size_in_bytes(self) -> int:
+        """
+            Returns the memory used by the columns.
+        """
+
+        return sum(column.nbytes for column in self.columns.values()) + sum(column.nbytes for column in self.present.values())
+
+    @staticmethod
+    def from_rows(rows: list, columns: list):
+        """
+            Converts rows of the "frames" table (one value per column of "columns") into columns.
+
+            Return - a Frames.
+        """
+
+        values_per_column = zip(*rows) if len(rows) != 0 else [ () ] * len(columns)
+
+        frame_columns = {}
+        present = {}
+
+        for column, values in zip(columns, values_per_column):
+            if column in sql.SQL.LABEL_COLUMNS:
+                frame_columns[column] = numpy.array(values, dtype=object)
+                present[column] = frame_columns[column] != None
+            elif None in values:
+                objects = numpy.array(values, dtype=object)
+                present[column] = objects != None
+                objects[~present[column]] = 0
+                frame_columns[column] = objects.astype(numpy.int64)
+            else:
+                present[column] = numpy.ones(len(values), dtype=bool)
+                frame_columns[column] = numpy.fromiter(values, dtype=numpy.int64, count=len(values))
+
+        return Frames(frame_columns, present)
+
+    @staticmethod
+    def concatenate(pages: list, columns: list):
+        """
+            Puts pages of frames end to end.
+
+            Return - a Frames.
+        """
+
+        if len(pages) == 1:
+            return pages[0]
+
+        if len(pages) == 0:
+            return Frames.from_rows([], columns)
+
+        return Frames({ column : numpy.concatenate([ page.columns[column] for page in pages ]) for column in columns },
+                      { column : numpy.concatenate([ page.present[column] for page in pages ]) for column in columns })
+
+class Query:
+    """
+        Reads the frames of a test from the SQL DB, as NumPy columns of
+        integers (as stored, see sql.py), for analysis scripts and notebooks:
+
+            frames = query.Query("db.sql").frames(("test_name", "YY-MM-DD hh-mm-ss"),
+                                                  time_range=("2024-01-01 10:00:00", None),
+                                                  msg_types=[ 0x1234 ],
+                                                  columns=[ "frame_date", "MAC_src", "msg_type" ])
+            frames["MAC_src"]
+
+        The rows are fetched "page_size" at a time, and pages() hands them out
+        page by page, so that a whole test never has to fit in memory.
+
+        The results of frames() are kept in a LRU cache of "cache_size" bytes,
+        keyed by test and query. A result is dropped as soon as its test has
+        new frames, or is relabelled (according to the "test_summary" table).
+
+        The DB is read through a sql.ReadPool, so the frames of a sharded DB
+        are read from the shard of their test.
+    """
+
+    PAGE_SIZE = 50000
+    CACHE_SIZE = 256 << 20
+
+    def __init__(self, path_to_db: str="../../db.sql", page_size: int=PAGE_SIZE, cache_size: int=CACHE_SIZE):
+        self.path_to_db = path_to_db
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.cache_size_in_bytes = 0
+
+        #
+        # Read only: the DB may be written by an ingest at the same time.
+        #
+        self.pool = sql.ReadPool(path_to_db)
+
+    def close(self):
+        """
+            Closes the DB, and empties the cache.
+        """
+
+        self.clear_cache()
+        self.pool.close()
+
+    def get_test_id(self, test) -> int:
+        """
+            Finds the id of a test, given as its id or as (name, execution date).
+
+            Return - the id of the test.
+                     Raises ValueError if there is no such test.
+        """
+
+        with self.pool.connect() as conn:
+            if isinstance(test, tuple):
+                test_id = conn.execute(f"SELECT id FROM {sql.SQL.TESTS_TABLE_NAME} WHERE name = ? AND execution_date = ?", test).fetchone()
+            else:
+                test_id = conn.execute(f"SELECT id FROM {sql.SQL.TESTS_TABLE_NAME} WHERE id = ?", (test,)).fetchone()
+
+        if test_id == None:
+            raise ValueError(f"unknown test: {test}")
+
+        return test_id[0]
+
+    def get_test_version(self, test_id: int) -> tuple:
+        """
+            Returns what changes when frames are added to a test, or when it is relabelled.
+        """
+
+        version = self.pool.read(f"SELECT nbr_of_frames, last_frame_number, label_version FROM {sql.SQL.TEST_SUMMARY_TABLE_NAME} WHERE test_id = ?", (test_id,), test_id)
+
+        return None if len(version) == 0 else version[0]
+
+    def frames(self, test, time_range: tuple=None, msg_types: list=None, columns: list=None) -> Frames:
+        """
+            Reads the frames of a test, in frame number order:
+              - "test": id of the test, or (name, execution date),
+              - "time_range": (start, end) of frame_date, the start being included and the end excluded,
+                each one as ns since 01/01/1970 00:00:00, "YYYY-MM-DD hh:mm:ss[.fffffffff]", a datetime, or None,
+              - "msg_types": msg_type values to keep (None for all),
+              - "columns": columns of the "frames" table to read (None for all, but test_id).
+
+            Return - a Frames (which may come from the cache).
+                     Raises ValueError if an argument is invalid.
+        """
+
+        test_id, query, parameters, columns = self.build_query(test, time_range, msg_types, columns)
+
+        key = (test_id, query, parameters)
+        version = self.get_test_version(test_id)
+
+        if key in self.cache:
+            cached_version, frames = self.cache[key]
+
+            if cached_version == version:
+                self.cache.move_to_end(key)
+                return frames
+
+            self.drop(key)
+
+        frames = Frames.concatenate(list(self.fetch_pages(test_id, query, parameters, columns, self.page_size)), columns)
+
+        if frames.get_size_in_bytes() <= self.cache_size:
+            self.cache[key] = (version, frames)
+            self.cache_size_in_bytes += frames.get_size_in_bytes()
+
+            while self.cache_size_in_bytes > self.cache_size:
+                self.drop(next(iter(self.cache)))
+
+        return frames
+
+    def pages(self, test, time_range: tuple=None, msg_types: list=None, columns: list=None, page_size: int=None):
+        """
+            Reads the frames of a test like frames(), "page_size" frames at a time, without the cache.
+
+            Return - a generator of Frames.
+                     Raises ValueError if an argument is invalid.
+        """
+
+        test_id, query, parameters, columns = self.build_query(test, time_range, msg_types, columns)
+
+        return self.fetch_pages(test_id, query, parameters, columns, self.page_size if page_size == None else page_size)
+
+    def fetch_pages(self, test_id: int, query: str, parameters: tuple, columns: list, page_size: int):
+        """
+            Runs a query on the DB holding the frames of a test, and converts its rows into columns, "page_size" rows at a time.
+
+            Return - a generator of Frames.
+        """
+
+        path_to_db = self.pool.get_shard_path(test_id)
+
+        if path_to_db == None:
+            return
+
+        with self.pool.connect(path_to_db) as conn:
+            cursor = conn.cursor()
+
+            try:
+                cursor.execute(query, parameters)
+
+                while True:
+                    rows = cursor.fetchmany(page_size)
+
+                    if len(rows) == 0:
+                        break
+
+                    yield Frames.from_rows(rows, columns)
+
+            finally:
+                cursor.close()
+
+    def build_query(self, test, time_range: tuple, msg_types: list, columns: list) -> tuple:
+        """
+            Builds the query reading frames (see frames()).
+
+            Return - the id of the test, the query, its parameters and its columns.
+                     Raises ValueError if an argument is invalid.
+        """
+
+        if columns == None:
+            columns = sql.SQL.FRAMES_TABLE_COLUMNS[1:]
+
+        columns = list(columns)
+
+        if len(columns) == 0:
+            raise ValueError("no column to read")
+
+        for column in columns:
+            if column not in sql.SQL.FRAMES_TABLE_COLUMNS:
+                raise ValueError(f"unknown column: {column}")
+
+        test_id = self.get_test_id(test)
+
+        conditions = [ "test_id = ?" ]
+        parameters = [ test_id ]
+
+        if time_range != None:
+            start, end = time_range
+
+            if start != None:
+                conditions.append("frame_date >= ?")
+                parameters.append(Query.date_to_ns(start))
+
+            if end != None:
+                conditions.append("frame_date < ?")
+                parameters.append(Query.date_to_ns(end))
+
+        if msg_types != None:
+            msg_types = sorted(set(int(msg_type) for msg_type in msg_types))
+
+            conditions.append(f"msg_type IN ({', '.join('?' * len(msg_types))})")
+            parameters.extend(msg_types)
+
+        query = f"SELECT {', '.join(columns)} FROM {sql.SQL.FRAMES_TABLE_NAME} WHERE {' AND '.join(conditions)} ORDER BY frame_number"
+
+        return test_id, query, tuple(parameters), columns
+
+    def drop(self, key: tuple):
+        """
+            Removes a result from the cache.
+        """
+
+        _, frames = self.cache.pop(key)
+        self.cache_size_in_bytes -= frames.get_size_in_bytes()
+
+    def clear_cache(self):
+        """
+            Empties the cache.
+        """
+
+        self.cache.clear()
+        self.cache_size_in_bytes = 0
+
+    @staticmethod
+    def date_to_ns(date) -> int:
+        """
+            Converts a date (ns since 01/01/1970 00:00:00, "YYYY-MM-DD hh:mm:ss[.fffffffff]" or datetime) into ns since 01/01/1970 00:00:00.
+            Raises ValueError if the date can't be read.
+        """
+
+        if isinstance(date, (int, numpy.integer)):
+            return int(date)
+
+        if isinstance(date, str):
+            date = date.strip().replace(" ", "T")
+
+        try:
+            return int(numpy.datetime64(date, "ns").astype(numpy.int64))
+
+        except (ValueError, TypeError):
+            raise ValueError(f"invalid date: {date}")
@@ -0,0 +1,455 @@
+import frame
+import compression
+import decoder
+import frame_index
+import mmap
+import numpy
+import os
+import resync
+import time
+
+def open_reader(path_to_file: str, batch_decoder: decoder.BatchDecoder=None, use_index: bool=False, nbr_of_threads: int=1, resynchronizer: resync.Resynchronizer=None):
+    """
+        Chooses how to read a capture: through a memory map, or decompressed on the fly (gzip, xz or bz2).
+
+        Return - a CaptureReader, or a StreamReader.
+    """
+
+    if compression.detect(path_to_file) != None:
+        return StreamReader(path_to_file, batch_decoder, nbr_of_threads, resynchronizer)
+
+    return CaptureReader(path_to_file, batch_decoder, use_index, resynchronizer)
+
+class CaptureReader:
+    """
+        Streams the frames of a binary capture through a memory map.
+
+        Frames are handed out as zero-copy memoryview slices of the map, so
+        memory usage doesn't depend on the size of the capture.
+
+        With a Resynchronizer, corrupted bytes are skipped instead of ending
+        the capture (and the index isn't used, as frames no longer follow
+        each other).
+    """
+
+    BATCH_SIZE = 16384
+
+    def __init__(self, path_to_file: str, batch_decoder: decoder.BatchDecoder=None, use_index: bool=False, resynchronizer: resync.Resynchronizer=None):
+        self.path_to_file = path_to_file
+        self.decoder = batch_decoder if batch_decoder != None else decoder.BatchDecoder()
+        self.resynchronizer = resynchronizer
+        self.index = frame_index.FrameIndex(path_to_file) if use_index and resynchronizer == None else None
+        self.following = False
+        self.file = None
+        self.map = None
+        self.buffer = None
+        self.position = 0
+        self.nbr_of_frames = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """
+            Maps the binary file into memory.
+        """
+
+        self.file = open(self.path_to_file, "rb")
+        self.position = 0
+        self.nbr_of_frames = 0
+
+        #
+        # An empty file can't be mapped.
+        #
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.buffer = memoryview(b"")
+        else:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if hasattr(self.map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+            self.buffer = memoryview(self.map)
+
+        #
+        # Reads the frame index (the capture is read without index if it can't be written).
+        #
+        if self.index != None and not self.index.open(self.buffer):
+            self.index = None
+
+    def close(self):
+        """
+            Unmaps and closes the binary file.
+        """
+
+        if self.index != None:
+            self.index.close(self.buffer)
+
+        if self.buffer != None:
+            self.buffer.release()
+            self.buffer = None
+
+        if self.map != None:
+            self.map.close()
+            self.map = None
+
+        if self.file != None:
+            self.file.close()
+            self.file = None
+
+    def is_complete(self) -> bool:
+        """
+            Tells whether everything up to the end of the file was read as complete frames.
+        """
+
+        return self.position == len(self.buffer)
+
+    def batches(self, batch_size: int=BATCH_SIZE, first_frame: int=0, last_frame: int=None):
+        """
+            Finds the frames [first_frame, last_frame[ of the file, batch after batch.
+            The frames covered by the index aren't scanned again, the other ones are added to the index.
+
+            Return - a generator of (buffer, offsets, number of the first frame) tuples, the offsets being relative to the buffer.
+                     It stops after "last_frame", at the end of the file or on an incomplete frame.
+        """
+
+        self.seek(first_frame)
+
+        yield from self.read_batches(batch_size, last_frame)
+
+        #
+        # Skips what is left at the end of the file (which can't be frames).
+        #
+        if self.resynchronizer != None and (last_frame == None or self.nbr_of_frames < last_frame):
+            self.resynchronizer.skip_to_end(self.position, len(self.buffer))
+            self.position = len(self.buffer)
+
+    def follow(self, batch_size: int=BATCH_SIZE, first_frame: int=0, last_frame: int=None, poll_interval: float=0.5, timeout: float=None):
+        """
+            Finds the frames [first_frame, last_frame[ of a file which is still being written, batch after batch.
+            An incomplete frame at the end of the file is waited for, as the rest of the file.
+
+            Return - a generator of (buffer, offsets, number of the first frame) tuples, the offsets being relative to the buffer.
+                     It stops after "last_frame", when nothing was written for "timeout" seconds (if any)
+                     or on Ctrl+C.
+        """
+
+        self.following = True
+        self.seek(first_frame)
+
+        last_change = time.monotonic()
+
+        try:
+            while last_frame == None or self.nbr_of_frames < last_frame:
+                nbr_of_frames = self.nbr_of_frames
+
+                self.skip_to(first_frame)
+
+                if self.nbr_of_frames >= first_frame:
+                    yield from self.read_batches(batch_size, last_frame)
+
+                #
+                # Waits for the file to grow.
+                #
+                if self.nbr_of_frames == nbr_of_frames and not self.remap():
+                    if timeout != None and time.monotonic() - last_change >= timeout:
+                        return
+
+                    time.sleep(poll_interval)
+                else:
+                    last_change = time.monotonic()
+
+        except KeyboardInterrupt:
+            return
+
+    def read_batches(self, batch_size: int, last_frame: int=None):
+        """
+            Finds the frames from the current position up to "last_frame", batch after batch.
+
+            Return - a generator of (buffer, offsets, number of the first frame) tuples, the offsets being relative to the buffer.
+        """
+
+        while last_frame == None or self.nbr_of_frames < last_frame:
+            nbr_of_frames_to_read = batch_size if last_frame == None else min(batch_size, last_frame - self.nbr_of_frames)
+
+            #
+            # Reads the offsets from the index, or scans the frame headers.
+            #
+            if self.index != None and self.nbr_of_frames < self.index.nbr_of_frames:
+                offsets = self.index.get_offsets(self.nbr_of_frames, min(self.nbr_of_frames + nbr_of_frames_to_read, self.index.nbr_of_frames))
+                position = self.index.get_offset(self.nbr_of_frames + len(offsets))
+            else:
+                offsets, position = self.scan(self.position, nbr_of_frames_to_read)
+
+                if self.index != None:
+                    self.index.append(self.buffer, offsets, position)
+
+            #
+            # (Corrupted bytes may have been skipped, even without frames.)
+            #
+            self.position = position
+
+            if len(offsets) == 0:
+                return
+
+            self.nbr_of_frames += len(offsets)
+
+            yield self.buffer, offsets, self.nbr_of_frames - len(offsets)
+
+    def seek(self, frame_number: int):
+        """
+            Moves to the given frame, using the index as much as possible.
+            Stops at the end of the file (or on an incomplete frame) if there are fewer frames.
+        """
+
+        self.position = 0
+        self.nbr_of_frames = 0
+
+        if self.index != None:
+            self.nbr_of_frames = min(frame_number, self.index.nbr_of_frames)
+            self.position = self.index.get_offset(self.nbr_of_frames)
+
+        self.skip_to(frame_number)
+
+    def skip_to(self, frame_number: int):
+        """
+            Moves forward to the given frame, scanning the frame headers.
+            Stops at the end of the file (or on an incomplete frame) if there are fewer frames.
+        """
+
+        while self.nbr_of_frames < frame_number:
+            offsets, position = self.scan(self.position, min(CaptureReader.BATCH_SIZE, frame_number - self.nbr_of_frames))
+
+            if self.index != None:
+                self.index.append(self.buffer, offsets, position)
+
+            self.position = position
+
+            if len(offsets) == 0:
+                return
+
+            self.nbr_of_frames += len(offsets)
+
+    def scan(self, start: int, max_frames: int) -> tuple:
+        """
+            Finds the next frames of the map (skipping the corrupted bytes, with a Resynchronizer).
+
+            Return - the offsets of the frames, and the offset right after them.
+        """
+
+        if self.resynchronizer != None:
+            return self.resynchronizer.scan(self.buffer, start, max_frames=max_frames, at_end=not self.following)
+
+        return self.decoder.scan(self.buffer, start, max_frames=max_frames)
+
+    def remap(self) -> bool:
+        """
+            Maps the file again if it grew since it was mapped.
+
+            Return - true - if the file grew,
+                   - false - otherwise.
+        """
+
+        size = os.fstat(self.file.fileno()).st_size
+
+        if size <= len(self.buffer):
+            return False
+
+        self.buffer.release()
+
+        if self.map != None:
+            self.map.close()
+
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.map)
+
+        return True
+
+    def frames(self):
+        """
+            Finds the frames of the file, one at a time.
+
+            Return - a generator of memoryview slices, one per frame (header included).
+        """
+
+        for buffer, offsets, first_frame_number in self.batches(CaptureReader.BATCH_SIZE):
+            for offset in offsets.tolist():
+                frame_size = decoder.BatchDecoder.FRAME_SIZE_STRUCT.unpack_from(buffer, offset + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES)[0]
+
+                yield buffer[offset:offset + frame.Frame.HEADER_SIZE_IN_BYTES + frame_size]
+
+class StreamReader:
+    """
+        Streams the frames of a compressed capture (gzip, xz or bz2), decompressed on the fly.
+
+        The decompressed bytes go through a bounded buffer: each batch is a
+        copy of its frames, and the bytes of a batch are dropped once it is
+        handed out. The capture can't be followed, nor indexed. As for a
+        CaptureReader, a Resynchronizer skips the corrupted bytes.
+    """
+
+    BATCH_SIZE = CaptureReader.BATCH_SIZE
+
+    READ_SIZE = 1 << 20
+
+    #
+    # A batch ends early when its frames fill the buffer (a single frame may be bigger).
+    #
+    BUFFER_SIZE = 16 << 20
+
+    def __init__(self, path_to_file: str, batch_decoder: decoder.BatchDecoder=None, nbr_of_threads: int=1, resynchronizer: resync.Resynchronizer=None):
+        self.path_to_file = path_to_file
+        self.decoder = batch_decoder if batch_decoder != None else decoder.BatchDecoder()
+        self.nbr_of_threads = nbr_of_threads
+        self.resynchronizer = resynchronizer
+        self.stream = None
+        self.buffer = bytearray()
+        self.buffer_offset = 0
+        self.position = 0
+        self.nbr_of_frames = 0
+        self.end_of_stream = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """
+            Opens the decompressed stream.
+        """
+
+        self.stream = compression.open_stream(self.path_to_file, self.nbr_of_threads)
+        self.buffer = bytearray()
+        self.buffer_offset = 0
+        self.position = 0
+        self.nbr_of_frames = 0
+        self.end_of_stream = False
+
+    def close(self):
+        """
+            Closes the stream.
+        """
+
+        if self.stream != None:
+            self.stream.close()
+            self.stream = None
+
+    def is_complete(self) -> bool:
+        """
+            Tells whether everything up to the end of the stream was read as complete frames.
+        """
+
+        return self.end_of_stream and self.position == len(self.buffer)
+
+    def batches(self, batch_size: int=BATCH_SIZE, first_frame: int=0, last_frame: int=None):
+        """
+            Finds the frames [first_frame, last_frame[ of the stream, batch after batch
+            (the frames before "first_frame" are decompressed, and skipped).
+
+            Return - a generator of (buffer, offsets, number of the first frame) tuples, the offsets being relative to the buffer.
+                     It stops after "last_frame", at the end of the stream or on an incomplete frame.
+        """
+
+        for buffer, offsets, first_frame_number in self.read_batches(batch_size, last_frame):
+            if first_frame_number + len(offsets) <= first_frame:
+                continue
+
+            if first_frame_number < first_frame:
+                offsets = offsets[first_frame - first_frame_number:]
+                first_frame_number = first_frame
+
+            yield buffer, offsets, first_frame_number
+
+        #
+        # Skips what is left at the end of the stream (which can't be frames).
+        #
+        if self.resynchronizer != None and (last_frame == None or self.nbr_of_frames < last_frame):
+            self.resynchronizer.skip_to_end(self.buffer_offset + self.position, self.buffer_offset + len(self.buffer))
+            self.position = len(self.buffer)
+
+    def read_batches(self, batch_size: int, last_frame: int=None):
+        """
+            Finds the frames from the current position up to "last_frame", batch after batch.
+
+            Return - a generator of (buffer, offsets, number of the first frame) tuples, the offsets being relative to the buffer.
+        """
+
+        while last_frame == None or self.nbr_of_frames < last_frame:
+            nbr_of_frames_to_read = batch_size if last_frame == None else min(batch_size, last_frame - self.nbr_of_frames)
+
+            #
+            # Drops the frames already handed out.
+            #
+            del self.buffer[:self.position]
+            self.buffer_offset += self.position
+            self.position = 0
+
+            #
+            # Scans the bytes read so far, and reads more until the batch (or the buffer) is full.
+            #
+            offsets = []
+            nbr_of_offsets = 0
+            position = 0
+
+            while nbr_of_offsets < nbr_of_frames_to_read:
+                if self.resynchronizer != None:
+                    new_offsets, position = self.resynchronizer.scan(self.buffer, position, max_frames=nbr_of_frames_to_read - nbr_of_offsets, base_offset=self.buffer_offset, at_end=self.end_of_stream)
+                else:
+                    new_offsets, position = self.decoder.scan(self.buffer, position, max_frames=nbr_of_frames_to_read - nbr_of_offsets)
+
+                offsets.append(new_offsets)
+                nbr_of_offsets += len(new_offsets)
+
+                #
+                # Drops the corrupted bytes skipped before the first frame of the batch.
+                #
+                if nbr_of_offsets == 0 and position != 0:
+                    del self.buffer[:position]
+                    self.buffer_offset += position
+                    position = 0
+
+                #
+                # (The bytes left are scanned once more at the end of the stream.)
+                #
+                if nbr_of_offsets == nbr_of_frames_to_read or (nbr_of_offsets != 0 and len(self.buffer) >= StreamReader.BUFFER_SIZE) or self.end_of_stream:
+                    break
+
+                self.fill()
+
+            if nbr_of_offsets == 0:
+                return
+
+            with memoryview(self.buffer) as view:
+                buffer = bytes(view[:position])
+
+            self.position = position
+            self.nbr_of_frames += nbr_of_offsets
+
+            yield buffer, numpy.concatenate(offsets), self.nbr_of_frames - nbr_of_offsets
+
+    def fill(self) -> bool:
+        """
+            Appends the next decompressed bytes to the buffer.
+
+            Return - true - if bytes were read,
+                   - false - at the end of the stream.
+        """
+
+        data = self.stream.read(StreamReader.READ_SIZE)
+
+        if len(data) == 0:
+            self.end_of_stream = True
+            return False
+
+        self.buffer += data
+
+        return True
+
+    frames = CaptureReader.frames
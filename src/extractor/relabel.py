@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+
+import frame
+import sql
+import argparse
+import sys
+import termcolor
+
+class Relabel:
+    """
+        Labels the stored frames again, in place, once the transfer functions changed
+        (the frames written afterwards are labelled when they are extracted).
+    """
+
+    def __init__(self):
+        self.cmd_line_args = None
+        self.sql_db = None
+
+    def run(self) -> bool:
+        """
+            Relabels the frames.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  {0}
+  {0} --db ../../db.sql --short test_name "YY-MM-DD hh-mm-ss"
+  {0} --short test_name "YY-MM-DD hh-mm-ss" --fields msg_type
+
+notes:
+  The labelled fields are: {1}.
+  Without [--short], every test is relabelled.""".format(sys.argv[0], ", ".join(frame.Frame.LABELLED_FIELDS)))
+
+        parser.add_argument("--db", help="SQL DB to relabel (default: %(default)s)", metavar="PATH_TO_DB", default=sql.SQL().path_to_db)
+        parser.add_argument("--short", help="name and execution date of the only test to relabel", metavar=("TEST_NAME", "TEST_EXECUTION_DATE"), nargs=2)
+        parser.add_argument("--fields", help="comma-separated labelled fields to relabel (default: all)", metavar="FIELD[,FIELD...]")
+
+        self.cmd_line_args = parser.parse_args()
+
+        field_names = None
+
+        if self.cmd_line_args.fields != None:
+            field_names = { field_name.strip() for field_name in self.cmd_line_args.fields.split(",") if field_name.strip() != "" }
+            unknown_fields = field_names.difference(frame.Frame.LABELLED_FIELDS)
+
+            if len(unknown_fields) != 0:
+                parser.error(f"[--fields] not labelled fields: {', '.join(sorted(unknown_fields))}")
+
+        self.sql_db = sql.SQL(self.cmd_line_args.db)
+
+        if not self.sql_db.open_db():
+            return False
+
+        test_id = None
+
+        if self.cmd_line_args.short != None:
+            test_id = self.sql_db.find_test_id(*self.cmd_line_args.short)
+
+            if test_id == None:
+                print(termcolor.colored("[-]", "red"), f"No test {self.cmd_line_args.short[0]} executed on {self.cmd_line_args.short[1]} in {self.cmd_line_args.db}")
+                return False
+
+        print(termcolor.colored("[+]", "yellow"), f"Relabelling {'every test' if test_id == None else self.cmd_line_args.short[0]} of {self.cmd_line_args.db}")
+
+        if not self.sql_db.relabel(test_id, field_names):
+            print(termcolor.colored("[-]", "red"), "Error relabelling the SQL db")
+            return False
+
+        print(termcolor.colored("[+]", "yellow"), "Done")
+        return True
+
+def main():
+    exit(0 if Relabel().run() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import concurrent.futures
+import os
+import re
+
+class TestContext:
+    """
+        Represents the name and execution date of a test.
+
+        The values read from a report file are cached, so each report file is
+        parsed once however many frames (or captures) refer to it.
+    """
+
+    TEST_NAME_PATTERN = re.compile("^\\* Test\\s+: (.*)")
+    TEST_EXECUTION_DATE_PATTERN = re.compile("^\\* Execution begin date\\s+: \"(.*)\"")
+
+    #
+    # Parsed report files, keyed by (path, modification time, size).
+    #
+    cache = {}
+
+    def __init__(self, test_name: str="", test_execution_date: str=""):
+        self.test_name = test_name
+        self.test_execution_date = test_execution_date
+
+    def __repr__(self) -> str:
+        return f"TestContext({self.test_name!r}, {self.test_execution_date!r})"
+
+    @staticmethod
+    def from_report(path_to_report: str):
+        """
+            Finds the name and execution date of the test in a report file.
+            When a value appears several times, the last one is used.
+
+            Return - a TestContext.
+        """
+
+        stat = os.stat(path_to_report)
+        key = (os.path.abspath(path_to_report), stat.st_mtime_ns, stat.st_size)
+
+        if key in TestContext.cache:
+            return TestContext.cache[key]
+
+        context = TestContext()
+
+        with open(path_to_report) as file:
+            for line in file:
+                #
+                # Both lines start with "* ", which avoids running the patterns on most lines.
+                #
+                if not line.startswith("* "):
+                    continue
+
+                #
+                # Similar to grep.
+                #
+                test_name_match = TestContext.TEST_NAME_PATTERN.findall(line)
+                test_execution_date_match = TestContext.TEST_EXECUTION_DATE_PATTERN.findall(line)
+
+                if len(test_name_match) == 1:
+                    context.test_name = test_name_match[0]
+
+                if len(test_execution_date_match) == 1:
+                    context.test_execution_date = test_execution_date_match[0]
+
+        TestContext.cache[key] = context
+
+        return context
+
+    @staticmethod
+    def from_reports(paths_to_reports: list, nbr_of_workers: int=None) -> dict:
+        """
+            Pre-resolves many report files at once (e.g. for a campaign of tests).
+
+            Return - a dict giving, for each report file, its TestContext,
+                     or None if the report file can't be read.
+        """
+
+        def from_report(path_to_report: str):
+            try:
+                return TestContext.from_report(path_to_report)
+
+            except OSError:
+                return None
+
+        paths_to_reports = list(dict.fromkeys(paths_to_reports))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=nbr_of_workers) as executor:
+            return dict(zip(paths_to_reports, executor.map(from_report, paths_to_reports)))
@@ -0,0 +1,288 @@
+import frame
+import decoder
+import json
+import numpy
+
+class Resynchronizer:
+    """
+        Finds the frames of a capture which may be corrupted: a header is
+        plausible when its frame_size isn't above "max_frame_size", and its
+        frame_date doesn't go back in time.
+
+        After a header which isn't plausible, the capture is searched forward
+        for the next offset where "nbr_of_chained_frames" plausible headers
+        follow each other. The search is vectorized with numpy, a window of
+        bytes at a time: every offset of the window is checked as a header,
+        with the header it points to, and only the few offsets passing both
+        are chained further. The bytes skipped are recorded as corrupted
+        ranges, and the frames found around them are handed out as usual.
+
+        When the frame dates go back in time (e.g. captures put end to end),
+        no header is plausible anymore: a window without any is searched
+        again regardless of the previous frame date, for a longer chain of
+        headers (NBR_OF_CHAINED_FRAMES_AFTER_RESET).
+    """
+
+    MAX_FRAME_SIZE = 65535
+    NBR_OF_CHAINED_FRAMES = 4
+    NBR_OF_CHAINED_FRAMES_AFTER_RESET = 16
+    WINDOW_SIZE = 1 << 18
+
+    CORRUPTED = "corrupted"
+    TRUNCATED = "truncated"
+
+    def __init__(self, max_frame_size: int=MAX_FRAME_SIZE, nbr_of_chained_frames: int=NBR_OF_CHAINED_FRAMES):
+        self.max_frame_size = max_frame_size
+        self.nbr_of_chained_frames = nbr_of_chained_frames
+        self.frame_date = next(position for position in frame.Frame.SPEC.positions if position["name"] == "frame_date")
+        self.last_frame_date = 0
+        self.resyncing = False
+        self.nbr_of_frames = 0
+        self.corrupted_ranges = []
+
+    def read_header(self, buffer, position: int) -> tuple:
+        """
+            Reads the frame size and the frame date of the header at "position".
+        """
+
+        frame_size = decoder.BatchDecoder.FRAME_SIZE_STRUCT.unpack_from(buffer, position + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES)[0]
+
+        first_byte = position + self.frame_date["first_byte"]
+        frame_date = (int.from_bytes(buffer[first_byte:first_byte + self.frame_date["nbr_of_bytes"]], "big") >> self.frame_date["shift"]) & self.frame_date["mask"]
+
+        return frame_size, frame_date
+
+    def scan(self, buffer, start: int=0, end: int=None, max_frames: int=None, base_offset: int=0, at_end: bool=True) -> tuple:
+        """
+            Chains through the frame headers to find where each frame starts, skipping the corrupted bytes
+            ("base_offset" being the offset of the buffer in the capture, for the corrupted ranges,
+            "at_end" telling that the capture ends with the buffer).
+
+            Return - the offsets of the complete frames found,
+                   - the offset right after the last complete frame (or after the last skipped byte).
+        """
+
+        if end == None:
+            end = len(buffer)
+
+        offsets = []
+        position = start
+
+        while position + frame.Frame.HEADER_SIZE_IN_BYTES <= end:
+            if max_frames != None and len(offsets) >= max_frames:
+                break
+
+            #
+            # Skips the corrupted bytes, up to the next chain of headers (or as far as the buffer tells).
+            #
+            if self.resyncing:
+                next_position, decided_position = self.find_next_frame(buffer, position, end, at_end)
+
+                if next_position == None:
+                    self.skip(base_offset + position, base_offset + decided_position, Resynchronizer.CORRUPTED)
+                    position = decided_position
+                    break
+
+                self.skip(base_offset + position, base_offset + next_position, Resynchronizer.CORRUPTED)
+                position = next_position
+                self.resyncing = False
+
+            frame_size, frame_date = self.read_header(buffer, position)
+
+            if frame_size > self.max_frame_size or frame_date < self.last_frame_date:
+                self.resyncing = True
+                continue
+
+            #
+            # Stops on an incomplete frame.
+            #
+            if position + frame.Frame.HEADER_SIZE_IN_BYTES + frame_size > end:
+                break
+
+            offsets.append(position)
+            position += frame.Frame.HEADER_SIZE_IN_BYTES + frame_size
+            self.last_frame_date = frame_date
+            self.nbr_of_frames += 1
+
+        return numpy.array(offsets, dtype=numpy.uint64), position
+
+    def find_next_frame(self, buffer, start: int, end: int, at_end: bool=True) -> tuple:
+        """
+            Searches the next offset where "nbr_of_chained_frames" plausible headers follow each other
+            (or a longer chain, starting before the previous frame date, which is then forgotten).
+
+            Return - the offset (None if there is none in the buffer),
+                   - the offset up to which every byte was checked (the search continues there once the buffer grows).
+        """
+
+        limit = end - frame.Frame.HEADER_SIZE_IN_BYTES + 1
+        position = start
+
+        while position < limit:
+            window_end = min(limit, position + Resynchronizer.WINDOW_SIZE)
+
+            candidate, chained = self.find_chain(buffer, position, window_end, end, self.last_frame_date, self.nbr_of_chained_frames, at_end)
+
+            if chained:
+                return candidate, candidate
+
+            reset_candidate, reset_chained = self.find_chain(buffer, position, window_end, end, 0, Resynchronizer.NBR_OF_CHAINED_FRAMES_AFTER_RESET, at_end)
+
+            #
+            # A chain after the previous frame date is preferred: until it can be told, nothing after an undecided one is skipped.
+            #
+            if chained == None:
+                return None, candidate if reset_candidate == None else min(candidate, reset_candidate)
+
+            if reset_chained:
+                self.last_frame_date = 0
+                return reset_candidate, reset_candidate
+
+            if reset_chained == None:
+                return None, reset_candidate
+
+            position = window_end
+
+        return None, max(start, limit)
+
+    def find_chain(self, buffer, start: int, stop: int, end: int, first_frame_date: int, nbr_of_chained_frames: int, at_end: bool) -> tuple:
+        """
+            Searches, in [start, stop[, the first chain of "nbr_of_chained_frames" plausible headers not older than "first_frame_date".
+
+            Return - the offset of the chain and true,
+                   - the offset of the first chain which can't be told yet and None,
+                   - None and false - if there is no chain.
+        """
+
+        for candidate in self.find_candidates(buffer, start, stop, end, first_frame_date):
+            chained = self.is_chained(buffer, candidate, end, first_frame_date, nbr_of_chained_frames, at_end)
+
+            if chained != False:
+                return candidate, chained
+
+        return None, False
+
+    def find_candidates(self, buffer, start: int, stop: int, end: int, first_frame_date: int) -> list:
+        """
+            Checks every offset of [start, stop[ as a header (not older than "first_frame_date"),
+            with the header it points to (when it is in the buffer).
+
+            Return - the offsets passing, in order.
+        """
+
+        data = numpy.frombuffer(buffer, dtype=numpy.uint8, count=end)
+        positions = numpy.arange(start, stop, dtype=numpy.int64)
+
+        frame_sizes = Resynchronizer.read_column(data, positions + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES, 4, 0, 0xffffffff)
+        frame_dates = Resynchronizer.read_column(data, positions + self.frame_date["first_byte"], self.frame_date["nbr_of_bytes"], self.frame_date["shift"], self.frame_date["mask"])
+
+        plausible = (frame_sizes <= self.max_frame_size) & (frame_dates >= first_frame_date)
+
+        #
+        # Checks the next header too, when it is in the buffer.
+        #
+        next_positions = positions + frame.Frame.HEADER_SIZE_IN_BYTES + frame_sizes.astype(numpy.int64)
+        with_next = plausible & (next_positions + frame.Frame.HEADER_SIZE_IN_BYTES <= end)
+
+        next_frame_sizes = Resynchronizer.read_column(data, next_positions[with_next] + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES, 4, 0, 0xffffffff)
+        next_frame_dates = Resynchronizer.read_column(data, next_positions[with_next] + self.frame_date["first_byte"], self.frame_date["nbr_of_bytes"], self.frame_date["shift"], self.frame_date["mask"])
+
+        plausible[with_next] &= (next_frame_sizes <= self.max_frame_size) & (next_frame_dates >= frame_dates[with_next])
+
+        return positions[plausible].tolist()
+
+    @staticmethod
+    def read_column(data: numpy.ndarray, positions: numpy.ndarray, nbr_of_bytes: int, shift: int, mask: int) -> numpy.ndarray:
+        """
+            Reads a big-endian field of "nbr_of_bytes" bytes at each position.
+        """
+
+        column = numpy.zeros(len(positions), dtype=numpy.uint64)
+
+        for i in range(nbr_of_bytes):
+            column = (column << numpy.uint64(8)) | data[positions + i]
+
+        return (column >> numpy.uint64(shift)) & numpy.uint64(mask)
+
+    def is_chained(self, buffer, position: int, end: int, frame_date: int, nbr_of_chained_frames: int, at_end: bool=True) -> bool:
+        """
+            Tells whether "nbr_of_chained_frames" plausible headers (not older than "frame_date") follow each other from "position".
+            At the end of the capture, fewer headers are enough if their frames end exactly with it.
+
+            Return - true - if they do,
+                   - false - if they don't,
+                   - None - if the buffer ends before it can be told.
+        """
+
+        for i in range(nbr_of_chained_frames):
+            if at_end and position == end and i != 0:
+                return True
+
+            if position + frame.Frame.HEADER_SIZE_IN_BYTES > end:
+                return False if at_end else None
+
+            frame_size, next_frame_date = self.read_header(buffer, position)
+
+            if frame_size > self.max_frame_size or next_frame_date < frame_date:
+                return False
+
+            position += frame.Frame.HEADER_SIZE_IN_BYTES + frame_size
+            frame_date = next_frame_date
+
+        return True
+
+    def skip(self, start: int, end: int, reason: str):
+        """
+            Records the bytes [start, end[ of the capture as skipped (extending the last range when they follow it).
+        """
+
+        if end <= start:
+            return
+
+        if len(self.corrupted_ranges) != 0 and self.corrupted_ranges[-1]["end"] == start and self.corrupted_ranges[-1]["reason"] == reason:
+            self.corrupted_ranges[-1]["end"] = end
+            self.corrupted_ranges[-1]["nbr_of_bytes"] = end - self.corrupted_ranges[-1]["start"]
+            return
+
+        self.corrupted_ranges.append({
+            "start" : start,
+            "end" : end,
+            "nbr_of_bytes" : end - start,
+            "frames_before" : self.nbr_of_frames,
+            "reason" : reason,
+        })
+
+    def skip_to_end(self, start: int, end: int):
+        """
+            Records the bytes left at the end of the capture (the rest of a corrupted range, or an incomplete frame).
+        """
+
+        self.skip(start, end, Resynchronizer.CORRUPTED if self.resyncing else Resynchronizer.TRUNCATED)
+
+    def get_nbr_of_skipped_bytes(self) -> int:
+        """
+            Returns the number of bytes skipped so far.
+        """
+
+        return sum(corrupted_range["nbr_of_bytes"] for corrupted_range in self.corrupted_ranges)
+
+    def save(self, path_to_file: str, path_to_binary: str) -> bool:
+        """
+            Writes the skipped ranges as JSON.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+        try:
+            with open(path_to_file, "w") as file:
+                json.dump({
+                    "binary" : path_to_binary,
+                    "frames" : self.nbr_of_frames,
+                    "skipped_bytes" : self.get_nbr_of_skipped_bytes(),
+                    "ranges" : self.corrupted_ranges,
+                }, file, indent=4)
+
+        except OSError:
+            return False
+
+        return True
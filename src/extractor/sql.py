@@ -1,5 +1,16 @@
 import sqlite3
 import os
+import pathlib
+import itertools
+import collections
+import operator
+import contextlib
+import concurrent.futures
+import heapq
+import threading
+import numpy
+import timestamps
+import stats
 import termcolor
 import frame
 
@@ -8,6 +19,13 @@ class SQL:
         Facilitates interactions with the SQL database.
     """
 
+    #
+    # Version of the DB layout, stored in "PRAGMA user_version".
+    # Version 1 (TEXT values, see migrate.py) has no version number, version 2 has no summary tables,
+    # version 3 has no labels.
+    #
+    SCHEMA_VERSION = 4
+
     TESTS_TABLE_NAME = "tests"
     TESTS_TABLE_STRUCT = """
         id INTEGER,
@@ -15,54 +33,148 @@ class SQL:
         execution_date TEXT,
         PRIMARY KEY("id" AUTOINCREMENT)"""
 
+    #
+    # All values are integers, NULL meaning that the field isn't part of the frame:
+    #   - frame_date: nanoseconds since 01/01/1970 00:00:00 (and the remaining 1/10 ns in frame_date_sub_ns),
+    #   - MACs and IPs: 48 and 32-bit integers,
+    #   - packet_date: 1/2^16 seconds since 01/01/2000 12:00:00,
+    #   - msg_type: bits of field_14, field_18, field_28, field_29 and field_30, one after the other,
+    # but the labels (TEXT) of the labelled fields, given by the transfer functions when the frames are written.
+    #
+    # The columns are generated from the layout spec (layout.json): the kept fields, in order, the derived fields, and then the labels.
+    #
     FRAMES_TABLE_NAME = "frames"
-    FRAMES_TABLE_STRUCT = """
+    LABEL_COLUMNS = { f"{field_name}_label" : field_name for field_name in frame.Frame.LABELLED_FIELDS }
+    FRAMES_TABLE_COLUMNS = [ "test_id", "frame_number" ] + \
+                           [ column for field_name in frame.Frame.KEPT_FIELDS for column in ((field_name, "frame_date_sub_ns") if field_name == "frame_date" else (field_name,)) ] + \
+                           list(frame.Frame.DERIVED_FIELDS) + \
+                           list(LABEL_COLUMNS)
+
+    FRAMES_TABLE_STRUCT = ",\n".join([ f"        {column} INTEGER NOT NULL" for column in FRAMES_TABLE_COLUMNS[:2] ] + \
+                                     [ f"        {column} INTEGER" for column in FRAMES_TABLE_COLUMNS[2:len(FRAMES_TABLE_COLUMNS) - len(LABEL_COLUMNS)] ] + \
+                                     [ f"        {column} TEXT" for column in LABEL_COLUMNS ])
+
+    #
+    # Frames are clustered by test, in capture order.
+    #
+    FRAMES_TABLE_PRIMARY_KEY = "PRIMARY KEY (test_id, frame_number)"
+
+    #
+    # Covering indexes for the common filters: (table, columns, unique).
+    # The indexes on fields which the layout doesn't have are skipped.
+    #
+    INDEXES = {
+        "tests_name_execution_date" : (TESTS_TABLE_NAME, ("name", "execution_date"), True),
+        "frames_test_id_frame_date" : (FRAMES_TABLE_NAME, ("test_id", "frame_date"), False),
+        "frames_test_id_msg_type" : (FRAMES_TABLE_NAME, ("test_id", "msg_type", "frame_date"), False),
+        "frames_test_id_MACs" : (FRAMES_TABLE_NAME, ("test_id", "MAC_src", "MAC_dest", "frame_date"), False),
+    }
+
+    #
+    # Summary tables, updated in the transaction inserting the frames, so that the overview of a test is a lookup:
+    #   - per test: number of frames, earliest and latest frame_date, number of the last frame, and how many times it was relabelled,
+    #   - per test and value (or pair of values) of some fields: number of frames (the tables on fields which the layout doesn't have are skipped),
+    #   - per test, bucket size and bucket of frame_date: number of frames, a bucket being the frame_date (in ns) where it starts.
+    #     The bucket sizes (in ns) are listed in the "bucket_sizes" table, and can be changed with summarize.py.
+    # A frame whose value is NULL isn't counted in the tables of this value.
+    #
+    TEST_SUMMARY_TABLE_NAME = "test_summary"
+    TEST_SUMMARY_TABLE_STRUCT = """
+        test_id INTEGER,
+        nbr_of_frames INTEGER NOT NULL,
+        first_frame_date INTEGER,
+        last_frame_date INTEGER,
+        last_frame_number INTEGER NOT NULL,
+        label_version INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (test_id)"""
+
+    COUNTS_TABLES = {
+        "msg_type_counts" : ("msg_type",),
+        "MAC_counts" : ("MAC_src", "MAC_dest"),
+        "IP_counts" : ("IP_src", "IP_dest"),
+    }
+
+    BUCKET_SIZES_TABLE_NAME = "bucket_sizes"
+    BUCKET_SIZES_TABLE_STRUCT = """
+        bucket_size INTEGER,
+        PRIMARY KEY (bucket_size)"""
+
+    BUCKETS_TABLE_NAME = "frame_date_buckets"
+    BUCKETS_TABLE_STRUCT = """
+        test_id INTEGER,
+        bucket_size INTEGER,
+        bucket INTEGER,
+        nbr_of_frames INTEGER NOT NULL,
+        PRIMARY KEY (test_id, bucket_size, bucket)"""
+
+    #
+    # 1 second and 1 minute.
+    #
+    DEFAULT_BUCKET_SIZES = (timestamps.NS_PER_SECOND, 60 * timestamps.NS_PER_SECOND)
+
+    #
+    # Transfer functions (written by the web interface): the label of each value of a labelled field (see labels.py).
+    #
+    TRANSFER_FUNCTIONS_TABLE_NAME = "transfer_functions"
+    TRANSFER_FUNCTIONS_TABLE_STRUCT = """
+        field_name TEXT,
+        value INTEGER,
+        label TEXT NOT NULL,
+        PRIMARY KEY (field_name, value)"""
+
+    #
+    # Sharding (optional, see "shard_by"): the frames and the summaries of each test are written to the SQL DB of its shard,
+    # one per test ("test_<id>") or per month of the first frames of the test ("month_YYYY_MM"), in the "<db>.shards" directory.
+    # The SQL DB is then a catalog keeping the tests, the transfer functions, the bucket sizes, and the shard of each test.
+    # A test is never split across shards.
+    #
+    SHARD_BY = ("test", "month")
+    SHARDING_TABLE_NAME = "sharding"
+    SHARDING_TABLE_STRUCT = """
+        shard_by TEXT NOT NULL"""
+
+    TEST_SHARDS_TABLE_NAME = "test_shards"
+    TEST_SHARDS_TABLE_STRUCT = """
         test_id INTEGER,
+        shard TEXT NOT NULL,
+        PRIMARY KEY (test_id)"""
 
-        frame_date TEXT,
-        bench_3 TEXT,
-        bench_5 TEXT,
-        frame_size TEXT,
-
-        MAC_dest TEXT,
-        MAC_src TEXT,
-        field_1 TEXT,
-        field_2 TEXT,
-        field_3 TEXT,
-        field_4 TEXT,
-        field_5 TEXT,
-        field_6 TEXT,
-        IP_src TEXT,
-        IP_dest TEXT,
-        field_9 TEXT,
-        field_10 TEXT,
-        field_11 TEXT,
-        field_14 TEXT,
-        field_16 TEXT,
-        field_17 TEXT,
-        field_18 TEXT,
-        field_20 TEXT,
-        field_21 TEXT,
-        field_23 TEXT,
-        field_25 TEXT,
-        field_26 TEXT,
-        field_27 TEXT,
-        field_28 TEXT,
-        field_29 TEXT,
-        field_30 TEXT,
-        field_32 TEXT,
-        field_33 TEXT,
-        field_34 TEXT,
-        field_35 TEXT,
-
-        packet_date TEXT,
-
-        msg_type TEXT"""
-
-    def __init__(self, path_to_db: str="../../db.sql"):
+    SHARDS_DIRECTORY_EXTENSION = ".shards"
+    SHARD_EXTENSION = ".sql"
+
+    #
+    # SQLite attaches 10 DBs at most by default: the least recently used shards are detached beyond.
+    #
+    MAX_ATTACHED_SHARDS = 8
+
+    INSERT_FRAME_QUERY = f"""INSERT INTO {{}}.{FRAMES_TABLE_NAME} ({", ".join(FRAMES_TABLE_COLUMNS)}) VALUES ({", ".join("?" * len(FRAMES_TABLE_COLUMNS))})"""
+
+    #
+    # In WAL mode, NORMAL only syncs at checkpoints: a commit stays consistent on power loss, although the last ones may be lost.
+    # WAL lets the readers (web interface, query.py) go on during the ingest, and it stays once set.
+    #
+    INGEST_PRAGMAS = {
+        "synchronous" : "NORMAL",
+        "journal_mode" : "WAL",
+        "temp_store" : "MEMORY",
+        "cache_size" : "-65536",
+    }
+
+    def __init__(self, path_to_db: str="../../db.sql", batch_size: int=10000, transaction_size: int=200000, shard_by: str=None):
         self.path_to_db = path_to_db
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.shard_by = shard_by
         self.conn = None
         self.cursor = None
+        self.test_ids = {}
+        self.test_shards = {}
+        self.attached_shards = collections.OrderedDict()
+        self.ingesting = False
+        self.pending_rows = []
+        self.nbr_of_uncommitted_rows = 0
+        self.read_pool = None
+        self.stats = stats.Stats()
 
     def __del__(self):
         try:
@@ -70,6 +182,11 @@ class SQL:
         except:
             pass
 
+        try:
+            self.read_pool.close()
+        except:
+            pass
+
     def open_db(self) -> bool:
         """
             Opens the DB and creates required tables.
@@ -79,16 +196,43 @@ class SQL:
         """
         try:
             #
-            # Opens the db.
+            # Opens the db (the connection may be handed over to a writer thread, see pipeline.py).
             #
-            self.conn = sqlite3.connect(self.path_to_db)
+            self.conn = sqlite3.connect(self.path_to_db, check_same_thread=False)
             self.cursor = self.conn.cursor()
 
             #
-            # Creates the "tests" and "frames" tables.
+            # Refuses DBs written with another layout.
+            #
+            if self.get_schema_version() not in (0, 2, 3, SQL.SCHEMA_VERSION):
+                print(termcolor.colored("[-]", "red"), f"The SQL DB '{self.path_to_db}' uses an unknown layout")
+                raise
+
+            if self.get_schema_version() == 0 and self.has_table(SQL.FRAMES_TABLE_NAME):
+                print(termcolor.colored("[-]", "red"), f"The SQL DB '{self.path_to_db}' uses the old layout, run: ./migrate.py --db {self.path_to_db}")
+                raise
+
+            if self.get_schema_version() in (2, 3):
+                print(termcolor.colored("[-]", "red"), f"The SQL DB '{self.path_to_db}' has no {'summary tables' if self.get_schema_version() == 2 else 'labels'}, run: ./migrate.py --db {self.path_to_db}")
+                raise
+
+            #
+            # Shards the frames as the DB was first written, a DB holding its frames not being sharded afterwards.
             #
-            if not self.execute_query(f"""CREATE table IF NOT EXISTS {SQL.FRAMES_TABLE_NAME} ({SQL.FRAMES_TABLE_STRUCT})""") or \
-                not self.execute_query(f"""CREATE table IF NOT EXISTS {SQL.TESTS_TABLE_NAME} ({SQL.TESTS_TABLE_STRUCT})"""):
+            shard_by = self.get_shard_by()
+
+            if self.shard_by != None and shard_by == None and self.has_table(SQL.FRAMES_TABLE_NAME):
+                print(termcolor.colored("[-]", "red"), f"The SQL DB '{self.path_to_db}' already holds frames, it can't be sharded")
+                raise
+
+            if self.shard_by != None and shard_by != None and self.shard_by != shard_by:
+                print(termcolor.colored("[-]", "red"), f"The SQL DB '{self.path_to_db}' is sharded by {shard_by}, not by {self.shard_by}")
+                raise
+
+            if shard_by != None:
+                self.shard_by = shard_by
+
+            if not self.create_tables():
                 raise
 
         except:
@@ -97,7 +241,143 @@ class SQL:
 
         return True
 
-    def execute_query(self, query: str) -> bool:
+    def create_tables(self) -> bool:
+        """
+            Creates the "tests" and "transfer_functions" tables, and the "frames" table, the indexes and the summary tables
+            (in the shards, when sharded, the SQL DB keeping the shard of each test in the "test_shards" table).
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        if not self.execute_query(f"""CREATE table IF NOT EXISTS {SQL.TESTS_TABLE_NAME} ({SQL.TESTS_TABLE_STRUCT})""") or \
+            not self.execute_query(f"""CREATE table IF NOT EXISTS {SQL.TRANSFER_FUNCTIONS_TABLE_NAME} ({SQL.TRANSFER_FUNCTIONS_TABLE_STRUCT}) WITHOUT ROWID"""):
+            return False
+
+        for index_name, (table_name, columns, unique) in SQL.INDEXES.items():
+            if table_name == SQL.TESTS_TABLE_NAME and \
+                not self.execute_query(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)})"):
+                return False
+
+        if self.shard_by == None:
+            if not self.create_frames_tables():
+                return False
+
+        else:
+            if not self.execute_query(f"CREATE table IF NOT EXISTS {SQL.TEST_SHARDS_TABLE_NAME} ({SQL.TEST_SHARDS_TABLE_STRUCT})") or \
+                not self.execute_query(f"CREATE table IF NOT EXISTS {SQL.SHARDING_TABLE_NAME} ({SQL.SHARDING_TABLE_STRUCT})") or \
+                not self.create_summary_tables(None):
+                return False
+
+            if self.get_shard_by() == None and not self.execute_query(f"INSERT INTO {SQL.SHARDING_TABLE_NAME} (shard_by) VALUES (?)", (self.shard_by,)):
+                return False
+
+        return self.execute_query(f"PRAGMA user_version = {SQL.SCHEMA_VERSION}")
+
+    def create_frames_tables(self, schema: str="main") -> bool:
+        """
+            Creates the "frames" table, its indexes, and the summary tables, in the SQL DB or in a shard ("schema").
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        if not self.execute_query(f"""CREATE table IF NOT EXISTS {schema}.{SQL.FRAMES_TABLE_NAME} ({SQL.FRAMES_TABLE_STRUCT},\n        {SQL.FRAMES_TABLE_PRIMARY_KEY}) WITHOUT ROWID"""):
+            return False
+
+        for index_name, (table_name, columns, unique) in SQL.INDEXES.items():
+            if table_name != SQL.FRAMES_TABLE_NAME or not set(columns).issubset(SQL.FRAMES_TABLE_COLUMNS):
+                continue
+
+            if not self.execute_query(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {schema}.{index_name} ON {table_name} ({', '.join(columns)})"):
+                return False
+
+        if not self.create_summary_tables(schema):
+            return False
+
+        return schema == "main" or self.execute_query(f"PRAGMA {schema}.user_version = {SQL.SCHEMA_VERSION}")
+
+    def create_summary_tables(self, schema: str="main") -> bool:
+        """
+            Creates the summary tables, in the SQL DB or in a shard ("schema", None for the "bucket_sizes" table only),
+            the bucket sizes being set to DEFAULT_BUCKET_SIZES.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        if not self.has_table(SQL.BUCKET_SIZES_TABLE_NAME):
+            if not self.execute_query(f"CREATE table {SQL.BUCKET_SIZES_TABLE_NAME} ({SQL.BUCKET_SIZES_TABLE_STRUCT}) WITHOUT ROWID"):
+                return False
+
+            for bucket_size in SQL.DEFAULT_BUCKET_SIZES:
+                if not self.execute_query(f"INSERT INTO {SQL.BUCKET_SIZES_TABLE_NAME} (bucket_size) VALUES (?)", (bucket_size,)):
+                    return False
+
+        if schema == None:
+            return True
+
+        if not self.execute_query(f"CREATE table IF NOT EXISTS {schema}.{SQL.TEST_SUMMARY_TABLE_NAME} ({SQL.TEST_SUMMARY_TABLE_STRUCT})") or \
+            not self.execute_query(f"CREATE table IF NOT EXISTS {schema}.{SQL.BUCKETS_TABLE_NAME} ({SQL.BUCKETS_TABLE_STRUCT}) WITHOUT ROWID"):
+            return False
+
+        for table_name, columns in SQL.get_counts_tables().items():
+            table_struct = ",\n".join([ "        test_id INTEGER" ] + [ f"        {column} INTEGER" for column in columns ] + [ "        nbr_of_frames INTEGER NOT NULL" ])
+
+            if not self.execute_query(f"CREATE table IF NOT EXISTS {schema}.{table_name} ({table_struct},\n        PRIMARY KEY (test_id, {', '.join(columns)})) WITHOUT ROWID"):
+                return False
+
+        return True
+
+    @staticmethod
+    def get_counts_tables() -> dict:
+        """
+            Returns the tables of COUNTS_TABLES on fields which the layout has.
+        """
+
+        return { table_name : columns for table_name, columns in SQL.COUNTS_TABLES.items() if set(columns).issubset(SQL.FRAMES_TABLE_COLUMNS) }
+
+    def get_schema_version(self) -> int:
+        """
+            Returns the version of the DB layout (0 for an empty DB or a DB of version 1).
+        """
+
+        self.cursor.execute("PRAGMA user_version")
+
+        return self.cursor.fetchone()[0]
+
+    def has_table(self, table_name: str) -> bool:
+        """
+            Tells whether the DB has the given table.
+        """
+
+        self.cursor.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+
+        return self.cursor.fetchone() != None
+
+    def get_shard_by(self) -> str:
+        """
+            Returns how the frames of the DB are sharded ("test" or "month", see SHARD_BY), None if they aren't.
+        """
+
+        if not self.has_table(SQL.SHARDING_TABLE_NAME):
+            return None
+
+        self.cursor.execute(f"SELECT shard_by FROM {SQL.SHARDING_TABLE_NAME}")
+        shard_by = self.cursor.fetchone()
+
+        return None if shard_by == None else shard_by[0]
+
+    def has_column(self, table_name: str, column: str) -> bool:
+        """
+            Tells whether a table of the DB has the given column.
+        """
+
+        self.cursor.execute(f"SELECT 1 FROM pragma_table_info('{table_name}') WHERE name = ?", (column,))
+
+        return self.cursor.fetchone() != None
+
+    def execute_query(self, query: str, parameters: tuple=()) -> bool:
         """
             Facilitates query executions.
 
@@ -105,7 +385,7 @@ class SQL:
                    - false - in case of error.
         """
         try:
-            self.cursor.execute(query)
+            self.cursor.execute(query, parameters)
             self.conn.commit()
 
         except:
@@ -113,81 +393,753 @@ class SQL:
 
         return True
 
-    def insert_frame(self, frame: frame.Frame) -> bool:
+    def begin_ingest(self) -> bool:
         """
-            Creates a test if needed and inserts the frame into the "frames" table.
+            Tunes the connection for a bulk ingest run.
 
             Return - true - in case of success,
                    - false - in case of error.
         """
+        try:
+            self.ingesting = True
 
-        #
-        # Checks if the test exists
-        #
-        if not self.execute_query(f"""SELECT id FROM {self.TESTS_TABLE_NAME} WHERE name = "{frame.test_name}" AND execution_date = "{frame.test_execution_date}\""""):
+            for schema in [ "main" ] + list(self.attached_shards.values()):
+                self.set_pragmas(schema)
+
+        except:
             return False
 
-        #
-        # If not, creates it
-        #
-        test_id = self.cursor.fetchone()
+        self.pending_rows = []
+        self.nbr_of_uncommitted_rows = 0
 
-        if test_id == None:
-            if not self.execute_query(f"""INSERT INTO {self.TESTS_TABLE_NAME} (name, execution_date) VALUES ("{frame.test_name}", "{frame.test_execution_date}")"""):
-                print(f"""INSERT INTO {self.TESTS_TABLE_NAME} (name, execution_date) VALUES ("{frame.test_name}", "{frame.test_execution_date}")""")
-                return False
+        return True
+
+    def set_pragmas(self, schema: str):
+        """
+            Tunes the SQL DB or a shard ("schema") for a bulk ingest run (see begin_ingest()), or else only puts it in WAL mode.
+            Raises sqlite3.Error in case of error.
+        """
+
+        for pragma, value in SQL.INGEST_PRAGMAS.items():
+            if self.ingesting or pragma == "journal_mode":
+                self.cursor.execute(f"PRAGMA {schema}.{pragma} = {value}")
+
+    def end_ingest(self) -> bool:
+        """
+            Writes the remaining frames and commits the last transaction.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        return self.flush(commit=True)
+
+    def get_test_id(self, test_name: str, test_execution_date: str) -> int:
+        """
+            Finds the id of a test, and creates the test if needed.
+            The id is looked up once per test, and then cached.
+
+            Return - the id of the test,
+                   - None - in case of error.
+        """
+
+        key = (test_name, test_execution_date)
+
+        if key in self.test_ids:
+            return self.test_ids[key]
+
+        try:
+            self.cursor.execute(f"SELECT id FROM {SQL.TESTS_TABLE_NAME} WHERE name = ? AND execution_date = ?", key)
+            test_id = self.cursor.fetchone()
+
+            if test_id == None:
+                self.cursor.execute(f"INSERT INTO {SQL.TESTS_TABLE_NAME} (name, execution_date) VALUES (?, ?)", key)
+                test_id = (self.cursor.lastrowid,)
+
+        except:
+            return None
+
+        self.test_ids[key] = test_id[0]
+
+        return test_id[0]
+
+    def find_test_id(self, test_name: str, test_execution_date: str) -> int:
+        """
+            Finds the id of a test, without creating it.
+
+            Return - the id of the test,
+                   - None - if there is no such test (or in case of error).
+        """
+        try:
+            self.cursor.execute(f"SELECT id FROM {SQL.TESTS_TABLE_NAME} WHERE name = ? AND execution_date = ?", (test_name, test_execution_date))
+            test_id = self.cursor.fetchone()
+
+        except:
+            return None
+
+        return None if test_id == None else test_id[0]
+
+    def get_next_frame_number(self, test_id: int) -> int:
+        """
+            Finds the number of the frame following the last frame of a test in the DB.
+
+            Return - the frame number (0 if the test has no frame),
+                   - None - in case of error.
+        """
+        try:
+            shard = self.get_shard(test_id)
+
+            if shard == None:
+                return 0
+
+            self.cursor.execute(f"SELECT MAX(frame_number) FROM {self.attach_shard(shard)}.{SQL.FRAMES_TABLE_NAME} WHERE test_id = ?", (test_id,))
+            frame_number = self.cursor.fetchone()[0]
+
+        except:
+            return None
+
+        return 0 if frame_number == None else frame_number + 1
+
+    def count_frames(self, test_id: int, first_frame: int=0, last_frame: int=None) -> int:
+        """
+            Counts the frames [first_frame, last_frame[ of a test which are already in the DB.
+
+            Return - the number of frames,
+                   - None - in case of error.
+        """
+        try:
+            shard = self.get_shard(test_id)
+
+            if shard == None:
+                return 0
+
+            if last_frame == None:
+                self.cursor.execute(f"SELECT COUNT(*) FROM {self.attach_shard(shard)}.{SQL.FRAMES_TABLE_NAME} WHERE test_id = ? AND frame_number >= ?", (test_id, first_frame))
+            else:
+                self.cursor.execute(f"SELECT COUNT(*) FROM {self.attach_shard(shard)}.{SQL.FRAMES_TABLE_NAME} WHERE test_id = ? AND frame_number >= ? AND frame_number < ?", (test_id, first_frame, last_frame))
+
+            return self.cursor.fetchone()[0]
+
+        except:
+            return None
+
+    @staticmethod
+    def get_shards_directory(path_to_db: str) -> str:
+        """
+            Returns the directory of the shards of a SQL DB ("db.sql" -> "db.shards").
+        """
+
+        return os.path.splitext(path_to_db)[0] + SQL.SHARDS_DIRECTORY_EXTENSION
+
+    @staticmethod
+    def get_shard_path(path_to_db: str, shard: str) -> str:
+        """
+            Returns the path of the SQL DB of a shard of a SQL DB.
+        """
+
+        return os.path.join(SQL.get_shards_directory(path_to_db), shard + SQL.SHARD_EXTENSION)
+
+    def get_shard(self, test_id: int, rows: list=None) -> str:
+        """
+            Finds the shard holding the frames of a test ("main" when the DB isn't sharded).
+            A test without shard is given one when "rows", its first rows, are given: the shard is committed
+            in the "test_shards" table before the frames, so that no frame is ever written without its shard.
+
+            Return - the name of the shard,
+                   - None - if the test has no shard.
+                     Raises sqlite3.Error in case of error.
+        """
+
+        if self.shard_by == None:
+            return "main"
+
+        if test_id in self.test_shards:
+            return self.test_shards[test_id]
+
+        self.cursor.execute(f"SELECT shard FROM main.{SQL.TEST_SHARDS_TABLE_NAME} WHERE test_id = ?", (test_id,))
+        shard = self.cursor.fetchone()
+
+        if shard == None:
+            if rows == None:
+                return None
+
+            if self.shard_by == "test":
+                shard = f"test_{test_id}"
+            else:
+                frame_dates = [ row[SQL.FRAMES_TABLE_COLUMNS.index("frame_date")] for row in rows ]
+                frame_dates = [ frame_date for frame_date in frame_dates if frame_date != None ]
+
+                shard = "month_" + (str(numpy.datetime64(min(frame_dates), "ns").astype("datetime64[M]")).replace("-", "_") if len(frame_dates) != 0 else "undated")
+
+            self.cursor.execute(f"INSERT INTO main.{SQL.TEST_SHARDS_TABLE_NAME} (test_id, shard) VALUES (?, ?)", (test_id, shard))
+            self.commit()
+
+            shard = (shard,)
+
+        self.test_shards[test_id] = shard[0]
+
+        return shard[0]
+
+    def get_shards(self, test_id: int=None) -> list:
+        """
+            Returns the shards holding the frames of a test (of every test if "test_id" is None), [ "main" ] when the DB isn't sharded.
+            Raises sqlite3.Error in case of error.
+        """
+
+        if self.shard_by == None:
+            return [ "main" ]
+
+        if test_id != None:
+            shard = self.get_shard(test_id)
+
+            return [] if shard == None else [ shard ]
+
+        self.cursor.execute(f"SELECT DISTINCT shard FROM main.{SQL.TEST_SHARDS_TABLE_NAME} ORDER BY shard")
+
+        return [ shard for shard, in self.cursor.fetchall() ]
+
+    def attach_shard(self, shard: str) -> str:
+        """
+            Attaches the SQL DB of a shard (created if needed), the least recently used shard being detached beyond MAX_ATTACHED_SHARDS.
+            SQLite neither attaching nor detaching within a transaction, the current transaction is committed first.
+
+            Return - the schema of the shard ("main" when the DB isn't sharded).
+                     Raises sqlite3.Error in case of error.
+        """
+
+        if shard == "main":
+            return shard
+
+        if shard in self.attached_shards:
+            self.attached_shards.move_to_end(shard)
+            return self.attached_shards[shard]
+
+        if self.conn.in_transaction:
+            self.commit()
+
+        while len(self.attached_shards) >= SQL.MAX_ATTACHED_SHARDS:
+            _, schema = self.attached_shards.popitem(last=False)
+            self.cursor.execute(f"DETACH DATABASE {schema}")
+
+        os.makedirs(SQL.get_shards_directory(self.path_to_db), exist_ok=True)
+
+        schema = f"shard_{shard}"
+        self.cursor.execute(f"ATTACH DATABASE ? AS {schema}", (SQL.get_shard_path(self.path_to_db, shard),))
+        self.attached_shards[shard] = schema
+
+        self.set_pragmas(schema)
+
+        if not self.create_frames_tables(schema):
+            raise sqlite3.Error(f"the tables of the shard {shard} can't be created")
+
+        return schema
+
+    def insert_rows(self, rows: list) -> bool:
+        """
+            Queues rows for the "frames" table (one value per column of FRAMES_TABLE_COLUMNS).
+            Rows are written by batches of "batch_size", and committed every "transaction_size" rows.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        self.pending_rows.extend(rows)
+
+        if len(self.pending_rows) < self.batch_size:
+            return True
+
+        return self.flush(commit=self.nbr_of_uncommitted_rows + len(self.pending_rows) >= self.transaction_size)
+
+    def flush(self, commit: bool=False) -> bool:
+        """
+            Writes the queued rows, and optionally commits them.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+        try:
+            if len(self.pending_rows) != 0:
+                self.write_rows(self.get_rows_per_shard(self.pending_rows))
+
+                self.pending_rows = []
+
+            if commit:
+                self.commit()
+
+        except:
+            self.rollback()
+            return False
+
+        return True
+
+    def rollback(self):
+        """
+            Rolls the current transaction back, with the queued rows, and forgets the tests and shards it may have created.
+        """
+
+        try:
+            self.conn.rollback()
+
+        except:
+            pass
 
+        self.pending_rows = []
+        self.nbr_of_uncommitted_rows = 0
+        self.test_ids = {}
+        self.test_shards = {}
+
+    def insert_rows_in_savepoint(self, rows: list) -> bool:
+        """
+            Writes rows of the "frames" table at once, in a savepoint of the current transaction (committed every "transaction_size" rows),
+            so that, in case of error, only these rows are rolled back, and the rows written before them stay in the transaction.
+            The queued rows are written first.
+
+            Return - true - in case of success,
+                   - false - if the rows can't be written (the transaction then goes on).
+                     Raises sqlite3.Error if the transaction can't be written or committed (it is then rolled back).
+        """
+
+        if not self.flush():
+            raise sqlite3.Error("the queued rows can't be written")
+
+        try:
             #
-            # Gets the new id
+            # The shards are attached before the savepoint, as attaching one commits the current transaction.
             #
-            if not self.execute_query(f"""SELECT id FROM {self.TESTS_TABLE_NAME} WHERE name = "{frame.test_name}" AND execution_date = "{frame.test_execution_date}\""""):
-                return False
-            
-            test_id = self.cursor.fetchone()
+            rows_per_shard = self.get_rows_per_shard(rows)
+
+            for shard in rows_per_shard:
+                self.attach_shard(shard)
 
-        if test_id == None:
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN")
+
+            self.cursor.execute("SAVEPOINT rows")
+
+        except:
             return False
 
-        test_id = test_id[0]
-
-        return self.execute_query(f"""INSERT INTO {self.FRAMES_TABLE_NAME} ({SQL.FRAMES_TABLE_STRUCT.replace("TEXT", "").replace("INTEGER", "")}) VALUES (
-            "{test_id}",
-
-            "{frame.fields["frame_date"]["value"]}",
-            "{frame.fields["bench_3"]["value"]}",
-            "{frame.fields["bench_5"]["value"]}",
-            "{frame.fields["frame_size"]["value"]}",
-
-            "{frame.fields["MAC_dest"]["value"]}",
-            "{frame.fields["MAC_src"]["value"]}",
-            "{frame.fields["field_1"]["value"]}",
-            "{frame.fields["field_2"]["value"]}",
-            "{frame.fields["field_3"]["value"]}",
-            "{frame.fields["field_4"]["value"]}",
-            "{frame.fields["field_5"]["value"]}",
-            "{frame.fields["field_6"]["value"]}",
-            "{frame.fields["IP_src"]["value"]}",
-            "{frame.fields["IP_dest"]["value"]}",
-            "{frame.fields["field_9"]["value"]}",
-            "{frame.fields["field_10"]["value"]}",
-            "{frame.fields["field_11"]["value"]}",
-            "{frame.fields["field_14"]["value"]}",
-            "{frame.fields["field_16"]["value"]}",
-            "{frame.fields["field_17"]["value"]}",
-            "{frame.fields["field_18"]["value"]}",
-            "{frame.fields["field_20"]["value"]}",
-            "{frame.fields["field_21"]["value"]}",
-            "{frame.fields["field_23"]["value"]}",
-            "{frame.fields["field_25"]["value"]}",
-            "{frame.fields["field_26"]["value"]}",
-            "{frame.fields["field_27"]["value"]}",
-            "{frame.fields["field_28"]["value"]}",
-            "{frame.fields["field_29"]["value"]}",
-            "{frame.fields["field_30"]["value"]}",
-            "{frame.fields["field_32"]["value"]}",
-            "{frame.fields["field_33"]["value"]}",
-            "{frame.fields["field_34"]["value"]}",
-            "{frame.fields["field_35"]["value"]}",
-            "{frame.packet_date}",
-
-            "{frame.message_type}")""")
+        nbr_of_uncommitted_rows = self.nbr_of_uncommitted_rows
+
+        try:
+            self.write_rows(rows_per_shard)
+            self.cursor.execute("RELEASE rows")
+
+        except:
+            try:
+                self.cursor.execute("ROLLBACK TO rows")
+                self.cursor.execute("RELEASE rows")
+
+            except sqlite3.Error:
+                self.rollback()
+                raise
+
+            self.nbr_of_uncommitted_rows = nbr_of_uncommitted_rows
+            return False
+
+        if self.nbr_of_uncommitted_rows >= self.transaction_size and not self.flush(commit=True):
+            raise sqlite3.Error("the transaction can't be committed")
+
+        return True
+
+    def write_rows(self, rows_per_shard: dict):
+        """
+            Writes rows of the "frames" table, shard after shard, and adds them to the summary tables, without committing.
+            Raises sqlite3.Error in case of error.
+        """
+
+        for shard, rows in rows_per_shard.items():
+            schema = self.attach_shard(shard)
+
+            with self.stats.timer("db_insert"):
+                self.cursor.executemany(SQL.INSERT_FRAME_QUERY.format(schema), rows)
+
+            with self.stats.timer("db_summaries"):
+                self.update_summaries(rows, schema)
+
+            self.stats.count("db_rows", len(rows))
+            self.nbr_of_uncommitted_rows += len(rows)
+
+    def commit(self):
+        """
+            Commits the current transaction.
+            Raises sqlite3.Error in case of error.
+        """
+
+        with self.stats.timer("db_commit"):
+            self.conn.commit()
+
+        self.stats.count("db_transactions")
+        self.nbr_of_uncommitted_rows = 0
+
+    def get_rows_per_shard(self, rows: list) -> dict:
+        """
+            Splits rows of the "frames" table by shard, the tests keeping the order of their rows.
+
+            Return - a dict giving, for each shard, its rows.
+                     Raises sqlite3.Error in case of error.
+        """
+
+        if self.shard_by == None:
+            return { "main" : rows }
+
+        rows_per_test = collections.defaultdict(list)
+
+        for row in rows:
+            rows_per_test[row[0]].append(row)
+
+        rows_per_shard = collections.defaultdict(list)
+
+        for test_id, test_rows in rows_per_test.items():
+            rows_per_shard[self.get_shard(test_id, test_rows)].extend(test_rows)
+
+        return rows_per_shard
+
+    def update_summaries(self, rows: list, schema: str="main"):
+        """
+            Adds rows of the "frames" table to the summary tables of the SQL DB or of a shard ("schema"), in the current transaction.
+        """
+
+        test_ids = numpy.fromiter(map(operator.itemgetter(0), rows), dtype=numpy.int64, count=len(rows))
+        frame_numbers = numpy.fromiter(map(operator.itemgetter(1), rows), dtype=numpy.int64, count=len(rows))
+        frame_dates = list(map(operator.itemgetter(SQL.FRAMES_TABLE_COLUMNS.index("frame_date")), rows))
+
+        if None in frame_dates:
+            has_frame_date = numpy.array([ frame_date != None for frame_date in frame_dates ], dtype=bool)
+            frame_dates = numpy.array([ 0 if frame_date == None else frame_date for frame_date in frame_dates ], dtype=numpy.int64)
+        else:
+            has_frame_date = numpy.ones(len(rows), dtype=bool)
+            frame_dates = numpy.array(frame_dates, dtype=numpy.int64)
+
+        self.cursor.execute(f"SELECT bucket_size FROM main.{SQL.BUCKET_SIZES_TABLE_NAME}")
+        bucket_sizes = [ bucket_size for bucket_size, in self.cursor.fetchall() ]
+
+        test_summaries = []
+        buckets = []
+
+        for test_id in numpy.unique(test_ids).tolist():
+            in_test = test_ids == test_id
+            test_frame_dates = frame_dates[in_test & has_frame_date]
+
+            if len(test_frame_dates) == 0:
+                test_summaries.append((test_id, int(in_test.sum()), None, None, int(frame_numbers[in_test].max())))
+                continue
+
+            test_summaries.append((test_id, int(in_test.sum()), int(test_frame_dates.min()), int(test_frame_dates.max()), int(frame_numbers[in_test].max())))
+
+            for bucket_size in bucket_sizes:
+                test_buckets, nbrs_of_frames = numpy.unique(test_frame_dates // bucket_size * bucket_size, return_counts=True)
+                buckets.extend(zip(itertools.repeat(test_id), itertools.repeat(bucket_size), test_buckets.tolist(), nbrs_of_frames.tolist()))
+
+        self.cursor.executemany(f"""INSERT INTO {schema}.{SQL.TEST_SUMMARY_TABLE_NAME} (test_id, nbr_of_frames, first_frame_date, last_frame_date, last_frame_number) VALUES (?, ?, ?, ?, ?)
+                                    ON CONFLICT (test_id) DO UPDATE SET
+                                        nbr_of_frames = nbr_of_frames + excluded.nbr_of_frames,
+                                        first_frame_date = MIN(COALESCE(first_frame_date, excluded.first_frame_date), COALESCE(excluded.first_frame_date, first_frame_date)),
+                                        last_frame_date = MAX(COALESCE(last_frame_date, excluded.last_frame_date), COALESCE(excluded.last_frame_date, last_frame_date)),
+                                        last_frame_number = MAX(last_frame_number, excluded.last_frame_number)""", test_summaries)
+
+        self.cursor.executemany(f"""INSERT INTO {schema}.{SQL.BUCKETS_TABLE_NAME} (test_id, bucket_size, bucket, nbr_of_frames) VALUES (?, ?, ?, ?)
+                                    ON CONFLICT (test_id, bucket_size, bucket) DO UPDATE SET nbr_of_frames = nbr_of_frames + excluded.nbr_of_frames""", buckets)
+
+        for table_name, columns in SQL.get_counts_tables().items():
+            counts = collections.Counter(map(operator.itemgetter(0, *[ SQL.FRAMES_TABLE_COLUMNS.index(column) for column in columns ]), rows))
+
+            self.cursor.executemany(f"""INSERT INTO {schema}.{table_name} (test_id, {", ".join(columns)}, nbr_of_frames) VALUES ({", ".join("?" * (len(columns) + 2))})
+                                        ON CONFLICT (test_id, {", ".join(columns)}) DO UPDATE SET nbr_of_frames = nbr_of_frames + excluded.nbr_of_frames""",
+                                    [ values + (nbr_of_frames,) for values, nbr_of_frames in counts.items() if None not in values ])
+
+    def clear_summaries(self, test_id: int=None, schema: str="main"):
+        """
+            Deletes the summaries of a test (of every test if "test_id" is None) from the SQL DB or from a shard ("schema"), without committing.
+        """
+
+        where = "" if test_id == None else "WHERE test_id = ?"
+        parameters = () if test_id == None else (test_id,)
+
+        for table_name in [ SQL.TEST_SUMMARY_TABLE_NAME, SQL.BUCKETS_TABLE_NAME ] + list(SQL.get_counts_tables()):
+            self.cursor.execute(f"DELETE FROM {schema}.{table_name} {where}", parameters)
+
+    def get_bucket_sizes(self) -> list:
+        """
+            Returns the sizes (in ns) of the buckets of frame_date kept in the summary tables.
+        """
+
+        self.cursor.execute(f"SELECT bucket_size FROM main.{SQL.BUCKET_SIZES_TABLE_NAME} ORDER BY bucket_size")
+
+        return [ bucket_size for bucket_size, in self.cursor.fetchall() ]
+
+    def rebuild_summaries(self, test_id: int=None, bucket_sizes: list=None) -> bool:
+        """
+            Calculates the summaries of a test (of every test if "test_id" is None) again from its frames,
+            in one transaction (committed shard by shard when the DB is sharded, see attach_shard()).
+            "bucket_sizes" (in ns) replaces the bucket sizes of the DB first.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+        try:
+            if bucket_sizes != None:
+                self.cursor.execute(f"DELETE FROM main.{SQL.BUCKET_SIZES_TABLE_NAME}")
+                self.cursor.executemany(f"INSERT INTO main.{SQL.BUCKET_SIZES_TABLE_NAME} (bucket_size) VALUES (?)", [ (bucket_size,) for bucket_size in sorted(set(bucket_sizes)) ])
+
+            in_test = "" if test_id == None else "AND test_id = :test_id"
+
+            for shard in self.get_shards(test_id):
+                schema = self.attach_shard(shard)
+
+                #
+                # Keeps counting the relabellings (see query.py).
+                #
+                self.cursor.execute(f"SELECT test_id, label_version FROM {schema}.{SQL.TEST_SUMMARY_TABLE_NAME} WHERE 1 {in_test}", { "test_id" : test_id })
+                label_versions = self.cursor.fetchall()
+
+                self.clear_summaries(test_id, schema)
+
+                self.cursor.execute(f"""INSERT INTO {schema}.{SQL.TEST_SUMMARY_TABLE_NAME} (test_id, nbr_of_frames, first_frame_date, last_frame_date, last_frame_number)
+                                        SELECT test_id, COUNT(*), MIN(frame_date), MAX(frame_date), MAX(frame_number) FROM {schema}.{SQL.FRAMES_TABLE_NAME}
+                                        WHERE 1 {in_test} GROUP BY test_id""", { "test_id" : test_id })
+
+                self.cursor.executemany(f"UPDATE {schema}.{SQL.TEST_SUMMARY_TABLE_NAME} SET label_version = ? WHERE test_id = ?", [ (label_version, test_id) for test_id, label_version in label_versions ])
+
+                for bucket_size in self.get_bucket_sizes():
+                    self.cursor.execute(f"""INSERT INTO {schema}.{SQL.BUCKETS_TABLE_NAME} (test_id, bucket_size, bucket, nbr_of_frames)
+                                            SELECT test_id, :bucket_size, frame_date / :bucket_size * :bucket_size, COUNT(*) FROM {schema}.{SQL.FRAMES_TABLE_NAME}
+                                            WHERE frame_date IS NOT NULL {in_test} GROUP BY test_id, frame_date / :bucket_size""", { "test_id" : test_id, "bucket_size" : bucket_size })
+
+                for table_name, columns in SQL.get_counts_tables().items():
+                    self.cursor.execute(f"""INSERT INTO {schema}.{table_name} (test_id, {", ".join(columns)}, nbr_of_frames)
+                                            SELECT test_id, {", ".join(columns)}, COUNT(*) FROM {schema}.{SQL.FRAMES_TABLE_NAME}
+                                            WHERE {" AND ".join(f"{column} IS NOT NULL" for column in columns)} {in_test} GROUP BY test_id, {", ".join(columns)}""", { "test_id" : test_id })
+
+            self.conn.commit()
+
+        except:
+            self.conn.rollback()
+            return False
+
+        return True
+
+    def relabel(self, test_id: int=None, field_names: list=None) -> bool:
+        """
+            Labels the stored frames of a test (of every test if "test_id" is None) again, with the current transfer functions
+            of "field_names" (None for all the labelled fields), in one transaction (committed shard by shard when the DB is sharded).
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+        try:
+            in_test = "" if test_id == None else "WHERE test_id = :test_id"
+
+            for shard in self.get_shards(test_id):
+                schema = self.attach_shard(shard)
+
+                for column, field_name in SQL.LABEL_COLUMNS.items():
+                    if field_names != None and field_name not in field_names:
+                        continue
+
+                    self.cursor.execute(f"""UPDATE {schema}.{SQL.FRAMES_TABLE_NAME} SET {column} = (
+                                                SELECT label FROM main.{SQL.TRANSFER_FUNCTIONS_TABLE_NAME} WHERE field_name = :field_name AND value = {SQL.FRAMES_TABLE_NAME}.{field_name})
+                                            {in_test}""", { "test_id" : test_id, "field_name" : field_name })
+
+                #
+                # Tells the readers (see query.py) that the labels changed.
+                #
+                self.cursor.execute(f"UPDATE {schema}.{SQL.TEST_SUMMARY_TABLE_NAME} SET label_version = label_version + 1 {in_test}", { "test_id" : test_id })
+
+            self.conn.commit()
+
+        except:
+            self.conn.rollback()
+            return False
+
+        return True
+
+    def read(self, query: str, parameters: tuple=(), test_id: int=None, key=None) -> list:
+        """
+            Runs a query reading the committed frames (or summaries) of a test, or of every test if "test_id" is None,
+            on the pooled read-only connections of ReadPool (created once), without waiting for the ingest.
+
+            Return - the rows (see ReadPool.read()).
+                     Raises sqlite3.Error in case of error.
+        """
+
+        if self.read_pool == None:
+            self.read_pool = ReadPool(self.path_to_db)
+
+        return self.read_pool.read(query, parameters, test_id, key)
+
+    @staticmethod
+    def get_column(batch: frame.FrameBatch, column: str) -> list:
+        """
+            Returns the values of a column of a batch, None meaning that the field isn't part of the frame (or isn't stored).
+        """
+
+        if column in SQL.LABEL_COLUMNS:
+            field_name = SQL.LABEL_COLUMNS[column]
+
+            return batch.labels[field_name].tolist() if field_name in batch.labels and batch.is_kept(field_name) else [ None ] * len(batch)
+
+        if not batch.is_kept("frame_date" if column == "frame_date_sub_ns" else column):
+            return [ None ] * len(batch)
+
+        if column == "frame_date":
+            values = timestamps.frame_date_to_ns(batch.columns["frame_date"]).tolist()
+        elif column == "frame_date_sub_ns":
+            values = timestamps.frame_date_to_sub_ns(batch.columns["frame_date"]).tolist()
+        else:
+            values = batch.columns[column].tolist()
+
+        present = batch.is_present("frame_date" if column == "frame_date_sub_ns" else column)
+
+        if present.all():
+            return values
+
+        return [ value if is_present else None for value, is_present in zip(values, present.tolist()) ]
+
+    @staticmethod
+    def batch_to_rows(test_id: int, batch: frame.FrameBatch) -> list:
+        """
+            Returns the values of a batch of frames, one row per frame, in the order of FRAMES_TABLE_COLUMNS.
+        """
+
+        return list(zip(itertools.repeat(test_id, len(batch)), batch.get_frame_numbers().tolist(), *[ SQL.get_column(batch, column) for column in SQL.FRAMES_TABLE_COLUMNS[2:] ]))
+
+class ReadPool:
+    """
+        Read-only connections to a SQL DB and to its shards (see SQL), opened once and reused, from any thread.
+        The DBs being in WAL mode, the readers don't wait for an ingest, and the ingest doesn't wait for them.
+
+        A query reading the frames (or the summaries) of a test runs on the shard of the test.
+        A query reading every test is fanned out across the shards, "pool_size" at a time, and their rows merged.
+    """
+
+    POOL_SIZE = 4
+
+    def __init__(self, path_to_db: str="../../db.sql", pool_size: int=POOL_SIZE):
+        self.path_to_db = path_to_db
+        self.pool_size = pool_size
+        self.idle_connections = collections.defaultdict(list)
+        self.lock = threading.Lock()
+        self.executor = None
+
+        with self.connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SQL.SCHEMA_VERSION:
+                raise ValueError(f"The SQL DB '{path_to_db}' doesn't use the current layout, run: ./migrate.py --db {path_to_db}")
+
+            self.sharded = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SQL.SHARDING_TABLE_NAME,)).fetchone() != None
+
+    def __del__(self):
+        try:
+            self.close()
+        except:
+            pass
+
+    def close(self):
+        """
+            Closes the connections.
+        """
+
+        if self.executor != None:
+            self.executor.shutdown()
+            self.executor = None
+
+        with self.lock:
+            for connections in self.idle_connections.values():
+                for conn in connections:
+                    conn.close()
+
+            self.idle_connections.clear()
+
+    @contextlib.contextmanager
+    def connect(self, path_to_db: str=None):
+        """
+            Lends a read-only connection to the SQL DB, or to one of its shards ("path_to_db").
+
+            Return - a context manager giving the connection, which goes back to the pool afterwards.
+                     Raises sqlite3.Error if the DB can't be opened.
+        """
+
+        path_to_db = self.path_to_db if path_to_db == None else path_to_db
+
+        with self.lock:
+            conn = self.idle_connections[path_to_db].pop() if len(self.idle_connections[path_to_db]) != 0 else None
+
+        if conn == None:
+            conn = sqlite3.connect(pathlib.Path(os.path.abspath(path_to_db)).as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+
+        try:
+            yield conn
+
+        finally:
+            with self.lock:
+                if len(self.idle_connections[path_to_db]) < self.pool_size:
+                    self.idle_connections[path_to_db].append(conn)
+                    conn = None
+
+            if conn != None:
+                conn.close()
+
+    def get_shard_path(self, test_id: int) -> str:
+        """
+            Finds the SQL DB holding the frames of a test (the SQL DB itself when it isn't sharded).
+
+            Return - the path of the DB,
+                   - None - if the test has no frames.
+        """
+
+        if not self.sharded:
+            return self.path_to_db
+
+        with self.connect() as conn:
+            shard = conn.execute(f"SELECT shard FROM {SQL.TEST_SHARDS_TABLE_NAME} WHERE test_id = ?", (test_id,)).fetchone()
+
+        if shard == None or not os.path.exists(SQL.get_shard_path(self.path_to_db, shard[0])):
+            return None
+
+        return SQL.get_shard_path(self.path_to_db, shard[0])
+
+    def get_shard_paths(self) -> list:
+        """
+            Returns the SQL DBs holding frames (the SQL DB itself when it isn't sharded).
+        """
+
+        if not self.sharded:
+            return [ self.path_to_db ]
+
+        with self.connect() as conn:
+            shards = [ shard for shard, in conn.execute(f"SELECT DISTINCT shard FROM {SQL.TEST_SHARDS_TABLE_NAME} ORDER BY shard") ]
+
+        return [ SQL.get_shard_path(self.path_to_db, shard) for shard in shards if os.path.exists(SQL.get_shard_path(self.path_to_db, shard)) ]
+
+    def read(self, query: str, parameters: tuple=(), test_id: int=None, key=None) -> list:
+        """
+            Runs a query on the shard of a test, or on every shard if "test_id" is None.
+            The rows of the shards are put end to end, in the order of the shards, or merged by "key" (a function of a row)
+            when the query returns them sorted by "key" (ORDER BY). Aggregates (COUNT, SUM, ...) are per shard.
+
+            Return - the rows.
+                     Raises sqlite3.Error in case of error.
+        """
+
+        if test_id != None:
+            paths = [ self.get_shard_path(test_id) ]
+            paths = [ path for path in paths if path != None ]
+        else:
+            paths = self.get_shard_paths()
+
+        def read_shard(path_to_db: str) -> list:
+            with self.connect(path_to_db) as conn:
+                return conn.execute(query, parameters).fetchall()
+
+        if len(paths) <= 1:
+            rows_per_shard = [ read_shard(path) for path in paths ]
+        else:
+            if self.executor == None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.pool_size)
+
+            rows_per_shard = list(self.executor.map(read_shard, paths))
+
+        if key != None:
+            return list(heapq.merge(*rows_per_shard, key=key))
+
+        return list(itertools.chain.from_iterable(rows_per_shard))
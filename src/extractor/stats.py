@@ -0,0 +1,144 @@
+import collections
+import contextlib
+import json
+import sys
+import time
+import termcolor
+
+class Stats:
+    """
+        Cumulative time and counters of the stages of an ingest.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.counters = collections.defaultdict(int)
+
+    @contextlib.contextmanager
+    def timer(self, stage: str):
+        """
+            Adds the time spent in the "with" block to a stage.
+        """
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - start
+            self.calls[stage] += 1
+
+    def timed(self, iterable, stage: str):
+        """
+            Adds the time spent producing each item of an iterable to a stage.
+
+            Return - a generator of the items.
+        """
+
+        iterator = iter(iterable)
+
+        while True:
+            with self.timer(stage):
+                item = next(iterator, StopIteration)
+
+            if item is StopIteration:
+                return
+
+            yield item
+
+    def count(self, counter: str, value: int=1):
+        """
+            Adds a value to a counter.
+        """
+
+        self.counters[counter] += value
+
+    def to_dict(self) -> dict:
+        """
+            Returns the stats, as written by "save".
+            The stats are copied first, so they can be read while other threads update them.
+        """
+
+        wall_seconds = time.perf_counter() - self.start_time
+        seconds, calls, counters = dict(self.seconds), dict(self.calls), dict(self.counters)
+
+        return {
+            "wall_seconds" : wall_seconds,
+            "stages" : { stage : { "seconds" : stage_seconds, "calls" : calls.get(stage, 0) } for stage, stage_seconds in seconds.items() },
+            "counters" : counters,
+            "frames_per_second" : counters.get("frames", 0) / wall_seconds if wall_seconds > 0 else 0.0,
+            "bytes_per_second" : counters.get("bytes", 0) / wall_seconds if wall_seconds > 0 else 0.0,
+        }
+
+    def save(self, path_to_file: str) -> bool:
+        """
+            Writes the stats as JSON.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+        try:
+            with open(path_to_file, "w") as file:
+                json.dump(self.to_dict(), file, indent=4)
+
+        except OSError:
+            return False
+
+        return True
+
+class Progress:
+    """
+        Displays a counter on a single line, refreshed at most every "interval" seconds.
+        When the output isn't a terminal, only the last value is displayed.
+    """
+
+    INTERVAL = 0.25
+
+    def __init__(self, stream=None, interval: float=INTERVAL):
+        self.stream = stream if stream != None else sys.stdout
+        self.interval = interval
+        self.enabled = self.stream.isatty()
+        self.last_refresh = 0.0
+        self.value = 0
+        self.displayed = False
+
+    def update(self, value: int):
+        """
+            Sets the counter, displayed if the last refresh is old enough.
+        """
+
+        self.value = value
+
+        if self.enabled and time.monotonic() - self.last_refresh >= self.interval:
+            self.refresh()
+
+    def refresh(self):
+        """
+            Displays the counter.
+        """
+
+        self.stream.write(("\r" if self.enabled else "") + termcolor.colored("[*]", "blue") + f" {self.value}")
+        self.stream.flush()
+
+        self.last_refresh = time.monotonic()
+        self.displayed = True
+
+    def finish(self):
+        """
+            Displays the last value of the counter, and ends its line.
+        """
+
+        self.refresh()
+        self.end_line()
+
+    def end_line(self):
+        """
+            Ends the line of the counter (before an error message), if it was displayed.
+        """
+
+        if self.displayed:
+            self.stream.write("\n")
+            self.stream.flush()
+            self.displayed = False
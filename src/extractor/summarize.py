@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+import sql
+import timestamps
+import argparse
+import sys
+import termcolor
+
+class Summary:
+    """
+        Calculates the summary tables of a SQL DB again from its frames
+        (e.g. after changing the bucket sizes, or for frames written without them).
+    """
+
+    def __init__(self):
+        self.cmd_line_args = None
+        self.sql_db = None
+
+    def run(self) -> bool:
+        """
+            Rebuilds the summary tables.
+
+            Return - true - in case of success,
+                   - false - in case of error.
+        """
+
+        parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.RawDescriptionHelpFormatter(prog, max_help_position=300),
+                                        epilog="""
+examples:
+  {0}
+  {0} --db ../../db.sql --short test_name "YY-MM-DD hh-mm-ss"
+  {0} --bucket-sizes 1,60,3600
+
+notes:
+  [--short] and [--bucket-sizes] can't be used together: the bucket sizes are the same for every test.
+  Ingests started before [--bucket-sizes] keep the bucket sizes up to date as soon as their next batch of frames.""".format(sys.argv[0]))
+
+        parser.add_argument("--db", help="SQL DB to summarize (default: %(default)s)", metavar="PATH_TO_DB", default=sql.SQL().path_to_db)
+        parser.add_argument("--short", help="name and execution date of the only test to summarize", metavar=("TEST_NAME", "TEST_EXECUTION_DATE"), nargs=2)
+        parser.add_argument("--bucket-sizes", help="comma-separated sizes of the buckets of frame_date (default: the sizes of the DB)", metavar="SECONDS[,SECONDS...]")
+
+        self.cmd_line_args = parser.parse_args()
+
+        bucket_sizes = None
+
+        if self.cmd_line_args.bucket_sizes != None:
+            if self.cmd_line_args.short != None:
+                parser.error("[--short] and [--bucket-sizes] can't be used together")
+
+            try:
+                bucket_sizes = [ round(float(bucket_size) * timestamps.NS_PER_SECOND) for bucket_size in self.cmd_line_args.bucket_sizes.split(",") ]
+
+            except ValueError:
+                parser.error(f"invalid bucket sizes: {self.cmd_line_args.bucket_sizes}")
+
+            if any(bucket_size <= 0 for bucket_size in bucket_sizes):
+                parser.error("the bucket sizes must be positive")
+
+        self.sql_db = sql.SQL(self.cmd_line_args.db)
+
+        if not self.sql_db.open_db():
+            return False
+
+        test_id = None
+
+        if self.cmd_line_args.short != None:
+            test_id = self.sql_db.find_test_id(*self.cmd_line_args.short)
+
+            if test_id == None:
+                print(termcolor.colored("[-]", "red"), f"No test {self.cmd_line_args.short[0]} executed on {self.cmd_line_args.short[1]} in {self.cmd_line_args.db}")
+                return False
+
+        print(termcolor.colored("[+]", "yellow"), f"Summarizing {'every test' if test_id == None else self.cmd_line_args.short[0]} of {self.cmd_line_args.db}")
+
+        if not self.sql_db.rebuild_summaries(test_id, bucket_sizes):
+            print(termcolor.colored("[-]", "red"), "Error summarizing the SQL db")
+            return False
+
+        print(termcolor.colored("[*]", "blue"), f"Bucket sizes: {', '.join(f'{bucket_size / timestamps.NS_PER_SECOND:g}s' for bucket_size in self.sql_db.get_bucket_sizes())}")
+        print(termcolor.colored("[+]", "yellow"), "Done")
+        return True
+
+def main():
+    exit(0 if Summary().run() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+
+#
+# The modules of the extractor import each other by name, from src/extractor.
+#
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import generator
+import extractor
+import sql
+import contextlib
+import io
+import pytest
+
+#
+# Test of the frames ingested by run_extractor().
+#
+TEST_NAME = "test_a"
+TEST_EXECUTION_DATE = "24-03-01 10-00-00"
+
+@pytest.fixture
+def make_capture(tmp_path):
+    """
+        Writes a synthetic capture (see benchmarks/generator.py) in the temporary directory of the test.
+
+        Return - a function (nbr_of_frames, distribution, seed, name) -> path of the capture.
+    """
+
+    def make(nbr_of_frames: int, distribution: str="mixed", seed: int=0, name: str="capture.bin") -> str:
+        path_to_binary = str(tmp_path / name)
+        generator.CaptureGenerator(distribution, seed).write(path_to_binary, nbr_of_frames)
+
+        return path_to_binary
+
+    return make
+
+@pytest.fixture
+def run_extractor():
+    """
+        Ingests a binary file into a SQL db, as ./main.py does, the frames belonging to the test TEST_NAME executed on TEST_EXECUTION_DATE.
+
+        Return - a function (path_to_binary, path_to_db, options...) -> whether it succeeded, and the extraction error (None if there is none).
+    """
+
+    def run(path_to_binary: str, path_to_db: str, *options) -> tuple:
+        ext = extractor.Extractor()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not ext.parse_cmd_line_args([ "--binary", path_to_binary, "--short", TEST_NAME, TEST_EXECUTION_DATE, *options ]):
+                return False, None
+
+            ext.sql_db.path_to_db = path_to_db
+
+            ok = ext.insert_frames_into_db(ext.extract_frames_from_file())
+
+        return ok and not ext.extraction_error, ext.extraction_error_message
+
+    return run
+
+@pytest.fixture
+def ingest(run_extractor):
+    """
+        Ingests a binary file into a SQL db, as ./main.py does.
+
+        Return - a function (path_to_binary, path_to_db, options...) -> whether it succeeded.
+    """
+
+    return lambda path_to_binary, path_to_db, *options: run_extractor(path_to_binary, path_to_db, *options)[0]
+
+@pytest.fixture
+def read_frames():
+    """
+        Reads the frames of a SQL db (from its shards, when it is sharded), without the test id.
+
+        Return - a function (path_to_db) -> the rows, sorted by frame number.
+    """
+
+    def read(path_to_db: str) -> list:
+        rows = sql.ReadPool(path_to_db).read(f"SELECT {', '.join(sql.SQL.FRAMES_TABLE_COLUMNS[1:])} FROM {sql.SQL.FRAMES_TABLE_NAME} ORDER BY frame_number")
+
+        return sorted(rows, key=lambda row: row[0])
+
+    return read
+
+@pytest.fixture
+def expected_frames(make_capture, ingest, read_frames, tmp_path):
+    """
+        A capture of 5000 frames, ingested in one run with the default options.
+
+        Return - the path of the capture, and the rows of its frames (see read_frames).
+    """
+
+    path_to_binary = make_capture(5000, seed=10)
+
+    assert ingest(path_to_binary, str(tmp_path / "expected.sql"))
+
+    frames = read_frames(str(tmp_path / "expected.sql"))
+    assert len(frames) == 5000
+
+    return path_to_binary, frames
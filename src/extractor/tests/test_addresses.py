@@ -0,0 +1,40 @@
+import addresses
+import ipaddress
+import numpy
+import pytest
+
+def test_macs_are_formatted_with_2_hexa_digits_per_byte():
+    column = numpy.array([ 0, 0x001122334455, 0xaabbccddeeff, 0xffffffffffff, 0x001122334455 ], dtype=numpy.uint64)
+
+    assert addresses.format_macs(column) == [ "00:00:00:00:00:00", "00:11:22:33:44:55", "aa:bb:cc:dd:ee:ff", "ff:ff:ff:ff:ff:ff", "00:11:22:33:44:55" ]
+
+def test_ips_are_formatted_in_decimal():
+    generator = numpy.random.default_rng(0)
+    column = generator.integers(0, 2**32, 5000, dtype=numpy.uint64)
+
+    assert addresses.format_ips(column) == [ str(ipaddress.IPv4Address(ip)) for ip in column.tolist() ]
+
+def test_empty_column():
+    assert addresses.format_macs(numpy.zeros(0, dtype=numpy.uint64)) == []
+
+@pytest.mark.parametrize("mac", [ "aa:bb:cc:dd:ee:ff", "00:11:22:33:44:55", "0:1:2:3:4:5" ])
+def test_parse_mac_gives_back_the_mac(mac):
+    formatted = addresses.format_mac(addresses.parse_mac(mac))
+
+    assert formatted == ":".join(part.rjust(2, "0") for part in mac.split(":"))
+    assert addresses.parse_mac(mac.replace(":", "-")) == addresses.parse_mac(mac)
+
+@pytest.mark.parametrize("mac", [ "aa:bb:cc:dd:ee", "aa:bb:cc:dd:ee:ff:00", "aaa:bb:cc:dd:ee:ff", "gg:bb:cc:dd:ee:ff" ])
+def test_parse_invalid_mac(mac):
+    with pytest.raises(ValueError):
+        addresses.parse_mac(mac)
+
+@pytest.mark.parametrize("ip", [ "0.0.0.0", "10.0.0.1", "192.168.1.20", "255.255.255.255" ])
+def test_parse_ip_gives_back_the_ip(ip):
+    assert addresses.parse_ip(ip) == int(ipaddress.IPv4Address(ip))
+    assert addresses.format_ip(addresses.parse_ip(ip)) == ip
+
+@pytest.mark.parametrize("ip", [ "10.0.0", "10.0.0.256", "10.0.0.-1", "a.b.c.d" ])
+def test_parse_invalid_ip(ip):
+    with pytest.raises(ValueError):
+        addresses.parse_ip(ip)
@@ -0,0 +1,105 @@
+import campaign
+import sql
+import json
+import sys
+
+def run_campaign(monkeypatch, tmp_path, manifest: list, *options) -> tuple:
+    """
+        Runs ./campaign.py on a manifest of (binary file, test name, test execution date).
+
+        Return - whether every binary file was ingested, and the result of each of them (by binary file and test name).
+    """
+
+    path_to_manifest = str(tmp_path / "campaign.csv")
+    path_to_results = str(tmp_path / "results.json")
+
+    with open(path_to_manifest, "w") as file:
+        file.write("".join(f"{binary},{test_name},{test_execution_date}\n" for binary, test_name, test_execution_date in manifest))
+
+    monkeypatch.setattr(sys, "argv", [ "campaign.py", "--manifest", path_to_manifest, "--db", str(tmp_path / "db.sql"), "--results", path_to_results, *options ])
+
+    ok = campaign.Campaign().run()
+
+    with open(path_to_results) as file:
+        results = { (result["binary"], result["test_name"]) : result for result in json.load(file) }
+
+    return ok, results
+
+def count_frames(path_to_db: str) -> dict:
+    """
+        Counts the frames of each test of the SQL db.
+    """
+
+    conn = sql.sqlite3.connect(path_to_db)
+    counts = dict(conn.execute(f"""SELECT name, COUNT(frame_number) FROM {sql.SQL.TESTS_TABLE_NAME}
+                                   LEFT JOIN {sql.SQL.FRAMES_TABLE_NAME} ON test_id = {sql.SQL.TESTS_TABLE_NAME}.id GROUP BY name"""))
+    conn.close()
+
+    return counts
+
+def test_campaign_again_only_fails_the_ingested_tests(monkeypatch, tmp_path, make_capture):
+    capture_a = make_capture(3000, seed=20, name="a.bin")
+    capture_b = make_capture(2000, seed=21, name="b.bin")
+    capture_c = make_capture(1000, seed=22, name="c.bin")
+
+    ok, _ = run_campaign(monkeypatch, tmp_path, [ ("a.bin", "test_a", "24-03-01"), ("b.bin", "test_b", "24-03-01") ])
+    assert ok
+
+    ok, results = run_campaign(monkeypatch, tmp_path, [ ("a.bin", "test_a", "24-03-01"), ("b.bin", "test_b", "24-03-01"), ("c.bin", "-test_c", "24-03-01") ], "--jobs", "3")
+
+    assert not ok
+    assert not results[(capture_a, "test_a")]["ok"] and "already has 3000 frames" in results[(capture_a, "test_a")]["error"]
+    assert not results[(capture_b, "test_b")]["ok"] and "[--resume]" in results[(capture_b, "test_b")]["error"]
+    assert results[(capture_c, "-test_c")]["ok"]
+
+    assert count_frames(str(tmp_path / "db.sql")) == { "test_a" : 3000, "test_b" : 2000, "-test_c" : 1000 }
+
+def test_frames_which_cant_be_written_only_fail_their_binary_file(monkeypatch, tmp_path, make_capture):
+    capture_a = make_capture(40000, seed=23, name="a.bin")
+    capture_b = make_capture(30000, seed=24, name="b.bin")
+    capture_c = make_capture(20000, seed=25, name="c.bin")
+
+    #
+    # Both binary files of test_a give it the same frame numbers: the frames of the second one can't be written.
+    #
+    ok, results = run_campaign(monkeypatch, tmp_path, [ ("a.bin", "test_a", "24-03-01"), ("b.bin", "test_b", "24-03-01"), ("c.bin", "test_a", "24-03-01") ], "--jobs", "3")
+
+    assert not ok
+    assert results[(capture_b, "test_b")]["ok"]
+    assert [ results[(capture_a, "test_a")]["ok"], results[(capture_c, "test_a")]["ok"] ].count(False) == 1
+
+    frames = count_frames(str(tmp_path / "db.sql"))
+
+    assert frames["test_b"] == 30000
+    assert frames["test_a"] >= 20000
+
+def test_final_commit_failing_only_fails_the_uncommitted_binary_files(monkeypatch, tmp_path, make_capture):
+    capture_a = make_capture(3000, seed=26, name="a.bin")
+    capture_b = make_capture(2000, seed=27, name="b.bin")
+    capture_c = make_capture(1000, seed=28, name="c.bin")
+
+    def fail(sql_db) -> bool:
+        sql_db.rollback()
+        return False
+
+    monkeypatch.setattr(sql.SQL, "end_ingest", fail)
+
+    #
+    # One binary file at a time, each test in its shard: attaching the shard of a test commits the frames before it.
+    #
+    ok, results = run_campaign(monkeypatch, tmp_path, [ ("a.bin", "test_a", "24-03-01"), ("b.bin", "test_b", "24-03-01"), ("c.bin", "test_c", "24-03-01") ], "--jobs", "1", "--shard-by", "test")
+
+    assert not ok
+    assert results[(capture_a, "test_a")]["ok"] and results[(capture_b, "test_b")]["ok"]
+    assert not results[(capture_c, "test_c")]["ok"] and results[(capture_c, "test_c")]["error"] == "the frames couldn't be committed"
+
+    #
+    # (The tests are in the SQL db, and their frames in the shards.)
+    #
+    conn = sql.sqlite3.connect(str(tmp_path / "db.sql"))
+    test_names = dict(conn.execute(f"SELECT id, name FROM {sql.SQL.TESTS_TABLE_NAME}"))
+    conn.close()
+
+    frames = sql.ReadPool(str(tmp_path / "db.sql")).read(f"SELECT test_id, COUNT(*) FROM {sql.SQL.FRAMES_TABLE_NAME} GROUP BY test_id")
+
+    assert { test_names[test_id] : nbr_of_frames for test_id, nbr_of_frames in frames } == { "test_a" : 3000, "test_b" : 2000 }
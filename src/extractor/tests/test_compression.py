@@ -0,0 +1,107 @@
+import compression
+import bz2
+import gzip
+import lzma
+import os
+import pytest
+
+def write_members(path, members: list) -> str:
+    with open(path, "wb") as file:
+        for member in members:
+            file.write(member)
+
+    return str(path)
+
+def read_in_pieces(stream, size: int=12345) -> bytes:
+    parts = []
+
+    while True:
+        part = stream.read(size)
+
+        if len(part) == 0:
+            return b"".join(parts)
+
+        parts.append(part)
+
+@pytest.fixture
+def decompressed_members(monkeypatch) -> list:
+    """
+        Records where members are decompressed ahead.
+    """
+
+    starts = []
+    decompress_member = compression.ParallelGzipFile.decompress_member
+
+    def record(buffer, start: int, max_size: int) -> tuple:
+        starts.append(start)
+        return decompress_member(buffer, start, max_size)
+
+    monkeypatch.setattr(compression.ParallelGzipFile, "decompress_member", staticmethod(record))
+
+    return starts
+
+@pytest.mark.parametrize("options", [ (), ("--jobs", "3") ])
+def test_gzip_members_give_the_same_rows(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+
+    #
+    # Several members, cut anywhere in the frames.
+    #
+    with open(path_to_binary, "rb") as file:
+        buffer = file.read()
+
+    path_to_compressed_binary = write_members(tmp_path / "capture.bin.gz", [ gzip.compress(buffer[start:start + 100000]) for start in range(0, len(buffer), 100000) ])
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_compressed_binary, path_to_db, *options)
+    assert read_frames(path_to_db) == frames
+
+@pytest.mark.parametrize("codec, compress", [ ("gzip", gzip.compress), ("xz", lzma.compress), ("bz2", bz2.compress) ])
+def test_open_stream(tmp_path, codec, compress):
+    data = os.urandom(100000)
+    path_to_file = write_members(tmp_path / "file", [ compress(data) ])
+
+    assert compression.detect(path_to_file) == codec
+
+    with compression.open_stream(path_to_file) as stream:
+        assert stream.read() == data
+
+def test_open_stream_rejects_an_uncompressed_file(tmp_path):
+    with pytest.raises(ValueError):
+        compression.open_stream(write_members(tmp_path / "file", [ b"\x00" * 100 ]), 4)
+
+def test_single_member_is_only_streamed(tmp_path, decompressed_members):
+    #
+    # Stored blocks keep the gzip headers of the data as they are.
+    #
+    data = (gzip.compress(b"a" * 1000) + os.urandom(1000)) * 1000
+    path_to_file = write_members(tmp_path / "file.gz", [ gzip.compress(data, compresslevel=0), b"\x00" * 100 ])
+
+    with compression.open_stream(path_to_file, 4) as stream:
+        assert read_in_pieces(stream) == data
+
+    assert decompressed_members == []
+
+def test_members_are_decompressed_ahead(tmp_path, decompressed_members):
+    members = [ os.urandom(50000) + gzip.compress(os.urandom(100)) for _ in range(40) ]
+    compressed_members = [ gzip.compress(member, compresslevel=0) for member in members ]
+    path_to_file = write_members(tmp_path / "file.gz", compressed_members)
+
+    with compression.open_stream(path_to_file, 2) as stream:
+        assert read_in_pieces(stream) == b"".join(members)
+
+    #
+    # The members after the first one, and the headers inside them, within 4 members of the one being read.
+    #
+    starts = [ sum(len(member) for member in compressed_members[:i]) for i in range(len(members)) ]
+
+    assert set(starts[1:]) <= set(decompressed_members)
+    assert len(decompressed_members) <= 2 * len(members)
+
+def test_truncated_member_raises(tmp_path):
+    compressed_members = [ gzip.compress(os.urandom(10000)) for _ in range(5) ]
+    path_to_file = write_members(tmp_path / "file.gz", compressed_members[:-1] + [ compressed_members[-1][:-100] ])
+
+    with compression.open_stream(path_to_file, 3) as stream:
+        with pytest.raises((OSError, EOFError)):
+            stream.read()
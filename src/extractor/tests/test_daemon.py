@@ -0,0 +1,119 @@
+import campaign
+import daemon
+import pipeline
+import sql
+import argparse
+import concurrent.futures
+import pytest
+
+@pytest.fixture
+def ingest_daemon(tmp_path):
+    """
+        A daemon ready to run jobs (without its control socket and spool directory).
+    """
+
+    ingest_daemon = daemon.Daemon()
+    ingest_daemon.cmd_line_args = argparse.Namespace(db=str(tmp_path / "db.sql"), jobs=3, queue_size=pipeline.SQLWriter.QUEUE_SIZE, shard_by=None)
+    ingest_daemon.sql_db = sql.SQL(ingest_daemon.cmd_line_args.db)
+
+    assert ingest_daemon.sql_db.open_db() and ingest_daemon.sql_db.begin_ingest() and ingest_daemon.load_transfer_functions()
+
+    ingest_daemon.writer = pipeline.SQLWriter(ingest_daemon.insert_batch_into_db, ingest_daemon.cmd_line_args.queue_size, ingest_daemon.stats)
+    ingest_daemon.writer.start()
+
+    yield ingest_daemon
+
+    ingest_daemon.writer.close()
+
+def count_committed_frames(path_to_db: str) -> dict:
+    """
+        Counts the committed frames of each test (from another connection).
+    """
+
+    conn = sql.sqlite3.connect(path_to_db)
+    counts = dict(conn.execute(f"""SELECT name, COUNT(*) FROM {sql.SQL.FRAMES_TABLE_NAME} JOIN {sql.SQL.TESTS_TABLE_NAME} ON test_id = {sql.SQL.TESTS_TABLE_NAME}.id GROUP BY name"""))
+    conn.close()
+
+    return counts
+
+def run_jobs(ingest_daemon, captures: list) -> list:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(captures)) as executor:
+        return list(executor.map(ingest_daemon.ingest_job, [ daemon.Job(job_id, capture) for job_id, capture in enumerate(captures, 1) ]))
+
+def test_concurrent_jobs_are_committed_on_their_own(ingest_daemon, make_capture):
+    capture_a = campaign.Capture(make_capture(40000, seed=30, name="a.bin"), None, "test_a", "24-03-01")
+    capture_b = campaign.Capture(make_capture(30000, seed=31, name="b.bin"), None, "test_b", "24-03-01")
+    capture_c = campaign.Capture(make_capture(20000, seed=32, name="c.bin"), None, "test_a", "24-03-01")
+
+    #
+    # The jobs of test_a both start from its frame 0: the frames of one of them can't be written.
+    #
+    results = run_jobs(ingest_daemon, [ capture_a, capture_b, capture_c ])
+
+    assert results[1]["ok"]
+    assert [ results[0]["ok"], results[2]["ok"] ].count(False) == 1
+
+    frames = count_committed_frames(ingest_daemon.cmd_line_args.db)
+
+    assert frames["test_b"] == 30000
+    assert frames["test_a"] >= 20000
+
+def test_job_whose_commit_fails_is_submitted_again(ingest_daemon, make_capture, monkeypatch):
+    capture_a = campaign.Capture(make_capture(5000, seed=33, name="a.bin"), None, "test_a", "24-03-01")
+    capture_b = campaign.Capture(make_capture(3000, seed=34, name="b.bin"), None, "test_b", "24-03-01")
+
+    commit = ingest_daemon.sql_db.commit
+
+    def fail_once():
+        monkeypatch.setattr(ingest_daemon.sql_db, "commit", commit)
+        raise sql.sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(ingest_daemon.sql_db, "commit", fail_once)
+
+    failed_writer = ingest_daemon.writer
+    result = ingest_daemon.ingest_job(daemon.Job(1, capture_a))
+
+    assert not result["ok"] and result["error"] == "the frames couldn't be committed"
+
+    #
+    # The writer is replaced, and a job still handing frames to the previous one fails.
+    #
+    assert ingest_daemon.writer is not failed_writer
+    assert not ingest_daemon.ingest_capture(capture_b, 0, failed_writer)["ok"]
+
+    assert [ result["ok"] for result in run_jobs(ingest_daemon, [ capture_a, capture_b ]) ] == [ True, True ]
+    assert count_committed_frames(ingest_daemon.cmd_line_args.db) == { "test_a" : 5000, "test_b" : 3000 }
+
+def test_job_raising_an_error_fails_on_its_own(ingest_daemon, make_capture, tmp_path, monkeypatch):
+    capture_a = campaign.Capture(make_capture(1000, seed=35, name="a.bin"), None, "test_a", "24-03-01")
+    capture_b = campaign.Capture(make_capture(2000, seed=36, name="b.bin"), None, "test_b", "24-03-01")
+
+    ingest_job = ingest_daemon.ingest_job
+
+    def fail_on_a(job: daemon.Job) -> dict:
+        if job.capture is capture_a:
+            raise KeyError("frame_size")
+
+        return ingest_job(job)
+
+    monkeypatch.setattr(ingest_daemon, "ingest_job", fail_on_a)
+
+    #
+    # The spooled job can't be archived either (the spool directory is a file).
+    #
+    (tmp_path / "spool").write_text("")
+    ingest_daemon.cmd_line_args.spool = str(tmp_path / "spool")
+
+    jobs = [ daemon.Job(1, capture_a, spooled=True), daemon.Job(2, capture_b) ]
+
+    for job in jobs:
+        ingest_daemon.jobs.put(job)
+
+    ingest_daemon.jobs.put(daemon.Daemon.END)
+    ingest_daemon.work()
+
+    assert all(job.done.is_set() for job in jobs)
+    assert [ (job.result["ok"], job.result["error"]) for job in jobs ] == [ (False, "'frame_size'"), (True, None) ]
+    assert ingest_daemon.nbr_of_running_jobs == 0
+    assert (ingest_daemon.stats.counters["jobs_done"], ingest_daemon.stats.counters["jobs_failed"]) == (1, 1)
+    assert count_committed_frames(ingest_daemon.cmd_line_args.db) == { "test_b" : 2000 }
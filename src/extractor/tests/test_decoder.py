@@ -0,0 +1,128 @@
+import decoder
+import frame
+import numpy
+import pytest
+
+def reference_decode(buffer: bytes, offset: int) -> dict:
+    """
+        Decodes a frame one field after the other, as the bitstring reader did before the vectorized decoder:
+        the known fields are read while they fit in the frame_size bytes following the header.
+
+        Return - the raw value of each kept field which is part of the frame.
+    """
+
+    frame_size = int.from_bytes(buffer[offset + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES:offset + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES + 4], "big")
+    nbr_of_bits = (frame.Frame.HEADER_SIZE_IN_BYTES + frame_size) * 8
+    bits = int.from_bytes(buffer[offset:offset + frame.Frame.HEADER_SIZE_IN_BYTES + frame_size], "big")
+
+    values = {}
+    bit_offset = 0
+
+    for field in frame.Frame.LAYOUT:
+        if bit_offset + field.bits > nbr_of_bits:
+            break
+
+        if not field.useless:
+            values[field.name] = (bits >> (nbr_of_bits - bit_offset - field.bits)) & ((1 << field.bits) - 1)
+
+        bit_offset += field.bits
+
+    return values
+
+def reference_offsets(buffer: bytes) -> list:
+    """
+        Chains through the frame headers, one frame at a time.
+    """
+
+    offsets = []
+    position = 0
+
+    while position + frame.Frame.HEADER_SIZE_IN_BYTES <= len(buffer):
+        frame_size = int.from_bytes(buffer[position + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES:position + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES + 4], "big")
+
+        if position + frame.Frame.HEADER_SIZE_IN_BYTES + frame_size > len(buffer):
+            break
+
+        offsets.append(position)
+        position += frame.Frame.HEADER_SIZE_IN_BYTES + frame_size
+
+    return offsets
+
+@pytest.mark.parametrize("distribution", [ "full", "truncated", "payload", "mixed" ])
+def test_decoder_matches_reference_decode(make_capture, distribution):
+    with open(make_capture(2000, distribution, seed=1), "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets, end = batch_decoder.scan(buffer)
+
+    assert offsets.tolist() == reference_offsets(buffer)
+    assert end == len(buffer)
+
+    batch = batch_decoder.decode_batch(buffer, offsets)
+
+    for i, offset in enumerate(offsets.tolist()):
+        expected = reference_decode(buffer, offset)
+
+        for field_name in frame.Frame.KEPT_FIELDS:
+            assert bool(batch.is_present(field_name)[i]) == (field_name in expected), (i, field_name)
+            assert int(batch.columns[field_name][i]) == expected.get(field_name, 0), (i, field_name)
+
+def test_decoder_decodes_only_the_given_fields(make_capture):
+    with open(make_capture(500, seed=2), "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets, _ = batch_decoder.scan(buffer)
+
+    everything = batch_decoder.decode_batch(buffer, offsets)
+    some = batch_decoder.decode_batch(buffer, offsets, fields={ "MAC_src", "field_30" })
+
+    for field_name in ("MAC_src", "field_30", "frame_size"):
+        assert numpy.array_equal(some.columns[field_name], everything.columns[field_name])
+
+    assert not some.columns["IP_src"].any()
+
+def test_derived_fields_match_reference_decode(make_capture):
+    with open(make_capture(1000, "full", seed=3), "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets, _ = batch_decoder.scan(buffer)
+    batch = batch_decoder.decode_batch(buffer, offsets)
+
+    msg_types = batch.calculate_derived_column("msg_type")
+    packet_dates = batch.calculate_derived_column("packet_date")
+
+    for i, offset in enumerate(offsets.tolist()):
+        expected = reference_decode(buffer, offset)
+
+        msg_type = 0
+        for field_name in frame.Frame.DERIVED_FIELDS["msg_type"]:
+            msg_type = (msg_type << frame.Frame.LAYOUT[frame.Frame.FIELD_INDEXES[field_name]].bits) | expected[field_name]
+
+        assert int(msg_types[i]) == msg_type
+        assert int(packet_dates[i]) == ((expected["field_33"] + expected["field_34"]) << 16) + expected["field_35"]
+
+def test_scan_stops_on_an_incomplete_frame(make_capture):
+    with open(make_capture(100, seed=4), "rb") as file:
+        buffer = file.read()
+
+    offsets, end = decoder.BatchDecoder().scan(buffer[:-1])
+
+    assert len(offsets) == 99
+    assert end == offsets[-1] + frame.Frame.HEADER_SIZE_IN_BYTES + int.from_bytes(buffer[int(offsets[-1]) + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES:int(offsets[-1]) + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES + 4], "big")
+
+def test_scan_in_chunks_finds_the_same_frames(make_capture):
+    with open(make_capture(1000, seed=5), "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets = []
+    position = 0
+
+    while position < len(buffer):
+        chunk, position = batch_decoder.scan(buffer, position, max_frames=77)
+        offsets.extend(chunk.tolist())
+
+    assert offsets == reference_offsets(buffer)
@@ -0,0 +1,119 @@
+import decoder
+import extractor
+import filters
+import timestamps
+import contextlib
+import io
+import numpy
+import pytest
+
+@pytest.mark.parametrize("text, expected", [
+    ("field_1 == 0x10", ("field_1", "==", 16)),
+    ("field_1 != 16", ("field_1", "!=", 16)),
+    ("  field_1<=3 ", ("field_1", "<=", 3)),
+    ("msg_type in (0x1234, 0x5678,)", ("msg_type", "in", [ 0x1234, 0x5678 ])),
+    ("msg_type not   in (1)", ("msg_type", "not in", [ 1 ])),
+    ("MAC_src == aa:bb:cc:dd:ee:ff", ("MAC_src", "==", 0xaabbccddeeff)),
+    ("IP_dest == '10.0.0.1'", ("IP_dest", "==", 0x0a000001)),
+    ("frame_date >= 2024-01-01 00:00:00", ("frame_date", ">=", 1704067200 * 10**10)),
+])
+def test_parse(text, expected):
+    predicate = filters.Predicate.parse(text)
+
+    assert (predicate.field_name, predicate.operator, predicate.values) == expected
+
+@pytest.mark.parametrize("text", [
+    "field_1",
+    "unknown_field == 1",
+    "bench_1 == 1",
+    "field_1 == abc",
+    "field_1 in 1, 2",
+    "field_1 == -1",
+    "MAC_src == aa:bb",
+    "frame_date >= yesterday",
+])
+def test_parse_rejects_invalid_predicates(text):
+    with pytest.raises(ValueError):
+        filters.Predicate.parse(text)
+
+def test_evaluate_matches_python(make_capture):
+    with open(make_capture(3000, seed=5), "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets, _ = batch_decoder.scan(buffer)
+    batch = batch_decoder.decode_batch(buffer, offsets)
+
+    field_1 = batch.columns["field_1"].tolist()
+    has_field_1 = batch.is_present("field_1").tolist()
+    msg_types = batch.calculate_derived_column("msg_type").tolist()
+    has_msg_type = batch.is_present("msg_type").tolist()
+    frame_dates = batch.columns["frame_date"].tolist()
+
+    some_msg_types = sorted({ msg_type for msg_type, present in zip(msg_types, has_msg_type) if present })[:5]
+    middle_date = int(numpy.median(frame_dates)) // timestamps.FRAME_DATE_TICKS_PER_NS
+
+    predicates = [
+        "field_1 < 0x8000",
+        f"msg_type in ({', '.join(hex(msg_type) for msg_type in some_msg_types)})",
+        f"frame_date >= {numpy.datetime64(middle_date, 'ns')}",
+    ]
+
+    frame_filter = filters.Filter([ filters.Predicate.parse(predicate) for predicate in predicates ])
+
+    expected = [ has_field_1[i] and field_1[i] < 0x8000 and has_msg_type[i] and msg_types[i] in some_msg_types and frame_dates[i] >= middle_date * timestamps.FRAME_DATE_TICKS_PER_NS \
+                 for i in range(len(batch)) ]
+
+    assert frame_filter.evaluate(batch).tolist() == expected
+    assert frame_filter.get_fields() == { "field_1", "frame_date" } | set(filters.frame.Frame.DERIVED_FIELDS["msg_type"])
+
+def test_absent_fields_never_match(make_capture):
+    with open(make_capture(500, "truncated", seed=6), "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets, _ = batch_decoder.scan(buffer)
+    batch = batch_decoder.decode_batch(buffer, offsets)
+
+    matches = filters.Predicate.parse("field_35 != 0x12345").evaluate(batch)
+
+    assert not matches[~batch.is_present("field_35")].any()
+    assert matches[batch.is_present("field_35")].all()
+
+def extract_frames(path_to_binary: str, *options) -> list:
+    """
+        Extracts the frames of a binary file (without a SQL db), as main.py does.
+
+        Return - the displayed values of each frame.
+    """
+
+    ext = extractor.Extractor()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert ext.parse_cmd_line_args([ "--binary", path_to_binary, "--short", "test_a", "24-03-01 10-00-00", *options ])
+
+        frames = [ { field_name : batch.get_values(field_name)[i] for field_name in ("MAC_src", "msg_type") } for batch in ext.extract_frames_from_file() for i in range(len(batch)) ]
+
+    assert not ext.extraction_error
+
+    return frames
+
+def test_where_matches_displayed_values(make_capture):
+    path_to_binary = make_capture(3000, "full", seed=11)
+
+    frames = extract_frames(path_to_binary)
+    msg_type = frames[0]["msg_type"]
+    mac_src = frames[0]["MAC_src"]
+
+    assert msg_type.startswith("0x")
+
+    assert extract_frames(path_to_binary, "--where", f"msg_type == {msg_type}") == [ values for values in frames if values["msg_type"] == msg_type ]
+    assert extract_frames(path_to_binary, "--where", f"msg_type in ({msg_type}, {frames[-1]['msg_type']})") == \
+           [ values for values in frames if values["msg_type"] in (msg_type, frames[-1]["msg_type"]) ]
+    assert extract_frames(path_to_binary, "--where", f"MAC_src == {mac_src}") == [ values for values in frames if values["MAC_src"] == mac_src ]
+
+def test_fields_keep_the_displayed_values(make_capture):
+    path_to_binary = make_capture(1000, "full", seed=12)
+
+    assert extract_frames(path_to_binary, "--fields", "MAC_src,msg_type") == extract_frames(path_to_binary)
+    assert extract_frames(path_to_binary, "--fields", "MAC_src,msg_type", "--where", "field_1 < 0x8000") == extract_frames(path_to_binary, "--where", "field_1 < 0x8000")
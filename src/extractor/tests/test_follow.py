@@ -0,0 +1,111 @@
+import decoder
+import extractor
+import reader
+import json
+import sys
+import threading
+import time
+import pytest
+
+def append_slowly(path_to_binary: str, buffer: bytes, nbr_of_pieces: int=10, delay: float=0.05) -> threading.Thread:
+    """
+        Writes a capture piece after piece (cut anywhere in the frames), as a capture which is still being written.
+
+        Return - the thread writing the capture.
+    """
+
+    def write():
+        piece_size = len(buffer) // nbr_of_pieces + 1
+
+        with open(path_to_binary, "ab") as file:
+            for start in range(0, len(buffer), piece_size):
+                file.write(buffer[start:start + piece_size])
+                file.flush()
+
+                time.sleep(delay)
+
+    open(path_to_binary, "wb").close()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+
+    return thread
+
+def test_follow_reads_the_frames_as_they_are_written(make_capture, tmp_path):
+    with open(make_capture(3000, seed=100), "rb") as file:
+        buffer = file.read()
+
+    path_to_binary = str(tmp_path / "growing.bin")
+    thread = append_slowly(path_to_binary, buffer)
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        batches = list(capture.follow(256, poll_interval=0.01, timeout=0.5))
+
+    thread.join()
+
+    assert [ offset for _, offsets, _ in batches for offset in offsets.tolist() ] == decoder.BatchDecoder().scan(buffer)[0].tolist()
+    assert [ first_frame_number for _, _, first_frame_number in batches ] == sorted(set(first_frame_number for _, _, first_frame_number in batches))
+
+def test_follow_from_a_frame_not_written_yet(make_capture, tmp_path):
+    with open(make_capture(3000, seed=101), "rb") as file:
+        buffer = file.read()
+
+    offsets = decoder.BatchDecoder().scan(buffer)[0].tolist()
+
+    path_to_binary = str(tmp_path / "growing.bin")
+    thread = append_slowly(path_to_binary, buffer)
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        batches = list(capture.follow(256, 2900, 2950, poll_interval=0.01))
+
+    thread.join()
+
+    assert [ offset for _, offsets, _ in batches for offset in offsets.tolist() ] == offsets[2900:2950]
+
+@pytest.mark.parametrize("options", [ (), ("--jobs", "2"), ("--pipeline",) ])
+def test_follow_ingests_the_whole_capture(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+
+    with open(path_to_binary, "rb") as file:
+        buffer = file.read()
+
+    path_to_growing_binary = str(tmp_path / "growing.bin")
+    thread = append_slowly(path_to_growing_binary, buffer)
+
+    assert ingest(path_to_growing_binary, str(tmp_path / "db.sql"), "--follow", "--follow-timeout", "0.5", *options)
+
+    thread.join()
+
+    assert read_frames(str(tmp_path / "db.sql")) == frames
+
+@pytest.mark.parametrize("options", [ ("--follow",), ("--follow", "--pipeline"), ("--pipeline",) ])
+def test_ctrl_c_writes_the_frames_decoded_so_far(make_capture, read_frames, tmp_path, monkeypatch, options):
+    path_to_binary = make_capture(1000, seed=102)
+
+    #
+    # Ctrl+C while the third batch is decoded (./main.py writes to ../../db.sql).
+    #
+    decode_batch = extractor.Extractor.decode_batch
+    nbr_of_batches = 0
+
+    def interrupt(self, *args) -> extractor.frame.FrameBatch:
+        nonlocal nbr_of_batches
+        nbr_of_batches += 1
+
+        if nbr_of_batches == 3:
+            raise KeyboardInterrupt()
+
+        return decode_batch(self, *args)
+
+    monkeypatch.setattr(extractor.Extractor, "BATCH_SIZE", 100)
+    monkeypatch.setattr(extractor.Extractor, "decode_batch", interrupt)
+
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / "a" / "b")
+    monkeypatch.setattr(sys, "argv", [ "main.py", "--binary", path_to_binary, "--short", "test_a", "24-03-01", "--stats", str(tmp_path / "stats.json"), *options ])
+
+    assert extractor.Extractor().run() == ("--follow" in options)
+    assert len(read_frames(str(tmp_path / "db.sql"))) == 200
+
+    with open(tmp_path / "stats.json") as file:
+        assert json.load(file)["counters"]["frames"] == 200
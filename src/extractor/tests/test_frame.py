@@ -0,0 +1,84 @@
+import decoder
+import frame
+import numpy
+import pytest
+
+def decode_capture(path_to_binary: str, first_frame_number: int=0) -> frame.FrameBatch:
+    """
+        Decodes all the frames of a capture in one batch.
+    """
+
+    with open(path_to_binary, "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    offsets, _ = batch_decoder.scan(buffer)
+
+    return batch_decoder.decode_batch(buffer, offsets, first_frame_number=first_frame_number)
+
+def test_frame_views_read_the_columns(make_capture):
+    batch = decode_capture(make_capture(300, "truncated", seed=40))
+
+    assert len(batch) == 300
+    assert len(list(batch)) == 300
+    assert batch[-1].index == 299
+
+    with pytest.raises(IndexError):
+        batch[300]
+
+    for field_name in ("MAC_src", "IP_dest", "field_30"):
+        present = batch.is_present(field_name)
+
+        #
+        # Truncated frames stop anywhere in the fields.
+        #
+        assert present.any() and not present.all()
+
+        for view, is_present, value in zip(batch, present.tolist(), batch.columns[field_name].tolist()):
+            assert view.raw(field_name) == (value if is_present else None)
+            assert view[field_name] == (hex(value) if is_present else "")
+
+def test_header_fields_are_always_present(make_capture):
+    batch = decode_capture(make_capture(100, "truncated", seed=41))
+
+    for field in frame.Frame.LAYOUT[:frame.Frame.NBR_OF_HEADER_FIELDS]:
+        if not field.useless:
+            assert batch.is_present(field.name).all()
+
+def test_frame_numbers_start_at_the_first_frame(make_capture):
+    batch = decode_capture(make_capture(50, seed=42), first_frame_number=1000)
+
+    assert batch.get_frame_numbers().tolist() == list(range(1000, 1050))
+
+    batch.frame_numbers = numpy.array([ 3, 5, 8 ], dtype=numpy.int64)
+    assert batch.get_frame_numbers().tolist() == [ 3, 5, 8 ]
+
+def test_lazy_values_are_formatted_once(make_capture):
+    batch = decode_capture(make_capture(200, "truncated", seed=43))
+    calls = []
+
+    def formatter(column: numpy.ndarray) -> list:
+        calls.append(len(column))
+        return frame.format_hex(column)
+
+    batch.values["field_30"] = frame.LazyValues(batch.columns["field_30"], batch.is_present("field_30"), formatter)
+
+    first_present = int(numpy.argmax(batch.is_present("field_30")))
+    assert batch[first_present]["field_30"] == hex(int(batch.columns["field_30"][first_present]))
+    assert calls == [ 1 ]
+
+    values = batch.get_values("field_30")
+    assert values == [ hex(value) if present else "" for value, present in zip(batch.columns["field_30"].tolist(), batch.is_present("field_30").tolist()) ]
+    assert batch.get_values("field_30") is values
+    assert calls == [ 1, 200 ]
+
+def test_to_frame_copies_the_values(make_capture):
+    batch = decode_capture(make_capture(10, "full", seed=44))
+    batch.test_name = "test_a"
+
+    copy = batch[4].to_frame()
+
+    assert copy.test_name == "test_a"
+
+    for field_name in frame.Frame.KEPT_FIELDS:
+        assert copy.fields[field_name]["value"] == batch[4][field_name]
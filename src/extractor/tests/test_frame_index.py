@@ -0,0 +1,136 @@
+import decoder
+import frame_index
+import reader
+import os
+import pytest
+
+def read_offsets(path_to_binary: str, first_frame: int=0) -> list:
+    """
+        Reads the offsets of the frames of a capture, from "first_frame", with its index.
+    """
+
+    with reader.CaptureReader(path_to_binary, use_index=True) as capture:
+        return [ offset for _, offsets, _ in capture.batches(1000, first_frame) for offset in offsets.tolist() ]
+
+def open_index(path_to_binary: str) -> frame_index.FrameIndex:
+    """
+        Opens the index of a capture, as a reader does.
+    """
+
+    index = frame_index.FrameIndex(path_to_binary)
+
+    with open(path_to_binary, "rb") as file:
+        assert index.open(file.read())
+
+    return index
+
+def test_index_is_written_while_reading(make_capture, monkeypatch):
+    path_to_binary = make_capture(3000, seed=90)
+
+    with open(path_to_binary, "rb") as file:
+        offsets = decoder.BatchDecoder().scan(file.read())[0].tolist()
+
+    assert read_offsets(path_to_binary) == offsets
+    assert os.path.exists(path_to_binary + frame_index.FrameIndex.EXTENSION)
+
+    index = open_index(path_to_binary)
+
+    assert index.nbr_of_frames == 3000 and index.end == os.path.getsize(path_to_binary)
+    assert index.get_offsets(0, 3000).tolist() == offsets
+
+    index.close()
+
+    #
+    # The next runs don't scan the frames again (only what may follow them).
+    #
+    scan = decoder.BatchDecoder.scan
+    scanned_offsets = []
+
+    def count_scanned_frames(*args, **kwargs) -> tuple:
+        offsets, end = scan(*args, **kwargs)
+        scanned_offsets.extend(offsets.tolist())
+
+        return offsets, end
+
+    monkeypatch.setattr(decoder.BatchDecoder, "scan", count_scanned_frames)
+
+    assert read_offsets(path_to_binary) == offsets
+    assert read_offsets(path_to_binary, 2500) == offsets[2500:]
+    assert scanned_offsets == []
+
+def test_index_is_completed_by_later_runs(make_capture):
+    path_to_binary = make_capture(3000, seed=91)
+    offsets = read_offsets(path_to_binary)
+
+    os.remove(path_to_binary + frame_index.FrameIndex.EXTENSION)
+
+    with reader.CaptureReader(path_to_binary, use_index=True) as capture:
+        assert sum(len(offsets) for _, offsets, _ in capture.batches(500, 0, 1234)) == 1234
+
+    assert open_index(path_to_binary).nbr_of_frames == 1234
+    assert read_offsets(path_to_binary, 2000) == offsets[2000:]
+    assert read_offsets(path_to_binary) == offsets
+
+def test_index_of_another_capture_is_started_over(make_capture):
+    path_to_binary = make_capture(2000, seed=92)
+    read_offsets(path_to_binary)
+
+    path_to_binary = make_capture(1500, seed=93)
+    offsets = read_offsets(path_to_binary)
+
+    assert len(offsets) == 1500
+    assert open_index(path_to_binary).nbr_of_frames == 1500
+
+def test_entries_beyond_the_header_are_dropped(make_capture):
+    path_to_binary = make_capture(2000, seed=94)
+    offsets = read_offsets(path_to_binary)
+
+    #
+    # As after a crash while entries were appended.
+    #
+    with open(path_to_binary + frame_index.FrameIndex.EXTENSION, "ab") as file:
+        file.write(b"\xff" * 100)
+
+    assert read_offsets(path_to_binary) == offsets
+
+def test_index_of_a_modified_capture_is_started_over(make_capture):
+    path_to_binary = make_capture(2000, seed=95)
+    offsets = read_offsets(path_to_binary)
+
+    stat = os.stat(path_to_binary)
+    os.utime(path_to_binary, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    assert open_index(path_to_binary).nbr_of_frames == 0
+    assert read_offsets(path_to_binary) == offsets
+
+def test_index_whose_frames_changed_in_place_is_started_over(make_capture, monkeypatch):
+    monkeypatch.setattr(frame_index.FrameIndex, "CHECKSUM_SAMPLE_SIZE", 1024)
+
+    path_to_binary = make_capture(3000, seed=96)
+    offsets = read_offsets(path_to_binary)
+
+    #
+    # Changes the frame_size of the frames in the middle of the capture (beyond the checksum),
+    # without changing the size nor the modification time of the capture.
+    #
+    stat = os.stat(path_to_binary)
+
+    with open(path_to_binary, "r+b") as file:
+        for offset in offsets[1000:2000]:
+            file.seek(offset + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES)
+            frame_size = decoder.BatchDecoder.FRAME_SIZE_STRUCT.unpack(file.read(4))[0]
+
+            file.seek(offset + decoder.BatchDecoder.FRAME_SIZE_OFFSET_IN_BYTES)
+            file.write(decoder.BatchDecoder.FRAME_SIZE_STRUCT.pack(frame_size + 1))
+
+    os.utime(path_to_binary, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert open_index(path_to_binary).nbr_of_frames == 0
+
+def test_ingest_in_several_runs_gives_the_same_rows(expected_frames, ingest, read_frames, tmp_path):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":1234")
+    assert ingest(path_to_binary, path_to_db, "--resume")
+    assert read_frames(path_to_db) == frames
@@ -0,0 +1,131 @@
+import frame
+import labels
+import relabel
+import sql
+import sqlite3
+import sys
+import numpy
+import pytest
+
+COLUMNS = sql.SQL.FRAMES_TABLE_COLUMNS[1:]
+
+def write_transfer_functions(path_to_db: str, definitions: dict):
+    """
+        Replaces the transfer functions of a SQL db, as the web interface does.
+    """
+
+    conn = sqlite3.connect(path_to_db)
+    conn.execute(f"DELETE FROM {sql.SQL.TRANSFER_FUNCTIONS_TABLE_NAME}")
+    conn.executemany(f"INSERT INTO {sql.SQL.TRANSFER_FUNCTIONS_TABLE_NAME} (field_name, value, label) VALUES (?, ?, ?)",
+                     [ (field_name, value, label) for field_name, field_labels in definitions.items() for value, label in field_labels.items() ])
+    conn.commit()
+    conn.close()
+
+def pick_definitions(rows: list) -> dict:
+    """
+        Gives labels to some of the values of each labelled field (half of the distinct values).
+    """
+
+    definitions = {}
+
+    for field_name in frame.Frame.LABELLED_FIELDS:
+        values = sorted({ row[COLUMNS.index(field_name)] for row in rows if row[COLUMNS.index(field_name)] != None })
+        definitions[field_name] = { value : f"{field_name} {value:#x}" for value in values[::2] }
+
+    return definitions
+
+def expected_labels(rows: list, definitions: dict) -> list:
+    return [ tuple(definitions.get(field_name, {}).get(row[COLUMNS.index(field_name)]) for field_name in frame.Frame.LABELLED_FIELDS) for row in rows ]
+
+def read_labels(rows: list) -> list:
+    return [ tuple(row[COLUMNS.index(column)] for column in sql.SQL.LABEL_COLUMNS) for row in rows ]
+
+def run_relabel(path_to_db: str, monkeypatch, *options) -> bool:
+    monkeypatch.setattr(sys, "argv", [ "relabel.py", "--db", path_to_db, *options ])
+
+    return relabel.Relabel().run()
+
+@pytest.mark.parametrize("largest_value", [ 1000, 2**48 ])
+def test_label_matches_the_definitions(largest_value):
+    generator = numpy.random.default_rng(0)
+
+    definitions = { int(value) : f"label {value}" for value in generator.integers(0, largest_value, 100) }
+    definitions[largest_value] = "largest"
+
+    transfer_functions = labels.TransferFunctions({ "MAC_src" : definitions })
+    kind, _, _ = transfer_functions.lookups["MAC_src"]
+
+    assert kind == ("dense" if largest_value < labels.TransferFunctions.DENSE_LOOKUP_SIZE else "sorted")
+
+    column = numpy.concatenate([ numpy.array(list(definitions), dtype=numpy.uint64), generator.integers(0, 2 * largest_value, 1000).astype(numpy.uint64) ])
+    present = generator.random(len(column)) < 0.9
+
+    assert transfer_functions.label("MAC_src", column, present).tolist() == [ definitions.get(value) if is_present else None for value, is_present in zip(column.tolist(), present.tolist()) ]
+
+def test_load_keeps_the_labelled_fields(tmp_path):
+    sql_db = sql.SQL(str(tmp_path / "db.sql"))
+
+    assert sql_db.open_db() and sql_db.create_tables()
+
+    write_transfer_functions(str(tmp_path / "db.sql"), { "MAC_src" : { 1 : "one", -1 : "negative" }, "field_1" : { 1 : "not labelled" } })
+
+    transfer_functions = labels.TransferFunctions.load(sql_db.cursor)
+
+    assert len(transfer_functions) == 1
+    assert transfer_functions.definitions["MAC_src"] == { 1 : "one" }
+
+@pytest.mark.parametrize("options", [ (), ("--jobs", "2"), ("--pipeline",) ])
+def test_frames_are_labelled_at_ingest(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, rows = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+    definitions = pick_definitions(rows)
+
+    #
+    # The transfer functions are read once per run: the first frames aren't labelled.
+    #
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":1000")
+
+    write_transfer_functions(path_to_db, definitions)
+
+    assert ingest(path_to_binary, path_to_db, "--resume", *options)
+
+    frames = read_frames(path_to_db)
+
+    assert [ row[:-len(sql.SQL.LABEL_COLUMNS)] for row in frames ] == [ row[:-len(sql.SQL.LABEL_COLUMNS)] for row in rows ]
+    assert read_labels(frames) == expected_labels(rows[:1000], {}) + expected_labels(rows[1000:], definitions)
+
+@pytest.mark.parametrize("options", [ (), ("--shard-by", "test") ])
+def test_relabel(expected_frames, ingest, read_frames, tmp_path, monkeypatch, options):
+    path_to_binary, rows = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+    definitions = pick_definitions(rows)
+
+    assert ingest(path_to_binary, path_to_db, *options)
+
+    write_transfer_functions(path_to_db, definitions)
+
+    #
+    # Only the given fields, then every field of the test.
+    #
+    assert run_relabel(path_to_db, monkeypatch, "--fields", "MAC_src")
+    assert read_labels(read_frames(path_to_db)) == expected_labels(rows, { "MAC_src" : definitions["MAC_src"] })
+
+    assert run_relabel(path_to_db, monkeypatch, "--short", "test_a", "24-03-01 10-00-00")
+    assert read_labels(read_frames(path_to_db)) == expected_labels(rows, definitions)
+
+    #
+    # A label which is removed is removed from the frames too.
+    #
+    del definitions["MAC_src"]
+    write_transfer_functions(path_to_db, definitions)
+
+    assert run_relabel(path_to_db, monkeypatch)
+    assert read_labels(read_frames(path_to_db)) == expected_labels(rows, definitions)
+
+def test_relabel_rejects_unknown_tests_and_fields(expected_frames, tmp_path, monkeypatch):
+    path_to_db = str(tmp_path / "expected.sql")
+
+    assert not run_relabel(path_to_db, monkeypatch, "--short", "test_b", "24-03-01 10-00-00")
+
+    with pytest.raises(SystemExit):
+        run_relabel(path_to_db, monkeypatch, "--fields", "field_1")
@@ -0,0 +1,140 @@
+import frame
+import layout
+import json
+import os
+import numpy
+import pytest
+
+SPEC = {
+    "header_size_in_bytes": 8,
+    "frame_size_field": "size",
+    "fields": [
+        { "name": "kind", "bits": 4 },
+        { "name": "flags", "bits": 4, "keep": False },
+        { "name": "bench", "bits": 24 },
+        { "name": "size", "bits": 32 },
+        { "name": "a", "bits": 12 },
+        { "name": "b", "bits": 20 },
+        { "name": "c", "bits": 64 },
+        { "name": "d", "bits": 3 },
+        { "name": "e", "bits": 13 },
+    ],
+    "derived_fields": [
+        { "name": "total", "expression": "(a << 20) + b * 3" },
+        { "name": "a_and_d", "concatenate": [ "a", "d" ] },
+    ],
+    "labelled_fields": [ "a_and_d" ],
+}
+
+def write_spec(path, spec: dict=SPEC) -> str:
+    with open(path, "w") as file:
+        json.dump(spec, file)
+
+    return str(path)
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(layout.Layout, "CACHE_DIRECTORY", str(tmp_path / "layouts"))
+
+    return tmp_path / "layouts"
+
+def test_compiled_layout_decodes_every_field(tmp_path, cache_directory):
+    spec = layout.Layout.load(write_spec(tmp_path / "spec.json"))
+
+    assert (spec.nbr_of_header_fields, spec.nbr_of_bytes_before_msg, spec.frame_size_offset_in_bytes) == (4, 22, 4)
+
+    generator = numpy.random.default_rng(0)
+    raw = generator.integers(0, 256, (1000, spec.nbr_of_bytes_before_msg), dtype=numpy.uint8)
+
+    records = {}
+    spec.compile().decode_fields(raw, records)
+
+    assert "flags" not in records
+
+    for i, row in enumerate(raw):
+        bits = int.from_bytes(row.tobytes(), "big")
+
+        for position in spec.positions:
+            if not position["useless"]:
+                assert int(records[position["name"]][i]) == (bits >> (len(row) * 8 - position["end_bit"])) & position["mask"], (i, position["name"])
+
+    derived_fields = spec.compile().DERIVED_FIELDS
+    a, b, d = records["a"].astype(numpy.uint64), records["b"].astype(numpy.uint64), records["d"].astype(numpy.uint64)
+
+    assert derived_fields["total"](records).tolist() == ((a << numpy.uint64(20)) + b * numpy.uint64(3)).tolist()
+    assert derived_fields["a_and_d"](records).tolist() == ((a << numpy.uint64(3)) | d).tolist()
+    assert spec.derived_fields == { "total" : ("a", "b"), "a_and_d" : ("a", "d") }
+
+def test_compiled_layout_decodes_only_the_given_fields(tmp_path, cache_directory):
+    spec = layout.Layout.load(write_spec(tmp_path / "spec.json"))
+    raw = numpy.full((10, spec.nbr_of_bytes_before_msg), 0xff, dtype=numpy.uint8)
+
+    records = {}
+    spec.compile().decode_fields(raw, records, { "size", "c" })
+
+    assert set(records) == { "size", "c" }
+
+def test_compiled_module_is_cached_by_spec_hash(tmp_path, cache_directory):
+    path_to_spec = write_spec(tmp_path / "spec.json")
+    spec = layout.Layout.load(path_to_spec)
+    spec.compile()
+
+    path_to_module = cache_directory / f"layout_{spec.hash[:16]}.py"
+
+    assert os.listdir(cache_directory) == [ path_to_module.name ]
+
+    #
+    # The same spec reuses the cached module, another spec (or compiler version) gets its own.
+    #
+    modified_time = os.stat(path_to_module).st_mtime_ns
+
+    assert layout.Layout.load(path_to_spec).compile().SPEC_HASH == spec.hash
+    assert os.stat(path_to_module).st_mtime_ns == modified_time
+
+    other_spec = layout.Layout.load(write_spec(tmp_path / "other_spec.json", dict(SPEC, labelled_fields=[])))
+    other_spec.compile()
+
+    assert other_spec.hash != spec.hash
+    assert len(os.listdir(cache_directory)) == 2
+
+def test_cached_module_of_another_spec_is_not_used(tmp_path, cache_directory):
+    spec = layout.Layout.load(write_spec(tmp_path / "spec.json"))
+
+    cache_directory.mkdir()
+    (cache_directory / f"layout_{spec.hash[:16]}.py").write_text("SPEC_HASH = 'something else'\n")
+
+    module = spec.compile()
+
+    assert module.SPEC_HASH == spec.hash
+    assert set(module.DERIVED_FIELDS) == { "total", "a_and_d" }
+
+def test_layout_compiles_in_memory_without_a_cache(tmp_path, monkeypatch):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setattr(layout.Layout, "CACHE_DIRECTORY", str(tmp_path / "file" / "layouts"))
+
+    assert layout.Layout.load(write_spec(tmp_path / "spec.json")).compile().SPEC_HASH
+
+def test_spec_is_given_by_the_environment(tmp_path, monkeypatch):
+    path_to_spec = write_spec(tmp_path / "spec.json")
+
+    monkeypatch.setenv(layout.Layout.SPEC_ENVIRONMENT_VARIABLE, path_to_spec)
+    assert layout.Layout.load().path_to_spec == path_to_spec
+
+    monkeypatch.delenv(layout.Layout.SPEC_ENVIRONMENT_VARIABLE)
+    assert layout.Layout.load().hash == frame.Frame.SPEC.hash
+
+@pytest.mark.parametrize("changes", [
+    { "header_size_in_bytes" : 7 },
+    { "frame_size_field" : "a" },
+    { "frame_size_field" : "bench" },
+    { "fields" : SPEC["fields"] + [ { "name": "a", "bits": 8 } ] },
+    { "fields" : SPEC["fields"] + [ { "name": "f", "bits": 65 } ] },
+    { "derived_fields" : [ { "name": "total", "expression": "a + flags" } ] },
+    { "derived_fields" : [ { "name": "total", "expression": "a + -1" } ] },
+    { "derived_fields" : [ { "name": "total", "expression": "abs(a)" } ] },
+    { "derived_fields" : [ { "name": "a", "concatenate": [ "b" ] } ] },
+    { "labelled_fields" : [ "flags" ] },
+])
+def test_invalid_spec(tmp_path, changes):
+    with pytest.raises(ValueError):
+        layout.Layout.load(write_spec(tmp_path / "spec.json", dict(SPEC, **changes)))
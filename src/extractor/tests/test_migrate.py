@@ -0,0 +1,138 @@
+import frame
+import migrate
+import sql
+import argparse
+import sqlite3
+
+#
+# Layout of the "frames" table of version 1, every value being written as text.
+#
+V1_FRAMES_TABLE_STRUCT = ", ".join([ "test_id INTEGER" ] + [ f"{column} TEXT" for column in migrate.Migration.V1_FRAMES_TABLE_COLUMNS[1:] ])
+
+def v1_frame(test_id: int, **values) -> dict:
+    """
+        Builds a frame of version 1, each field being "0x1" unless given.
+    """
+
+    row = { column : "0x1" for column in migrate.Migration.V1_FRAMES_TABLE_COLUMNS[1:] }
+    row.update({ "test_id" : test_id, "frame_date" : "2024-03-01 12:00:00.000001", "MAC_dest" : "00:11:22:33:44:55", "MAC_src" : "aa:bb:cc:dd:ee:ff",
+                 "IP_src" : "10.0.0.1", "IP_dest" : "192.168.1.20" })
+    row.update(values)
+
+    return row
+
+def write_v1_db(path_to_db: str, tests: list, frames: list):
+    conn = sqlite3.connect(path_to_db)
+    conn.execute(f"CREATE TABLE {sql.SQL.TESTS_TABLE_NAME} ({sql.SQL.TESTS_TABLE_STRUCT})")
+    conn.execute(f"CREATE TABLE {sql.SQL.FRAMES_TABLE_NAME} ({V1_FRAMES_TABLE_STRUCT})")
+    conn.executemany(f"INSERT INTO {sql.SQL.TESTS_TABLE_NAME} (id, name, execution_date) VALUES (?, ?, ?)", tests)
+
+    for row in frames:
+        conn.execute(f"INSERT INTO {sql.SQL.FRAMES_TABLE_NAME} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", tuple(row.values()))
+
+    conn.commit()
+    conn.close()
+
+def run_migration(path_to_db: str) -> bool:
+    migration = migrate.Migration()
+    migration.cmd_line_args = argparse.Namespace(db=path_to_db, no_vacuum=True)
+    migration.sql_db = sql.SQL(path_to_db, batch_size=migrate.Migration.BATCH_SIZE)
+
+    return migration.migrate()
+
+def read_frames(path_to_db: str) -> list:
+    conn = sqlite3.connect(path_to_db)
+    conn.row_factory = sqlite3.Row
+    rows = [ dict(row) for row in conn.execute(f"SELECT * FROM {sql.SQL.FRAMES_TABLE_NAME} ORDER BY test_id, frame_number") ]
+    conn.close()
+
+    return rows
+
+def test_migrate_v1_db(tmp_path):
+    path_to_db = str(tmp_path / "db.sql")
+
+    write_v1_db(path_to_db, [ (1, "test_a", "2024-03-01"), (2, "test_b", "2024-03-02"), (3, "test_a", "2024-03-01") ], [
+        v1_frame(1, field_1="0xabcd"),
+        v1_frame(2, IP_src="160.0.0.1", IP_dest="16.32.3", field_35=""),
+        v1_frame(3, frame_date="2024-03-01 12:00:01.500000", field_14="0x2"),
+    ])
+
+    assert run_migration(path_to_db)
+
+    conn = sqlite3.connect(path_to_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == sql.SQL.SCHEMA_VERSION
+    assert conn.execute(f"SELECT id, name FROM {sql.SQL.TESTS_TABLE_NAME} ORDER BY id").fetchall() == [ (1, "test_a"), (2, "test_b") ]
+    assert conn.execute(f"SELECT test_id, nbr_of_frames FROM {sql.SQL.TEST_SUMMARY_TABLE_NAME} ORDER BY test_id").fetchall() == [ (1, 2), (2, 1) ]
+    conn.close()
+
+    frames = read_frames(path_to_db)
+
+    #
+    # The frames of the duplicate test are merged into the first one, numbered in insertion order.
+    #
+    assert [ (row["test_id"], row["frame_number"]) for row in frames ] == [ (1, 0), (1, 1), (2, 0) ]
+
+    assert frames[0]["frame_date"] == 1709294400000001000
+    assert frames[0]["frame_date_sub_ns"] == 0
+    assert frames[0]["MAC_dest"] == 0x001122334455
+    assert frames[0]["MAC_src"] == 0xaabbccddeeff
+    assert frames[0]["IP_src"] == 0x0a000001
+    assert frames[0]["IP_dest"] == 0xc0a80114
+    assert frames[0]["field_1"] == 0xabcd
+    assert frames[0]["packet_date"] == (2 << 16) + 1
+
+    msg_type = 0
+    for field_name in frame.Frame.DERIVED_FIELDS["msg_type"]:
+        msg_type = (msg_type << frame.Frame.LAYOUT[frame.Frame.FIELD_INDEXES[field_name]].bits) | (2 if field_name == "field_14" else 1)
+
+    assert frames[1]["frame_date"] == 1709294401500000000
+    assert frames[1]["msg_type"] == msg_type
+
+    #
+    # An IP written without its leading 0s is read as written, or rebuilt when it has less than 4 parts,
+    # and a missing field (and what is derived from it) is NULL.
+    #
+    assert frames[2]["IP_src"] == 0xa0000001
+    assert frames[2]["IP_dest"] == 0x10203
+    assert frames[2]["field_35"] == None
+    assert frames[2]["packet_date"] == None
+
+def test_migrate_is_idempotent(tmp_path):
+    path_to_db = str(tmp_path / "db.sql")
+
+    write_v1_db(path_to_db, [ (1, "test_a", "2024-03-01") ], [ v1_frame(1), v1_frame(1, field_1="0x2") ])
+
+    assert run_migration(path_to_db)
+    frames = read_frames(path_to_db)
+
+    assert run_migration(path_to_db)
+    assert read_frames(path_to_db) == frames
+
+def test_upgrade_v2_db(tmp_path):
+    path_to_db = str(tmp_path / "db.sql")
+
+    write_v1_db(path_to_db, [ (1, "test_a", "2024-03-01") ], [ v1_frame(1), v1_frame(1, frame_date="2024-03-01 12:00:02") ])
+    assert run_migration(path_to_db)
+
+    #
+    # Turns the DB back into version 2: no labels and no summary tables.
+    #
+    conn = sqlite3.connect(path_to_db)
+    for column in sql.SQL.LABEL_COLUMNS:
+        conn.execute(f"ALTER TABLE {sql.SQL.FRAMES_TABLE_NAME} DROP COLUMN {column}")
+
+    for (table_name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT IN (?, ?, 'sqlite_sequence')", (sql.SQL.FRAMES_TABLE_NAME, sql.SQL.TESTS_TABLE_NAME)).fetchall():
+        conn.execute(f"DROP TABLE {table_name}")
+
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+
+    assert run_migration(path_to_db)
+
+    conn = sqlite3.connect(path_to_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == sql.SQL.SCHEMA_VERSION
+    assert conn.execute(f"SELECT test_id, nbr_of_frames FROM {sql.SQL.TEST_SUMMARY_TABLE_NAME}").fetchall() == [ (1, 2) ]
+    conn.close()
+
+    assert all(row[column] == None for row in read_frames(path_to_db) for column in sql.SQL.LABEL_COLUMNS)
@@ -0,0 +1,32 @@
+import parallel
+import reader
+import report
+import pytest
+
+@pytest.mark.parametrize("options", [
+    ("--jobs", "2"),
+    ("--jobs", "3", "--batch-size", "700"),
+])
+def test_jobs_give_the_same_rows(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, *options)
+    assert read_frames(path_to_db) == frames
+
+def test_jobs_with_a_range_of_frames(expected_frames, ingest, read_frames, tmp_path):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--jobs", "2", "--frame-range", "1234:4321")
+    assert read_frames(path_to_db) == frames[1234:4321]
+
+def test_batches_are_decoded_in_capture_order(make_capture):
+    path_to_binary = make_capture(3000, seed=80)
+    context = report.TestContext("test_a", "24-03-01")
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        batches = list(parallel.decode_batches(capture.batches(100), path_to_binary, 3, context))
+
+    assert [ batch.first_frame_number for batch in batches ] == list(range(0, 3000, 100))
+    assert all(batch.test_name == "test_a" and batch.test_execution_date == "24-03-01" for batch in batches)
@@ -0,0 +1,45 @@
+import labels
+import sql
+import threading
+import pytest
+
+@pytest.mark.parametrize("options", [
+    ("--pipeline",),
+    ("--pipeline", "--queue-size", "1"),
+    ("--jobs", "2", "--pipeline", "--batch-size", "700", "--transaction-size", "1500"),
+])
+def test_pipeline_gives_the_same_rows(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, *options)
+    assert read_frames(path_to_db) == frames
+
+@pytest.mark.parametrize("options", [ ("--frame-range", "1000:"), ("--resume",) ])
+def test_sql_db_is_read_before_the_writer_starts(expected_frames, ingest, read_frames, tmp_path, monkeypatch, options):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":1000")
+
+    #
+    # Records the threads reading the SQL db while the frames to extract are found.
+    #
+    threads = []
+
+    def record_threads(function):
+        def wrapper(*args, **kwargs):
+            threads.append([ thread.name for thread in threading.enumerate() ])
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(sql.SQL, "get_next_frame_number", record_threads(sql.SQL.get_next_frame_number))
+    monkeypatch.setattr(sql.SQL, "count_frames", record_threads(sql.SQL.count_frames))
+    monkeypatch.setattr(labels.TransferFunctions, "load", staticmethod(record_threads(labels.TransferFunctions.load)))
+
+    assert ingest(path_to_binary, path_to_db, "--pipeline", *options)
+
+    assert len(threads) == 2
+    assert all("sql-writer" not in names for names in threads)
+    assert read_frames(path_to_db) == frames
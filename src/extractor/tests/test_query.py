@@ -0,0 +1,140 @@
+import query
+import sql
+import numpy
+import pytest
+
+TEST = ("test_a", "24-03-01 10-00-00")
+
+def to_rows(frames: query.Frames, columns: list) -> list:
+    """
+        Turns the columns of frames back into rows (None where a value is NULL).
+    """
+
+    return [ tuple(None if not frames.present[column][i] else frames[column][i].item() if frames[column].dtype != object else frames[column][i] for column in columns) for i in range(len(frames)) ]
+
+@pytest.fixture
+def ingested_frames(expected_frames, tmp_path) -> tuple:
+    """
+        The SQL db of expected_frames, opened by a Query.
+
+        Return - the Query, and the rows of the frames.
+    """
+
+    _, frames = expected_frames
+    frames_query = query.Query(str(tmp_path / "expected.sql"))
+
+    yield frames_query, frames
+
+    frames_query.close()
+
+def test_frames_match_the_rows(ingested_frames):
+    frames_query, rows = ingested_frames
+    frames = frames_query.frames(TEST)
+
+    assert to_rows(frames, sql.SQL.FRAMES_TABLE_COLUMNS[1:]) == rows
+    assert not frames["frame_number"].flags.writeable
+
+    page_size = 1234
+    pages = list(frames_query.pages(TEST, page_size=page_size))
+
+    assert [ len(page) for page in pages ] == [ page_size ] * (len(rows) // page_size) + [ len(rows) % page_size ]
+    assert to_rows(query.Frames.concatenate(pages, sql.SQL.FRAMES_TABLE_COLUMNS[1:]), sql.SQL.FRAMES_TABLE_COLUMNS[1:]) == rows
+
+def test_frames_of_a_time_range_and_msg_types(ingested_frames):
+    frames_query, rows = ingested_frames
+
+    columns = [ "frame_number", "frame_date", "msg_type" ]
+    frame_date = sql.SQL.FRAMES_TABLE_COLUMNS[1:].index("frame_date")
+    msg_type = sql.SQL.FRAMES_TABLE_COLUMNS[1:].index("msg_type")
+
+    start, end = rows[1000][frame_date], rows[4000][frame_date]
+    msg_types = sorted({ row[msg_type] for row in rows if row[msg_type] != None })[:3]
+
+    frames = frames_query.frames(TEST, time_range=(start, str(numpy.datetime64(end, "ns")).replace("T", " ")), msg_types=msg_types, columns=columns)
+
+    assert to_rows(frames, columns) == [ (row[0], row[frame_date], row[msg_type]) for row in rows if start <= row[frame_date] < end and row[msg_type] in msg_types ]
+    assert len(frames_query.frames(TEST, time_range=("2000-01-01 00:00:00", "2000-01-02"))) == 0
+
+def test_cache_is_a_lru_of_cache_size_bytes(ingested_frames):
+    frames_query, rows = ingested_frames
+
+    frames_query.cache_size = 3 * len(rows) * (8 + 1)
+
+    frames_a = frames_query.frames(TEST, columns=[ "frame_number" ])
+    frames_b = frames_query.frames(TEST, columns=[ "frame_date" ])
+
+    assert frames_query.frames(TEST, columns=[ "frame_number" ]) is frames_a
+
+    #
+    # A fourth result drops the least recently used one (frames_b), and a result bigger than the cache isn't kept.
+    #
+    frames_c = frames_query.frames(TEST, columns=[ "MAC_src" ])
+    frames_query.frames(TEST, columns=[ "IP_src" ])
+
+    assert frames_query.frames(TEST, columns=[ "frame_number" ]) is frames_a
+    assert frames_query.frames(TEST, columns=[ "frame_date" ]) is not frames_b
+    assert frames_query.cache_size_in_bytes <= frames_query.cache_size
+
+    assert frames_query.frames(TEST) is not frames_query.frames(TEST)
+
+    frames_query.clear_cache()
+
+    assert frames_query.cache_size_in_bytes == 0
+    assert frames_query.frames(TEST, columns=[ "MAC_src" ]) is not frames_c
+
+def test_cache_is_dropped_by_new_frames(expected_frames, ingest, tmp_path):
+    path_to_binary, rows = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":1000")
+
+    frames_query = query.Query(path_to_db)
+    frames = frames_query.frames(TEST)
+    version = frames_query.get_test_version(frames_query.get_test_id(TEST))
+
+    assert len(frames) == 1000
+    assert frames_query.frames(TEST) is frames
+
+    assert ingest(path_to_binary, path_to_db, "--resume")
+
+    assert frames_query.get_test_version(frames_query.get_test_id(TEST)) != version
+    assert to_rows(frames_query.frames(TEST), sql.SQL.FRAMES_TABLE_COLUMNS[1:]) == rows
+
+    frames_query.close()
+
+def test_cache_is_dropped_by_relabelling(ingested_frames, tmp_path):
+    frames_query, _ = ingested_frames
+    frames = frames_query.frames(TEST)
+
+    sql_db = sql.SQL(str(tmp_path / "expected.sql"))
+
+    assert sql_db.open_db()
+    assert sql_db.relabel()
+
+    assert frames_query.frames(TEST) is not frames
+    assert frames_query.get_test_version(frames_query.get_test_id(TEST))[2] == 1
+
+def test_frames_of_a_sharded_db(expected_frames, ingest, tmp_path):
+    path_to_binary, rows = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--shard-by", "month")
+
+    frames_query = query.Query(path_to_db)
+
+    assert to_rows(frames_query.frames(TEST), sql.SQL.FRAMES_TABLE_COLUMNS[1:]) == rows
+
+    frames_query.close()
+
+@pytest.mark.parametrize("arguments", [
+    { "test" : ("test_b", "24-03-01 10-00-00") },
+    { "test" : 2 },
+    { "test" : TEST, "columns" : [] },
+    { "test" : TEST, "columns" : [ "frame_number; DROP TABLE frames" ] },
+    { "test" : TEST, "time_range" : ("yesterday", None) },
+])
+def test_invalid_arguments(ingested_frames, arguments):
+    frames_query, _ = ingested_frames
+
+    with pytest.raises(ValueError):
+        frames_query.frames(**arguments)
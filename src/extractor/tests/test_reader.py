@@ -0,0 +1,83 @@
+import decoder
+import frame
+import reader
+import pytest
+
+def scan_capture(path_to_binary: str) -> tuple:
+    """
+        Finds the frames of a capture in one scan.
+
+        Return - the bytes of the capture, and the offsets of its frames.
+    """
+
+    with open(path_to_binary, "rb") as file:
+        buffer = file.read()
+
+    return buffer, decoder.BatchDecoder().scan(buffer)[0].tolist()
+
+def read_offsets(batches) -> list:
+    """
+        Collects the offsets of the frames of (buffer, offsets, number of the first frame) batches, checking their numbers.
+    """
+
+    offsets = []
+
+    for _, batch_offsets, first_frame_number in batches:
+        assert first_frame_number == len(offsets)
+        offsets.extend(batch_offsets.tolist())
+
+    return offsets
+
+@pytest.mark.parametrize("batch_size", [ 1, 100, 4096 ])
+def test_batches_find_every_frame(make_capture, batch_size):
+    path_to_binary = make_capture(3000, seed=50)
+    _, offsets = scan_capture(path_to_binary)
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        assert read_offsets(capture.batches(batch_size)) == offsets
+        assert capture.is_complete()
+
+@pytest.mark.parametrize("first_frame, last_frame", [ (0, 1), (1234, 2000), (2999, None), (3000, None), (500, 500), (2500, 9999) ])
+def test_batches_of_a_range_of_frames(make_capture, first_frame, last_frame):
+    path_to_binary = make_capture(3000, seed=51)
+    _, offsets = scan_capture(path_to_binary)
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        frame_numbers = []
+        range_offsets = []
+
+        for _, batch_offsets, first_frame_number in capture.batches(700, first_frame, last_frame):
+            frame_numbers.extend(range(first_frame_number, first_frame_number + len(batch_offsets)))
+            range_offsets.extend(batch_offsets.tolist())
+
+    assert frame_numbers == list(range(first_frame, min(3000, 3000 if last_frame == None else last_frame)))
+    assert range_offsets == offsets[first_frame:last_frame]
+
+def test_frames_are_slices_of_the_map(make_capture):
+    path_to_binary = make_capture(500, seed=52)
+    buffer, offsets = scan_capture(path_to_binary)
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        frames = [ bytes(frame_bytes) for frame_bytes in capture.frames() ]
+
+    assert frames == [ buffer[start:end] for start, end in zip(offsets, offsets[1:] + [ len(buffer) ]) ]
+
+def test_incomplete_last_frame_is_not_read(make_capture, tmp_path):
+    buffer, offsets = scan_capture(make_capture(100, seed=53))
+
+    path_to_binary = str(tmp_path / "truncated.bin")
+
+    with open(path_to_binary, "wb") as file:
+        file.write(buffer[:offsets[-1] + frame.Frame.HEADER_SIZE_IN_BYTES])
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        assert read_offsets(capture.batches(30)) == offsets[:-1]
+        assert not capture.is_complete()
+
+def test_empty_file(tmp_path):
+    path_to_binary = str(tmp_path / "empty.bin")
+    open(path_to_binary, "wb").close()
+
+    with reader.CaptureReader(path_to_binary) as capture:
+        assert read_offsets(capture.batches()) == []
+        assert capture.is_complete()
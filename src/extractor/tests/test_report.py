@@ -0,0 +1,79 @@
+import extractor
+import report
+import sql
+import contextlib
+import io
+import os
+import pytest
+
+REPORT = """Test report
+* Test              : test_old
+  * Test            : not_a_test
+* Execution begin date : "24-03-01 09-00-00"
+Some text
+* Test              : test_a
+* Execution begin date : "24-03-01 10-00-00"
+"""
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(report.TestContext, "cache", {})
+
+@pytest.fixture
+def path_to_report(tmp_path):
+    path_to_report = str(tmp_path / "test.rep")
+
+    with open(path_to_report, "w") as file:
+        file.write(REPORT)
+
+    return path_to_report
+
+def test_report_gives_the_last_values(path_to_report):
+    context = report.TestContext.from_report(path_to_report)
+
+    assert (context.test_name, context.test_execution_date) == ("test_a", "24-03-01 10-00-00")
+
+def test_report_is_parsed_once(path_to_report):
+    context = report.TestContext.from_report(path_to_report)
+
+    assert report.TestContext.from_report(path_to_report) is context
+    assert report.TestContext.from_report(os.path.relpath(path_to_report)) is context
+
+def test_modified_report_is_parsed_again(path_to_report):
+    context = report.TestContext.from_report(path_to_report)
+
+    with open(path_to_report, "a") as file:
+        file.write("* Test              : test_b\n")
+
+    assert report.TestContext.from_report(path_to_report).test_name == "test_b"
+    assert context.test_name == "test_a"
+
+def test_reports_are_resolved_at_once(path_to_report, tmp_path):
+    contexts = report.TestContext.from_reports([ path_to_report, str(tmp_path / "missing.rep"), path_to_report ], nbr_of_workers=2)
+
+    assert list(contexts) == [ path_to_report, str(tmp_path / "missing.rep") ]
+    assert contexts[path_to_report].test_name == "test_a"
+    assert contexts[str(tmp_path / "missing.rep")] == None
+
+def test_extractor_reads_the_report_once(path_to_report, make_capture, tmp_path, monkeypatch):
+    from_report = report.TestContext.from_report
+    paths_read = []
+
+    def count_reads(path: str) -> report.TestContext:
+        paths_read.append(path)
+        return from_report(path)
+
+    monkeypatch.setattr(report.TestContext, "from_report", count_reads)
+    monkeypatch.setattr(extractor.Extractor, "BATCH_SIZE", 100)
+
+    ext = extractor.Extractor()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert ext.parse_cmd_line_args([ "--binary", make_capture(1000, seed=70), "--full", path_to_report ])
+
+        ext.sql_db.path_to_db = str(tmp_path / "db.sql")
+
+        assert ext.insert_frames_into_db(ext.extract_frames_from_file()) and not ext.extraction_error
+
+    assert paths_read == [ path_to_report ]
+    assert sql.ReadPool(str(tmp_path / "db.sql")).read(f"SELECT name, execution_date FROM {sql.SQL.TESTS_TABLE_NAME}") == [ ("test_a", "24-03-01 10-00-00") ]
@@ -0,0 +1,138 @@
+import decoder
+import frame
+import reader
+import resync
+import gzip
+import numpy
+
+def read_capture(path_to_binary: str) -> tuple:
+    """
+        Reads a capture with a Resynchronizer, as [--resync] does.
+
+        Return - the offsets of the frames found, and the Resynchronizer.
+    """
+
+    resynchronizer = resync.Resynchronizer()
+    offsets = []
+
+    with reader.open_reader(path_to_binary, decoder.BatchDecoder(), resynchronizer=resynchronizer) as capture:
+        for buffer, batch_offsets, first_frame_number in capture.batches(batch_size=64):
+            offsets.extend(batch_offsets.tolist())
+
+    return offsets, resynchronizer
+
+def write_capture(make_capture, tmp_path, nbr_of_frames: int, corrupt) -> tuple:
+    """
+        Writes a capture, and a copy changed by "corrupt" (a function of the bytes and the offsets of the frames).
+
+        Return - the offsets of the frames of the capture, and the path of the copy.
+    """
+
+    with open(make_capture(nbr_of_frames, "full", seed=7), "rb") as file:
+        buffer = file.read()
+
+    offsets, _ = decoder.BatchDecoder().scan(buffer)
+    path_to_copy = str(tmp_path / "corrupted.bin")
+
+    with open(path_to_copy, "wb") as file:
+        file.write(corrupt(buffer, offsets.tolist()))
+
+    return offsets.tolist(), path_to_copy
+
+def test_clean_capture_skips_nothing(make_capture):
+    path_to_binary = make_capture(300, "mixed", seed=8)
+
+    with open(path_to_binary, "rb") as file:
+        expected_offsets, _ = decoder.BatchDecoder().scan(file.read())
+
+    offsets, resynchronizer = read_capture(path_to_binary)
+
+    assert offsets == expected_offsets.tolist()
+    assert resynchronizer.corrupted_ranges == []
+
+def test_garbage_between_frames_is_skipped(make_capture, tmp_path):
+    garbage = b"\xff" * 100
+    original_offsets, path_to_binary = write_capture(make_capture, tmp_path, 200, lambda buffer, offsets: buffer[:offsets[50]] + garbage + buffer[offsets[50]:])
+
+    offsets, resynchronizer = read_capture(path_to_binary)
+
+    assert offsets == original_offsets[:50] + [ offset + len(garbage) for offset in original_offsets[50:] ]
+    assert resynchronizer.corrupted_ranges == [ { "start" : original_offsets[50], "end" : original_offsets[50] + len(garbage), "nbr_of_bytes" : len(garbage),
+                                                 "frames_before" : 50, "reason" : resync.Resynchronizer.CORRUPTED } ]
+
+def test_implausible_frame_size_skips_the_frame(make_capture, tmp_path):
+    def corrupt(buffer, offsets):
+        buffer = bytearray(buffer)
+        position = offsets[120] + frame.Frame.FRAME_SIZE_OFFSET_IN_BYTES
+        buffer[position:position + 4] = (resync.Resynchronizer.MAX_FRAME_SIZE + 1).to_bytes(4, "big")
+
+        return bytes(buffer)
+
+    original_offsets, path_to_binary = write_capture(make_capture, tmp_path, 200, corrupt)
+
+    offsets, resynchronizer = read_capture(path_to_binary)
+
+    assert offsets == original_offsets[:120] + original_offsets[121:]
+    assert [ (corrupted_range["start"], corrupted_range["end"], corrupted_range["frames_before"]) for corrupted_range in resynchronizer.corrupted_ranges ] == \
+           [ (original_offsets[120], original_offsets[121], 120) ]
+
+def test_frame_date_going_back_is_skipped(make_capture, tmp_path):
+    def corrupt(buffer, offsets):
+        buffer = bytearray(buffer)
+        position = offsets[30] + resync.Resynchronizer().frame_date["first_byte"]
+        buffer[position:position + 8] = bytes(8)
+
+        return bytes(buffer)
+
+    original_offsets, path_to_binary = write_capture(make_capture, tmp_path, 100, corrupt)
+
+    offsets, resynchronizer = read_capture(path_to_binary)
+
+    assert offsets == original_offsets[:30] + original_offsets[31:]
+    assert resynchronizer.get_nbr_of_skipped_bytes() == original_offsets[31] - original_offsets[30]
+
+def test_incomplete_last_frame_is_truncated(make_capture, tmp_path):
+    original_offsets, path_to_binary = write_capture(make_capture, tmp_path, 50, lambda buffer, offsets: buffer[:-10])
+
+    offsets, resynchronizer = read_capture(path_to_binary)
+
+    assert offsets == original_offsets[:-1]
+    assert len(resynchronizer.corrupted_ranges) == 1
+    assert resynchronizer.corrupted_ranges[0]["start"] == original_offsets[-1]
+    assert resynchronizer.corrupted_ranges[0]["reason"] == resync.Resynchronizer.TRUNCATED
+
+def test_stream_reader_finds_the_same_ranges(make_capture, tmp_path):
+    garbage = numpy.random.default_rng(9).integers(0, 256, 3000, dtype=numpy.uint8).tobytes()
+    _, path_to_binary = write_capture(make_capture, tmp_path, 300, lambda buffer, offsets: buffer[:offsets[100]] + garbage + buffer[offsets[100]:])
+
+    offsets, resynchronizer = read_capture(path_to_binary)
+
+    with open(path_to_binary, "rb") as file, gzip.open(path_to_binary + ".gz", "wb") as compressed_file:
+        compressed_file.write(file.read())
+
+    stream_resynchronizer = resync.Resynchronizer()
+    stream_nbr_of_frames = 0
+
+    with reader.open_reader(path_to_binary + ".gz", decoder.BatchDecoder(), resynchronizer=stream_resynchronizer) as capture:
+        for buffer, batch_offsets, first_frame_number in capture.batches(batch_size=64):
+            stream_nbr_of_frames += len(batch_offsets)
+
+    assert stream_nbr_of_frames == len(offsets)
+    assert stream_resynchronizer.corrupted_ranges == resynchronizer.corrupted_ranges
+
+def test_resync_ingests_the_frames_around_the_garbage(make_capture, run_extractor, read_frames, tmp_path):
+    path_to_binary = make_capture(500, "full", seed=7)
+    path_to_db = str(tmp_path / "expected.sql")
+
+    assert run_extractor(path_to_binary, path_to_db)[0]
+
+    garbage = b"\xff" * 100
+    original_offsets, path_to_corrupted_binary = write_capture(make_capture, tmp_path, 500, lambda buffer, offsets: buffer[:offsets[200]] + garbage + buffer[offsets[200]:])
+
+    ok, error = run_extractor(path_to_corrupted_binary, str(tmp_path / "db.sql"))
+
+    assert not ok and error != None
+    assert len(read_frames(str(tmp_path / "db.sql"))) == 200
+
+    assert run_extractor(path_to_corrupted_binary, str(tmp_path / "resynced.sql"), "--resync")[0]
+    assert read_frames(str(tmp_path / "resynced.sql")) == read_frames(path_to_db)
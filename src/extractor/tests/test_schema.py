@@ -0,0 +1,39 @@
+import sql
+import sqlite3
+import pytest
+
+def test_frames_are_stored_as_integers(expected_frames):
+    path_to_binary, frames = expected_frames
+
+    #
+    # (The "mixed" capture has truncated frames, whose missing fields are NULL.)
+    #
+    for row in frames:
+        assert all(value == None or type(value) == int for value in row[:-len(sql.SQL.LABEL_COLUMNS)])
+
+    assert any(None in row for row in frames)
+    assert [ row[0] for row in frames ] == list(range(len(frames)))
+
+def test_indexes_are_created(expected_frames, tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "expected.sql"))
+    indexes = { name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'") }
+    conn.close()
+
+    assert set(sql.SQL.INDEXES) <= indexes
+
+@pytest.mark.parametrize("options", [ (), ("--pipeline",), ("--shard-by", "test") ])
+def test_ingest_again_fails_before_inserting(expected_frames, ingest, run_extractor, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--frame-range", "1000:2000", *options)
+
+    for frame_range in ("1000:2000", "0:1001", "1999:"):
+        ok, error = run_extractor(path_to_binary, path_to_db, "--frame-range", frame_range, *options)
+
+        assert not ok
+        assert "'test_a' (24-03-01 10-00-00) already has" in error and "[--resume]" in error
+
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":1000", *options)
+    assert ingest(path_to_binary, path_to_db, "--from-frame", "2000", *options)
+    assert read_frames(path_to_db) == frames
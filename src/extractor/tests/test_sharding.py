@@ -0,0 +1,79 @@
+import sql
+import operator
+import os
+import pytest
+
+TEST_B = ("--short", "test_b", "24-03-02 10-00-00")
+
+@pytest.mark.parametrize("options", [
+    ("--shard-by", "test"),
+    ("--shard-by", "test", "--pipeline"),
+    ("--shard-by", "month", "--jobs", "2"),
+])
+def test_sharded_ingest_gives_the_same_rows(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, *options)
+    assert read_frames(path_to_db) == frames
+
+    #
+    # The SQL db only keeps the catalog.
+    #
+    conn = sql.sqlite3.connect(path_to_db)
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (sql.SQL.FRAMES_TABLE_NAME,)).fetchone() == None
+    conn.close()
+
+def test_sharded_ingest_in_several_runs(expected_frames, ingest, read_frames, tmp_path):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--shard-by", "month", "--frame-range", ":1234")
+    assert ingest(path_to_binary, path_to_db, "--resume")
+    assert read_frames(path_to_db) == frames
+
+@pytest.mark.parametrize("shard_by, shards", [ ("test", [ "test_1", "test_2" ]), ("month", [ "month_2024_01" ]) ])
+def test_tests_are_put_in_their_shard(expected_frames, ingest, tmp_path, shard_by, shards):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--shard-by", shard_by, "--frame-range", ":3000")
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":2000", *TEST_B)
+
+    assert sorted(os.listdir(sql.SQL.get_shards_directory(path_to_db))) == [ shard + sql.SQL.SHARD_EXTENSION for shard in shards ]
+
+    read_pool = sql.ReadPool(path_to_db)
+
+    #
+    # A test is read from its shard, and the rows of every shard are merged in order.
+    #
+    assert read_pool.read(f"SELECT COUNT(*) FROM {sql.SQL.FRAMES_TABLE_NAME} WHERE test_id = ?", (2,), 2) == [ (2000,) ]
+    assert read_pool.read(f"SELECT test_id, frame_number FROM {sql.SQL.FRAMES_TABLE_NAME} ORDER BY frame_number, test_id", key=operator.itemgetter(1, 0)) == \
+           sorted([ (1, frame_number) for frame_number in range(3000) ] + [ (2, frame_number) for frame_number in range(2000) ], key=operator.itemgetter(1, 0))
+    assert read_pool.read(f"SELECT frame_number FROM {sql.SQL.FRAMES_TABLE_NAME} WHERE test_id = ?", (3,), 3) == []
+
+    read_pool.close()
+
+def test_sharding_is_chosen_once(expected_frames, run_extractor, ingest, read_frames, tmp_path):
+    path_to_binary, frames = expected_frames
+
+    #
+    # A sharded SQL db keeps its sharding, and a SQL db holding frames can't be sharded.
+    #
+    assert ingest(path_to_binary, str(tmp_path / "db.sql"), "--shard-by", "test", "--frame-range", ":1000")
+    assert not run_extractor(path_to_binary, str(tmp_path / "db.sql"), "--shard-by", "month", "--resume")[0]
+    assert ingest(path_to_binary, str(tmp_path / "db.sql"), "--resume")
+    assert read_frames(str(tmp_path / "db.sql")) == frames
+
+    assert not run_extractor(path_to_binary, str(tmp_path / "expected.sql"), "--shard-by", "test", *TEST_B)[0]
+
+def test_missing_shard_reads_no_frames(expected_frames, ingest, tmp_path):
+    path_to_binary, _ = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--shard-by", "test", "--frame-range", ":1000")
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":500", *TEST_B)
+
+    os.remove(sql.SQL.get_shard_path(path_to_db, "test_1"))
+
+    assert sql.ReadPool(path_to_db).read(f"SELECT test_id, COUNT(*) FROM {sql.SQL.FRAMES_TABLE_NAME} GROUP BY test_id") == [ (2, 500) ]
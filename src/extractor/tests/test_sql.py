@@ -0,0 +1,84 @@
+import decoder
+import frame
+import sql
+import pytest
+
+def decode_rows(path_to_binary: str, test_id: int) -> list:
+    """
+        Decodes the frames of a capture into rows of the "frames" table.
+    """
+
+    with open(path_to_binary, "rb") as file:
+        buffer = file.read()
+
+    batch_decoder = decoder.BatchDecoder()
+    batch = batch_decoder.decode_batch(buffer, batch_decoder.scan(buffer)[0])
+
+    for field_name in frame.Frame.DERIVED_FIELDS:
+        batch.calculate_derived_column(field_name)
+
+    return sql.SQL.batch_to_rows(test_id, batch)
+
+def count_committed_frames(path_to_db: str) -> int:
+    """
+        Counts the frames committed to the SQL db (from another connection).
+    """
+
+    conn = sql.sqlite3.connect(path_to_db)
+    nbr_of_frames = conn.execute(f"SELECT COUNT(*) FROM {sql.SQL.FRAMES_TABLE_NAME}").fetchone()[0]
+    conn.close()
+
+    return nbr_of_frames
+
+@pytest.mark.parametrize("options", [
+    ("--batch-size", "1"),
+    ("--batch-size", "333", "--transaction-size", "1000"),
+    ("--batch-size", "100000", "--transaction-size", "1"),
+])
+def test_batch_and_transaction_sizes_give_the_same_rows(expected_frames, ingest, read_frames, tmp_path, options):
+    path_to_binary, frames = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, *options)
+    assert read_frames(path_to_db) == frames
+
+def test_rows_are_committed_every_transaction_size(make_capture, tmp_path):
+    path_to_db = str(tmp_path / "db.sql")
+    sql_db = sql.SQL(path_to_db, batch_size=100, transaction_size=250)
+
+    assert sql_db.open_db() and sql_db.begin_ingest()
+
+    rows = decode_rows(make_capture(1000, seed=60), sql_db.get_test_id("test_a", "24-03-01"))
+
+    for start in range(0, len(rows), 60):
+        assert sql_db.insert_rows(rows[start:start + 60])
+
+        #
+        # The rows waiting for their transaction never go beyond a transaction (and a batch).
+        #
+        assert sql_db.nbr_of_uncommitted_rows + len(sql_db.pending_rows) < 250 + 100
+        assert count_committed_frames(path_to_db) >= start + 60 - 250 - 100
+
+    assert sql_db.end_ingest()
+    assert count_committed_frames(path_to_db) == 1000
+
+def test_test_ids_are_cached_until_rollback(tmp_path):
+    sql_db = sql.SQL(str(tmp_path / "db.sql"))
+
+    assert sql_db.open_db() and sql_db.begin_ingest()
+
+    test_id = sql_db.get_test_id("test_a", "24-03-01")
+
+    assert sql_db.get_test_id("test_a", "24-03-01") == test_id
+    assert sql_db.get_test_id("test_b", "24-03-01") != test_id
+    assert sql_db.test_ids == { ("test_a", "24-03-01") : test_id, ("test_b", "24-03-01") : sql_db.get_test_id("test_b", "24-03-01") }
+
+    #
+    # The tests created by a transaction which is rolled back are created again.
+    #
+    sql_db.rollback()
+
+    assert sql_db.find_test_id("test_a", "24-03-01") == None
+    assert sql_db.get_test_id("test_a", "24-03-01") != None
+    assert sql_db.end_ingest()
+    assert sql_db.find_test_id("test_a", "24-03-01") == sql_db.get_test_id("test_a", "24-03-01")
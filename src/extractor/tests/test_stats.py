@@ -0,0 +1,95 @@
+import extractor
+import stats
+import io
+import json
+import os
+import time
+import pytest
+
+class Terminal(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+def test_timer_adds_up_the_calls():
+    ingest_stats = stats.Stats()
+
+    for _ in range(3):
+        with ingest_stats.timer("decode"):
+            time.sleep(0.01)
+
+    with pytest.raises(ValueError):
+        with ingest_stats.timer("decode"):
+            raise ValueError()
+
+    assert ingest_stats.calls["decode"] == 4
+    assert ingest_stats.seconds["decode"] >= 0.03
+
+def test_timed_counts_each_item_and_the_end():
+    ingest_stats = stats.Stats()
+
+    def slow_items():
+        for item in range(3):
+            time.sleep(0.01)
+            yield item
+
+    assert list(ingest_stats.timed(slow_items(), "read")) == [ 0, 1, 2 ]
+    assert ingest_stats.calls["read"] == 4
+    assert ingest_stats.seconds["read"] >= 0.03
+
+def test_saved_stats(tmp_path):
+    ingest_stats = stats.Stats()
+    ingest_stats.count("frames", 1000)
+    ingest_stats.count("frames", 500)
+    ingest_stats.count("batches")
+
+    with ingest_stats.timer("insert"):
+        pass
+
+    assert ingest_stats.save(str(tmp_path / "stats.json"))
+    assert not ingest_stats.save(str(tmp_path / "missing" / "stats.json"))
+
+    with open(tmp_path / "stats.json") as file:
+        saved = json.load(file)
+
+    assert saved["counters"] == { "frames" : 1500, "batches" : 1 }
+    assert saved["stages"]["insert"]["calls"] == 1
+    assert saved["frames_per_second"] == pytest.approx(1500 / saved["wall_seconds"], rel=0.01)
+
+def test_ingest_writes_its_stats(make_capture, tmp_path, monkeypatch):
+    path_to_binary = make_capture(1000, seed=110)
+
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / "a" / "b")
+    monkeypatch.setattr("sys.argv", [ "main.py", "--binary", path_to_binary, "--short", "test_a", "24-03-01", "--stats", str(tmp_path / "stats.json") ])
+
+    assert extractor.Extractor().run()
+
+    with open(tmp_path / "stats.json") as file:
+        saved = json.load(file)
+
+    assert saved["counters"]["frames"] == 1000
+    assert saved["counters"]["bytes"] == os.path.getsize(path_to_binary)
+    assert { "read", "decode", "postprocess", "rows", "db_commit" } <= set(saved["stages"])
+
+def test_progress_is_rate_limited_on_a_terminal(monkeypatch):
+    stream = Terminal()
+    progress = stats.Progress(stream, interval=60)
+
+    for value in range(1000):
+        progress.update(value)
+
+    progress.finish()
+
+    assert stream.getvalue().count("\r") == 2
+    assert stream.getvalue().endswith(" 999\n")
+
+def test_progress_only_shows_the_last_value_elsewhere():
+    stream = io.StringIO()
+    progress = stats.Progress(stream)
+
+    for value in range(1000):
+        progress.update(value)
+
+    progress.finish()
+
+    assert stream.getvalue().endswith(" 999\n") and stream.getvalue().count("\n") == 1
@@ -0,0 +1,119 @@
+import sql
+import summarize
+import timestamps
+import collections
+import os
+import shutil
+import sys
+import pytest
+
+def read_summaries(path_to_db: str) -> dict:
+    """
+        Reads the summary tables of a SQL db (from its shards, when it is sharded).
+
+        Return - the sorted rows of each summary table.
+    """
+
+    read_pool = sql.ReadPool(path_to_db)
+
+    summaries = {
+        sql.SQL.TEST_SUMMARY_TABLE_NAME : read_pool.read(f"SELECT test_id, nbr_of_frames, first_frame_date, last_frame_date, last_frame_number FROM {sql.SQL.TEST_SUMMARY_TABLE_NAME}"),
+        sql.SQL.BUCKETS_TABLE_NAME : read_pool.read(f"SELECT test_id, bucket_size, bucket, nbr_of_frames FROM {sql.SQL.BUCKETS_TABLE_NAME}"),
+    }
+
+    for table_name, columns in sql.SQL.get_counts_tables().items():
+        summaries[table_name] = read_pool.read(f"SELECT test_id, {', '.join(columns)}, nbr_of_frames FROM {table_name}")
+
+    read_pool.close()
+
+    return { table_name : sorted(rows) for table_name, rows in summaries.items() }
+
+def summarize_frames(path_to_db: str, bucket_sizes: list) -> dict:
+    """
+        Calculates the summary tables of a SQL db from its frames, in Python.
+
+        Return - the sorted rows of each summary table.
+    """
+
+    read_pool = sql.ReadPool(path_to_db)
+    frames = read_pool.read(f"SELECT {', '.join(sql.SQL.FRAMES_TABLE_COLUMNS)} FROM {sql.SQL.FRAMES_TABLE_NAME}")
+    read_pool.close()
+
+    column = { column : i for i, column in enumerate(sql.SQL.FRAMES_TABLE_COLUMNS) }
+    summaries = { sql.SQL.TEST_SUMMARY_TABLE_NAME : [], sql.SQL.BUCKETS_TABLE_NAME : [] }
+
+    for test_id in sorted({ row[0] for row in frames }):
+        test_frames = [ row for row in frames if row[0] == test_id ]
+        frame_dates = [ row[column["frame_date"]] for row in test_frames if row[column["frame_date"]] != None ]
+
+        summaries[sql.SQL.TEST_SUMMARY_TABLE_NAME].append((test_id, len(test_frames), min(frame_dates), max(frame_dates), max(row[1] for row in test_frames)))
+
+        for bucket_size in bucket_sizes:
+            buckets = collections.Counter(frame_date // bucket_size * bucket_size for frame_date in frame_dates)
+            summaries[sql.SQL.BUCKETS_TABLE_NAME] += [ (test_id, bucket_size, bucket, nbr_of_frames) for bucket, nbr_of_frames in buckets.items() ]
+
+    for table_name, columns in sql.SQL.get_counts_tables().items():
+        counts = collections.Counter((row[0],) + tuple(row[column[name]] for name in columns) for row in frames)
+        summaries[table_name] = [ values + (nbr_of_frames,) for values, nbr_of_frames in counts.items() if None not in values ]
+
+    return { table_name : sorted(rows) for table_name, rows in summaries.items() }
+
+def run_summarize(tmp_path, monkeypatch, *options) -> bool:
+    monkeypatch.setattr(sys, "argv", [ "summarize.py", "--db", str(tmp_path / "db.sql"), *options ])
+
+    return summarize.Summary().run()
+
+@pytest.mark.parametrize("options", [ (), ("--pipeline",), ("--jobs", "2", "--batch-size", "700"), ("--shard-by", "test") ])
+def test_summaries_match_the_frames(expected_frames, ingest, tmp_path, options):
+    path_to_binary, _ = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, *options)
+
+    summaries = read_summaries(path_to_db)
+
+    assert summaries == summarize_frames(path_to_db, sql.SQL.DEFAULT_BUCKET_SIZES)
+    assert summaries[sql.SQL.TEST_SUMMARY_TABLE_NAME][0][1] == 5000
+
+def test_summaries_of_several_runs(expected_frames, ingest, tmp_path):
+    path_to_binary, _ = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, "--frame-range", ":1234")
+    assert ingest(path_to_binary, path_to_db, "--resume")
+
+    assert read_summaries(path_to_db) == read_summaries(str(tmp_path / "expected.sql"))
+
+@pytest.mark.parametrize("options", [ (), ("--shard-by", "test") ])
+def test_rebuild_summaries_with_other_bucket_sizes(expected_frames, ingest, tmp_path, monkeypatch, options):
+    path_to_binary, _ = expected_frames
+    path_to_db = str(tmp_path / "db.sql")
+
+    assert ingest(path_to_binary, path_to_db, *options)
+    assert run_summarize(tmp_path, monkeypatch, "--bucket-sizes", "0.5,10,3600")
+
+    bucket_sizes = [ timestamps.NS_PER_SECOND // 2, 10 * timestamps.NS_PER_SECOND, 3600 * timestamps.NS_PER_SECOND ]
+    summaries = read_summaries(path_to_db)
+
+    assert summaries == summarize_frames(path_to_db, bucket_sizes)
+
+    #
+    # Rebuilding a single test keeps the bucket sizes.
+    #
+    assert run_summarize(tmp_path, monkeypatch, "--short", "test_a", "24-03-01 10-00-00")
+    assert read_summaries(path_to_db) == summaries
+
+@pytest.mark.parametrize("bucket_sizes", [ "0", "-1", "1,abc" ])
+def test_summarize_rejects_invalid_bucket_sizes(tmp_path, monkeypatch, bucket_sizes):
+    with pytest.raises(SystemExit):
+        run_summarize(tmp_path, monkeypatch, "--bucket-sizes", bucket_sizes)
+
+@pytest.mark.parametrize("name", [ "db?.sql", "db#1.sql", "db%20.sql", "db 1.sql" ])
+def test_read_pool_opens_any_path(expected_frames, read_frames, tmp_path, name):
+    _, frames = expected_frames
+
+    os.mkdir(tmp_path / name)
+    path_to_db = str(tmp_path / name / name)
+    shutil.copy(tmp_path / "expected.sql", path_to_db)
+
+    assert read_frames(path_to_db) == frames
@@ -0,0 +1,49 @@
+import timestamps
+import datetime
+import fractions
+import numpy
+
+def reference_format(epoch: datetime.datetime, seconds: fractions.Fraction) -> str:
+    """
+        Formats a date exactly, rounded to the microsecond (half to even).
+    """
+
+    return (epoch + datetime.timedelta(microseconds=round(seconds * 10**6))).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def test_divide_and_round_half_to_even():
+    numerators = numpy.array([ 0, 4, 5, 6, 14, 15, 16, 25, 2**64 - 1 ], dtype=numpy.uint64)
+
+    assert timestamps.divide_and_round(numerators, 10).tolist() == [ 0, 0, 0, 1, 1, 2, 2, 2, 1844674407370955162 ]
+
+def test_frame_dates_are_rounded_exactly():
+    generator = numpy.random.default_rng(0)
+
+    #
+    # 2000 to 2028 (the ticks fill 64 bits in mid-2028), and dates exactly halfway between 2 microseconds.
+    #
+    ticks = generator.integers(946684800 * 10**10, 1830297600 * 10**10, 10000, dtype=numpy.uint64)
+    ticks[:1000] = ticks[:1000] // numpy.uint64(10**4) * numpy.uint64(10**4) + numpy.uint64(5000)
+
+    epoch = datetime.datetime(1970, 1, 1)
+
+    assert timestamps.format_frame_dates(ticks) == [ reference_format(epoch, fractions.Fraction(tick, 10**10)) for tick in ticks.tolist() ]
+
+def test_packet_dates_are_rounded_exactly():
+    generator = numpy.random.default_rng(1)
+
+    ticks = generator.integers(0, 2**48, 10000, dtype=numpy.uint64)
+    ticks[:100] = numpy.arange(100, dtype=numpy.uint64)
+
+    epoch = datetime.datetime(2000, 1, 1, 12)
+
+    assert timestamps.format_packet_dates(ticks) == [ reference_format(epoch, fractions.Fraction(tick, 2**16)) for tick in ticks.tolist() ]
+
+def test_frame_dates_split_into_ns_and_tenths_of_ns():
+    ticks = numpy.array([ 0, 9, 10, 17094944000000000005, 2**64 - 1 ], dtype=numpy.uint64)
+
+    ns = timestamps.frame_date_to_ns(ticks)
+    sub_ns = timestamps.frame_date_to_sub_ns(ticks)
+
+    assert ns.dtype == numpy.int64 and sub_ns.dtype == numpy.int64
+    assert [ value * 10 + remainder for value, remainder in zip(ns.tolist(), sub_ns.tolist()) ] == ticks.tolist()
+    assert sub_ns.tolist() == [ 0, 9, 0, 5, 5 ]
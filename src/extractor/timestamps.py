@@ -0,0 +1,80 @@
+import numpy
+
+#
+# The frame date counts 1/10^10 seconds since 01/01/1970 00:00:00.
+#
+FRAME_DATE_TICKS_PER_NS = 10
+
+#
+# The packet date counts 1/2^16 seconds since 01/01/2000 12:00:00.
+#
+PACKET_DATE_TICKS_PER_SECOND = 2**16
+PACKET_DATE_EPOCH_IN_NS = int((numpy.datetime64("2000-01-01T12:00:00", "ns") - numpy.datetime64("1970-01-01T00:00:00", "ns")).astype(numpy.int64))
+
+NS_PER_SECOND = 10**9
+NS_PER_US = 1000
+
+def divide_and_round(numerator: numpy.ndarray, denominator: int) -> numpy.ndarray:
+    """
+        Divides unsigned integers, rounding half to even (as datetime.timedelta does).
+    """
+
+    numerator = numerator.astype(numpy.uint64)
+    denominator = numpy.uint64(denominator)
+
+    quotient, remainder = numpy.divmod(numerator, denominator)
+    round_up = (remainder * numpy.uint64(2) > denominator) | ((remainder * numpy.uint64(2) == denominator) & (quotient % numpy.uint64(2) == 1))
+
+    return quotient + round_up.astype(numpy.uint64)
+
+def frame_date_to_ns(ticks: numpy.ndarray) -> numpy.ndarray:
+    """
+        Converts frame dates into nanoseconds since 01/01/1970 00:00:00 (the remaining 1/10 ns being dropped).
+    """
+
+    return (ticks.astype(numpy.uint64) // numpy.uint64(FRAME_DATE_TICKS_PER_NS)).astype(numpy.int64)
+
+def frame_date_to_sub_ns(ticks: numpy.ndarray) -> numpy.ndarray:
+    """
+        Returns the 1/10 ns dropped by frame_date_to_ns.
+    """
+
+    return (ticks.astype(numpy.uint64) % numpy.uint64(FRAME_DATE_TICKS_PER_NS)).astype(numpy.int64)
+
+def frame_date_to_us(ticks: numpy.ndarray) -> numpy.ndarray:
+    """
+        Converts frame dates into microseconds since 01/01/1970 00:00:00 (rounded).
+    """
+
+    return divide_and_round(ticks, FRAME_DATE_TICKS_PER_NS * NS_PER_US).astype(numpy.int64)
+
+def packet_date_to_us(ticks: numpy.ndarray) -> numpy.ndarray:
+    """
+        Converts packet dates into microseconds since 01/01/1970 00:00:00 (rounded).
+    """
+
+    seconds, fraction = numpy.divmod(ticks.astype(numpy.uint64), numpy.uint64(PACKET_DATE_TICKS_PER_SECOND))
+
+    return (PACKET_DATE_EPOCH_IN_NS // NS_PER_US + seconds.astype(numpy.int64) * (NS_PER_SECOND // NS_PER_US) + \
+            divide_and_round(fraction * numpy.uint64(NS_PER_SECOND // NS_PER_US), PACKET_DATE_TICKS_PER_SECOND).astype(numpy.int64))
+
+def format_us(us: numpy.ndarray) -> list:
+    """
+        Formats microseconds since 01/01/1970 00:00:00 like "YYYY-MM-DD hh:mm:ss.ffffff".
+    """
+
+    return [ date.replace("T", " ") for date in numpy.datetime_as_string(us.astype("datetime64[us]"), unit="us").tolist() ]
+
+def format_frame_dates(ticks: numpy.ndarray) -> list:
+    """
+        Formats frame dates like "YYYY-MM-DD hh:mm:ss.ffffff".
+    """
+
+    return format_us(frame_date_to_us(ticks))
+
+def format_packet_dates(ticks: numpy.ndarray) -> list:
+    """
+        Formats packet dates like "YYYY-MM-DD hh:mm:ss.ffffff".
+    """
+
+    return format_us(packet_date_to_us(ticks))